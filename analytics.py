@@ -0,0 +1,203 @@
+import os
+import numpy as np
+import pandas as pd
+from ingest import cache_path_for, is_current_version, read_feather_mmap, write_feather_atomic, remove_stale_caches
+from graph_index import gather_slices
+from communities import aggregate_pairs
+
+# --- Graph analytics: centrality metrics over the full network, vectorized over a CSR adjacency ---
+
+ANALYTIC_METRICS = ['weighted_degree', 'pagerank', 'eigenvector', 'betweenness']
+BETWEENNESS_SAMPLES = 64
+DENSE_LEVEL_RATIO = 16
+
+
+def pair_adjacency(graph_index, edges):
+    """
+    Symmetric CSR over unique HCP pairs (parallel edges summed, self-loops dropped), weighted by
+    connection strength. Returns (offsets, neighbors, weights).
+    """
+    src, dst, weights = aggregate_pairs(graph_index, edges)
+    owner = np.concatenate([src, dst])
+    other = np.concatenate([dst, src])
+    both = np.concatenate([weights, weights])
+    order = np.lexsort((other, owner))
+    offsets = np.zeros(graph_index.num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owner, minlength=graph_index.num_nodes), out=offsets[1:])
+    return offsets, other[order], np.maximum(both[order], 0)
+
+
+def _owners(offsets):
+    degrees = np.diff(offsets)
+    return np.repeat(np.arange(len(degrees), dtype=np.int64), degrees)
+
+
+def weighted_degree(offsets, neighbors, weights):
+    """
+    Sum of connection strength over each HCP's collaborators.
+    """
+    return np.bincount(_owners(offsets), weights=weights, minlength=len(offsets) - 1)
+
+
+def pagerank(offsets, neighbors, weights, damping=0.85, max_iter=100, tol=1e-6, start=None):
+    """
+    Weighted PageRank by power iteration (networkx semantics: uniform teleport, dangling nodes
+    spread uniformly, convergence when the L1 change is below num_nodes * tol). `start` seeds the
+    iteration, e.g. with the scores of a previous version of the graph.
+    """
+    num_nodes = len(offsets) - 1
+    if num_nodes == 0:
+        return np.empty(0)
+    owners = _owners(offsets)
+    out_weight = np.bincount(owners, weights=weights, minlength=num_nodes)
+    dangling = out_weight == 0
+    with np.errstate(invalid='ignore', divide='ignore'):
+        transition = np.where(out_weight[owners] > 0, weights / out_weight[owners], 0)
+
+    x = np.full(num_nodes, 1.0 / num_nodes) if start is None else start / start.sum()
+    for _ in range(max_iter):
+        previous = x
+        x = damping * np.bincount(neighbors, weights=previous[owners] * transition, minlength=num_nodes)
+        x += (damping * previous[dangling].sum() + 1 - damping) / num_nodes
+        if np.abs(x - previous).sum() < num_nodes * tol:
+            break
+    return x
+
+
+def eigenvector_centrality(offsets, neighbors, weights, max_iter=100, tol=1e-6, start=None):
+    """
+    Weighted eigenvector centrality by power iteration on (A + I), as networkx does, L2-normalized.
+    `start` seeds the iteration like in pagerank.
+    """
+    num_nodes = len(offsets) - 1
+    if num_nodes == 0:
+        return np.empty(0)
+    owners = _owners(offsets)
+    x = np.full(num_nodes, 1.0 / num_nodes) if start is None else start / start.sum()
+    for _ in range(max_iter):
+        previous = x
+        x = previous + np.bincount(neighbors, weights=previous[owners] * weights, minlength=num_nodes)
+        norm = np.sqrt((x * x).sum())
+        if norm == 0:
+            return x
+        x = x / norm
+        if np.abs(x - previous).sum() < num_nodes * tol:
+            break
+    return x
+
+
+def _is_dense(ids, size):
+    # Large BFS levels are cheaper as full-length bincounts/masks than as sorts
+    return len(ids) * DENSE_LEVEL_RATIO > size
+
+
+def _accumulate(target, ids, values):
+    """
+    target[ids] += values, with repeated ids summed (a fast np.add.at).
+    """
+    if _is_dense(ids, len(target)):
+        target += np.bincount(ids, weights=values, minlength=len(target))
+        return
+    unique_ids, inverse = np.unique(ids, return_inverse=True)
+    target[unique_ids] += np.bincount(inverse, weights=values, minlength=len(unique_ids))
+
+
+def _unique_ids(ids, size):
+    if _is_dense(ids, size):
+        mask = np.zeros(size, dtype=bool)
+        mask[ids] = True
+        return np.flatnonzero(mask)
+    return np.unique(ids)
+
+
+def sampled_betweenness(offsets, neighbors, samples=BETWEENNESS_SAMPLES, seed=42):
+    """
+    Approximate betweenness centrality (shortest paths by hop count) from `samples` random source
+    nodes, using Brandes' accumulation with one vectorized step per BFS level. Normalized and
+    scaled like networkx's betweenness_centrality(k=samples).
+    """
+    num_nodes = len(offsets) - 1
+    betweenness = np.zeros(num_nodes)
+    if num_nodes < 3:
+        return betweenness
+    rng = np.random.default_rng(seed)
+    sources = rng.choice(num_nodes, min(samples, num_nodes), replace=False)
+
+    for source in sources:
+        dist = np.full(num_nodes, -1, dtype=np.int64)
+        sigma = np.zeros(num_nodes)
+        dist[source], sigma[source] = 0, 1.0
+        frontier = np.array([source], dtype=np.int64)
+        level_pairs = []
+        depth = 0
+        while len(frontier):
+            entries = gather_slices(offsets, frontier)
+            owners = np.repeat(frontier, offsets[frontier + 1] - offsets[frontier])
+            nbrs = neighbors[entries]
+            unseen = nbrs[dist[nbrs] < 0]
+            frontier = _unique_ids(unseen, num_nodes)
+            dist[frontier] = depth + 1
+            on_path = dist[nbrs] == depth + 1
+            parents, children = owners[on_path], nbrs[on_path]
+            _accumulate(sigma, children, sigma[parents])
+            level_pairs.append((parents, children))
+            depth += 1
+
+        delta = np.zeros(num_nodes)
+        for parents, children in reversed(level_pairs):
+            if len(parents):
+                _accumulate(delta, parents, sigma[parents] / sigma[children] * (1 + delta[children]))
+        delta[source] = 0
+        betweenness += delta
+
+    return betweenness * (num_nodes / len(sources)) / ((num_nodes - 1) * (num_nodes - 2))
+
+
+def compute_analytics(graph_index, edges, betweenness_samples=BETWEENNESS_SAMPLES):
+    """
+    All analytic metrics for every node, one row per node id.
+    """
+    offsets, neighbors, weights = pair_adjacency(graph_index, edges)
+    return pd.DataFrame({
+        'weighted_degree': weighted_degree(offsets, neighbors, weights),
+        'pagerank': pagerank(offsets, neighbors, weights),
+        'eigenvector': eigenvector_centrality(offsets, neighbors, weights),
+        'betweenness': sampled_betweenness(offsets, neighbors, betweenness_samples),
+    })
+
+
+def update_analytics(previous, graph_index, edges, update, betweenness_samples=BETWEENNESS_SAMPLES):
+    """
+    Analytics after an edge change (see graph_index.update_graph_index). PageRank and eigenvector
+    centrality restart the power iteration from the previous scores, so a small change converges
+    in a few iterations. Weighted degree is exact. Sampled betweenness is recomputed, since a few
+    new edges can reroute shortest paths anywhere in the network.
+    """
+    offsets, neighbors, weights = pair_adjacency(graph_index, edges)
+    old_ids = update.old_node_ids(graph_index.num_nodes)
+    starts = {}
+    for metric in ['pagerank', 'eigenvector']:
+        # New HCPs start from the uniform score
+        scores = previous[metric].to_numpy()[np.maximum(old_ids, 0)]
+        starts[metric] = np.where(old_ids >= 0, scores, 1.0 / max(graph_index.num_nodes, 1))
+    return pd.DataFrame({
+        'weighted_degree': weighted_degree(offsets, neighbors, weights),
+        'pagerank': pagerank(offsets, neighbors, weights, start=starts['pagerank']),
+        'eigenvector': eigenvector_centrality(offsets, neighbors, weights, start=starts['eigenvector']),
+        'betweenness': sampled_betweenness(offsets, neighbors, betweenness_samples),
+    })
+
+
+def load_analytics(csv_path, graph_index, edges, cache_dir=None, version=None):
+    """
+    Returns the analytics table for a version of csv_path (by default the current one), computing it the first time;
+    it is persisted only while that version is current.
+    """
+    path = cache_path_for(csv_path, '.analytics.feather', cache_dir, version)
+    if not os.path.exists(path):
+        analytics = compute_analytics(graph_index, edges)
+        if not is_current_version(csv_path, version, cache_dir):
+            return analytics
+        write_feather_atomic(analytics, path)
+        remove_stale_caches(path, '.analytics.feather')
+    return read_feather_mmap(path)
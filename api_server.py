@@ -0,0 +1,200 @@
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlsplit
+from ingest import current_version
+from dataset import load_dataset
+from query_api import (ARROW_MEDIA_TYPE, QUERIES, describe_error, error_status, result_table, run_batch, run_query,
+                       to_arrow, to_json)
+
+# --- Local HTTP server for the headless queries: one shared in-memory dataset for every client ---
+
+# Requests per POST /batch
+MAX_BATCH = 10_000
+# Request bodies larger than this are refused
+MAX_BODY_BYTES = 64 * 1024 * 1024
+# Seconds between checks for a new export or applied delta
+VERSION_CHECK_INTERVAL = 2.0
+
+
+class SharedDataset:
+    """
+    The current dataset version for the whole server process. Requests share one read-only
+    instance; a new export or applied delta is picked up on the first request after it is
+    published, the same way the dashboard switches over on its next rerun.
+    """
+
+    def __init__(self, csv_path, cache_dir=None):
+        self.csv_path = csv_path
+        self.cache_dir = cache_dir
+        self._lock = threading.Lock()
+        self._dataset = None
+        self._checked = 0.0
+
+    def get(self):
+        dataset = self._dataset
+        if dataset is not None and time.monotonic() - self._checked < VERSION_CHECK_INTERVAL:
+            return dataset
+        version = current_version(self.csv_path, self.cache_dir)
+        with self._lock:
+            if self._dataset is None or self._dataset.version != version:
+                self._dataset = load_dataset(self.csv_path, self.cache_dir, version)
+            self._checked = time.monotonic()
+            return self._dataset
+
+
+class QueryHandler(BaseHTTPRequestHandler):
+    """
+    GET /<query>?param=value... or POST /<query> with a JSON object of parameters runs one query;
+    POST /batch with {"requests": [{"query": ..., "params": {...}}, ...]} runs many against the same
+    dataset version. Responses are JSON, or an Arrow IPC stream of one table with ?format=arrow
+    (or an Arrow Accept header); ?table= picks which table of the result.
+    """
+
+    shared = None
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        params = dict(parse_qsl(url.query))
+        name = url.path.strip('/')
+        if name in ('', 'health'):
+            dataset = self._dataset()
+            if dataset is None:
+                return
+            self._send_json(200, {'version': dataset.version, 'hcps': dataset.graph_index.num_nodes,
+                                  'edges': dataset.graph_index.num_edges, 'queries': list(QUERIES)})
+            return
+        self._answer(name, params)
+
+    def do_POST(self):
+        url = urlsplit(self.path)
+        options = dict(parse_qsl(url.query))
+        try:
+            body = self._read_json()
+        except ValueError as e:
+            self._send_json(400, {'error': str(e)})
+            return
+        name = url.path.strip('/')
+        if name != 'batch':
+            self._answer(name, {**options, **body})
+            return
+
+        requests = body.get('requests')
+        if not isinstance(requests, list) or len(requests) > MAX_BATCH:
+            self._send_json(400, {'error': f"'requests' must be a list of at most {MAX_BATCH} queries"})
+            return
+        # Requests that are not objects fail on their own, like any other bad entry
+        requests = [request if isinstance(request, dict) else {} for request in requests]
+        dataset = self._dataset()
+        if dataset is None:
+            return
+        results = run_batch(dataset, requests)
+        if not self._wants_arrow(options):
+            self._send_json(200, {'results': results})
+            return
+        # Arrow: the chosen table of every successful request, stacked; failures go in a header
+        tables, request_ids, errors = [], [], {}
+        for request_id, entry in enumerate(results):
+            try:
+                if 'error' in entry:
+                    raise ValueError(entry['error'])
+                tables.append(result_table(entry['result'], options.get('table')))
+                request_ids.append(request_id)
+            except ValueError as e:
+                errors[request_id] = str(e)
+        self._send(200, ARROW_MEDIA_TYPE, to_arrow(tables, request_ids),
+                   {'X-Batch-Errors': json.dumps(errors)} if errors else None)
+
+    def _answer(self, name, params):
+        wants_arrow = self._wants_arrow(params)
+        table = params.pop('table', None)
+        params.pop('format', None)
+        try:
+            result = run_query(self.shared.get(), name, params)
+            if wants_arrow:
+                self._send(200, ARROW_MEDIA_TYPE, to_arrow(result_table(result, table)))
+            else:
+                self._send_json(200, result)
+        except Exception as e:
+            self._send_json(error_status(e), {'error': describe_error(e)})
+
+    def _dataset(self):
+        """
+        The shared dataset, or None after answering with an error if it cannot be loaded (e.g. the
+        source file is missing or corrupt).
+        """
+        try:
+            return self.shared.get()
+        except Exception as e:
+            self._send_json(error_status(e), {'error': describe_error(e)})
+            return None
+
+    def _wants_arrow(self, params):
+        if 'format' in params:
+            return params['format'] == 'arrow'
+        return ARROW_MEDIA_TYPE in self.headers.get('Accept', '')
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length > MAX_BODY_BYTES:
+            raise ValueError("Request body too large")
+        if length == 0:
+            return {}
+        body = json.loads(self.rfile.read(length))
+        if not isinstance(body, dict):
+            raise ValueError("Request body must be a JSON object")
+        return body
+
+    def _send_json(self, status, value):
+        self._send(status, 'application/json', to_json(value).encode('utf-8'))
+
+    def _send(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def make_server(csv_path, host='127.0.0.1', port=8502, cache_dir=None):
+    """
+    A threaded HTTP server answering queries over csv_path. The dataset is loaded before the
+    server is returned, so the first request does not pay for it.
+    """
+    shared = SharedDataset(csv_path, cache_dir)
+    shared.get()
+    handler = type('BoundQueryHandler', (QueryHandler,), {'shared': shared})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve HCP network queries over HTTP (JSON or Arrow).")
+    parser.add_argument('--data', default=os.environ.get('HCP_DATA_SOURCE', "Main DB_1.csv"),
+                        help="edge export: a CSV, a directory of CSVs or a glob pattern")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8502)
+    parser.add_argument('--cache-dir', default=None)
+    args = parser.parse_args()
+
+    server = make_server(args.data, args.host, args.port, args.cache_dir)
+    print(f"Serving {args.data} on http://{args.host}:{server.server_address[1]} "
+          f"(queries: {', '.join(QUERIES)}, batch)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,262 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+from ingest import current_version, load_edge_table
+from graph_index import load_graph_index
+from summaries import DEFINED_METRICS, load_summary_store
+from dataset import load_dataset
+from memory_report import frame_bytes
+from instrumentation import current_rss
+
+# --- Headless benchmark of the data pipeline behind detailed.py, on synthetic "Main DB_1.csv"-shaped data ---
+
+DEFAULT_SIZES = ['10k', '100k', '1M']
+EDGES_PER_NODE = 10
+DEGREE_EXPONENT = 0.8
+GENERATOR_CHUNK_ROWS = 1_000_000
+RSS_SAMPLE_SECONDS = 0.005
+STATES = ['CA', 'NY', 'TX', 'FL', 'WA', 'IL', 'PA', 'OH', 'GA', 'NC', 'MI', 'NJ']
+CITIES_PER_STATE = 20
+
+
+def parse_size(text):
+    """
+    '10k' -> 10000, '1M' -> 1000000, '2500' -> 2500.
+    """
+    text = text.strip()
+    scale = {'k': 10 ** 3, 'm': 10 ** 6}.get(text[-1].lower(), 1)
+    return int(float(text[:-1] if scale > 1 else text) * scale)
+
+
+def generate_edge_csv(path, num_edges, seed=0, num_nodes=None):
+    """
+    Writes a synthetic edge file with the columns of "Main DB_1.csv". Endpoints are drawn with
+    probability proportional to rank ** -DEGREE_EXPONENT, which gives a power-law degree
+    distribution with a few hub HCPs; node attributes are fixed per HCP and edge attributes
+    (strength, papers, panels, trials, Metrics) vary per edge, with some missing values.
+    Rows are generated and appended in chunks, so 10M edges never sit in memory at once.
+    """
+    rng = np.random.default_rng(seed)
+    num_nodes = num_nodes or max(num_edges // EDGES_PER_NODE, 2)
+    npis = np.sort(rng.choice(9 * 10 ** 8, num_nodes, replace=False)) + 10 ** 9
+    weights = rng.permutation(1.0 / np.arange(1, num_nodes + 1) ** DEGREE_EXPONENT)
+    cumulative = np.cumsum(weights)
+    cumulative /= cumulative[-1]
+
+    names = np.array([f"Dr {i}" for i in rng.integers(0, max(num_nodes // 2, 1), num_nodes)], dtype=object)
+    states = np.array(STATES)[rng.integers(0, len(STATES), num_nodes)]
+    cities = np.array([f"City {i}" for i in range(len(STATES) * CITIES_PER_STATE)])[
+        rng.integers(0, CITIES_PER_STATE, num_nodes) + CITIES_PER_STATE * np.searchsorted(STATES, states, sorter=np.argsort(STATES))
+    ]
+    # Reported connection counts follow each HCP's expected degree, so hubs rank high
+    connections = np.maximum(rng.poisson(2 * num_edges * weights / weights.sum()), 1)
+    influence = np.round(rng.gamma(2.0, 2.0, num_nodes), 2)
+    metrics = np.array(DEFINED_METRICS + ['Other'], dtype=object)
+
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    written = 0
+    while written < num_edges:
+        rows = min(GENERATOR_CHUNK_ROWS, num_edges - written)
+        a = np.searchsorted(cumulative, rng.random(rows))
+        b = np.searchsorted(cumulative, rng.random(rows))
+        chunk = pd.DataFrame({
+            'NPI_1': npis[a], 'HCP_1': names[a], 'NPI_2': npis[b], 'HCP_2': names[b],
+            'No. of Connections HCP 1': connections[a], 'No. of Connections HCP 2': connections[b],
+            'Influence score_1': influence[a], 'Influence score_2': influence[b],
+            'City1': cities[a], 'State1': states[a], 'City2': cities[b], 'State2': states[b],
+            'Overall Connection Strength': np.round(rng.gamma(2.0, 0.4, rows), 3),
+            'Papers': rng.poisson(5, rows).astype(float), 'Panels': rng.poisson(1.5, rows), 'Trials': rng.poisson(0.7, rows),
+            'Metrics': metrics[rng.integers(0, len(metrics), rows)],
+        })
+        for column in ['HCP_2', 'City1', 'Papers', 'Metrics']:
+            chunk.loc[rng.random(rows) < 0.02, column] = np.nan
+        chunk.to_csv(tmp_path, mode='w' if written == 0 else 'a', header=written == 0, index=False)
+        written += rows
+    os.replace(tmp_path, path)
+    return path
+
+
+class RssSampler:
+    """
+    Samples RSS on a background thread while a stage runs, to report its peak.
+    """
+
+    def __enter__(self):
+        self.start = self.peak = current_rss()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._sample, daemon=True)
+        self._thread.start()
+        return self
+
+    def _sample(self):
+        while not self._stop.wait(RSS_SAMPLE_SECONDS):
+            self.peak = max(self.peak, current_rss())
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.end = current_rss()
+        self.peak = max(self.peak, self.end)
+        return False
+
+
+def measure(results, num_edges, stage, func, describe=None):
+    """
+    Runs one stage, appending its wall time, RSS figures and output size to results.
+    """
+    with RssSampler() as rss:
+        start = time.perf_counter()
+        output = func()
+        seconds = time.perf_counter() - start
+    row = {
+        'edges': num_edges, 'stage': stage, 'seconds': round(seconds, 4),
+        'peak_rss_mb': round(rss.peak / 2 ** 20, 1), 'rss_delta_mb': round((rss.end - rss.start) / 2 ** 20, 1),
+    }
+    row.update(describe(output) if describe else {})
+    results.append(row)
+    print(f"  {stage:<28} {seconds:9.3f} s  peak {row['peak_rss_mb']:8.1f} MB  "
+          + "  ".join(f"{key}={value}" for key, value in row.items() if key.startswith('out_')), flush=True)
+    return output
+
+
+def _quiet_streamlit():
+    # Cached functions warn about the missing script run context on every call in bare mode.
+    # Streamlit re-applies its configured level when it parses its config, so parse it first.
+    from streamlit import config, logger
+    config.get_option('logger.level')
+    logger.set_log_level('error')
+
+
+def benchmark_size(csv_path, num_edges, work_dir, top_n=50):
+    """
+    Runs every pipeline stage for one edge file against a fresh cache directory and returns the
+    result rows. The Streamlit-cached functions of detailed.py are called with their caches
+    cleared, so each stage measures a cold computation.
+    """
+    _quiet_streamlit()
+    import detailed
+    results = []
+    cache_dir = tempfile.mkdtemp(prefix='cache-', dir=work_dir)
+    try:
+        edges = measure(results, num_edges, 'ingest_edge_store', lambda: load_edge_table(csv_path, cache_dir),
+                        lambda df: {'out_rows': len(df), 'out_mb': round(frame_bytes(df) / 2 ** 20, 2)})
+        graph_index = measure(results, num_edges, 'build_graph_index', lambda: load_graph_index(csv_path, edges, cache_dir),
+                              lambda index: {'out_rows': index.num_nodes, 'out_mb': round(frame_bytes(index.nodes) / 2 ** 20, 2)})
+        measure(results, num_edges, 'build_summary_store',
+                lambda: load_summary_store(csv_path, graph_index, edges, cache_dir))
+        dataset = measure(results, num_edges, 'load_dataset_warm', lambda: load_dataset(csv_path, cache_dir),
+                          lambda ds: {'out_rows': ds.graph_index.num_nodes})
+        measure(results, num_edges, 'build_query_index', lambda: dataset.query_index)
+
+        version = current_version(csv_path, cache_dir)
+        for cached_function in detailed.CACHED_FUNCTIONS:
+            cached_function.clear()
+        nodes = measure(
+            results, num_edges, 'get_filtered_nodes',
+            lambda: detailed.get_filtered_nodes(version, dataset, top_n, [], [], 0, 0, 0, 0, 0, 'connections'),
+            lambda df: {'out_rows': len(df)}
+        )
+        edge_rows = measure(
+            results, num_edges, 'get_filtered_edge_rows',
+            lambda: detailed.get_filtered_edge_rows(version, dataset, nodes['NPI'].tolist(), 0.0, None),
+            lambda rows: {'out_rows': len(rows)}
+        )
+        subgraph_edges = dataset.edges.iloc[edge_rows]
+        strength = dataset.edges['Overall Connection Strength']
+        measure(
+            results, num_edges, 'build_network_records',
+            lambda: detailed.build_network_records(
+                version, detailed.subgraph_key(nodes, subgraph_edges), nodes, subgraph_edges, False,
+                0, int(dataset.nodes['connections'].max()), 0.0, round(float(strength.max()), 6)
+            ),
+            lambda network: {'out_rows': len(network[0]) + len(network[1]),
+                             'out_mb': round(len(json.dumps(network[:2], default=str)) / 2 ** 20, 3)}
+        )
+        hub_npi = int(nodes['NPI'].iloc[0])
+        measure(
+            results, num_edges, 'generate_hcp_summary_data',
+            lambda: detailed.generate_hcp_summary_data(version, hub_npi, dataset),
+            lambda summary: {'out_mb': round(len(json.dumps(summary, default=str)) / 2 ** 20, 4)}
+        )
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+    return results
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_results(baseline, current):
+    """
+    Wall time and peak RSS of the current run relative to a baseline run, per size and stage.
+    """
+    key = ['edges', 'stage']
+    merged = pd.DataFrame(current['results']).merge(pd.DataFrame(baseline['results']), on=key, suffixes=('', '_base'))
+    merged['time_ratio'] = (merged['seconds'] / merged['seconds_base']).round(2)
+    merged['rss_ratio'] = (merged['peak_rss_mb'] / merged['peak_rss_mb_base']).round(2)
+    return merged[key + ['seconds_base', 'seconds', 'time_ratio', 'peak_rss_mb_base', 'peak_rss_mb', 'rss_ratio']]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the HCP network data pipeline on synthetic edge files.")
+    parser.add_argument('--sizes', nargs='+', default=DEFAULT_SIZES, help="edge counts, e.g. 10k 100k 1M 10M")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--work-dir', default=None,
+                        help="where synthetic CSVs are kept and reused across runs (default: a temporary directory)")
+    parser.add_argument('--output', default=None, help="JSON results file (default: benchmark-<commit>.json)")
+    parser.add_argument('--compare', default=None, help="earlier JSON results to compare against")
+    args = parser.parse_args()
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix='hcp-benchmark-')
+    os.makedirs(work_dir, exist_ok=True)
+    commit = _git_commit()
+    results = []
+    try:
+        for size in args.sizes:
+            num_edges = parse_size(size)
+            csv_path = os.path.join(work_dir, f"synthetic_{num_edges}_seed{args.seed}.csv")
+            print(f"{num_edges:,} edges", flush=True)
+            if os.path.exists(csv_path):
+                print(f"  reusing {csv_path}")
+            else:
+                measure(results, num_edges, 'generate_csv', lambda: generate_edge_csv(csv_path, num_edges, args.seed),
+                        lambda path: {'out_mb': round(os.path.getsize(path) / 2 ** 20, 1)})
+            results.extend(benchmark_size(csv_path, num_edges, work_dir))
+    finally:
+        if args.work_dir is None:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        'commit': commit,
+        'timestamp': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'cpus': os.cpu_count(),
+        'results': results,
+    }
+    output = args.output or f"benchmark-{commit or 'local'}.json"
+    with open(output, 'w') as out:
+        json.dump(report, out, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        with open(args.compare) as baseline:
+            print(compare_results(json.load(baseline), report).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
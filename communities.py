@@ -0,0 +1,177 @@
+import os
+import numpy as np
+import pandas as pd
+import networkx as nx
+from ingest import cache_path_for, is_current_version, remove_stale_caches
+from graph_index import gather_slices
+
+# --- Community detection and aggregated super-node view of the full network ---
+
+
+def aggregate_pairs(graph_index, edges):
+    """
+    Collapses parallel edges into undirected node pairs with summed connection strength.
+    Self-loops are dropped.
+    """
+    src = np.asarray(graph_index.edge_src)
+    dst = np.asarray(graph_index.edge_dst)
+    lo, hi = np.minimum(src, dst), np.maximum(src, dst)
+    keep = lo != hi
+    strength = np.nan_to_num(edges['Overall Connection Strength'].to_numpy(dtype=float))[keep]
+    keys, inverse = np.unique(lo[keep] * graph_index.num_nodes + hi[keep], return_inverse=True)
+    weights = np.bincount(inverse, weights=strength, minlength=len(keys))
+    return keys // graph_index.num_nodes, keys % graph_index.num_nodes, weights
+
+
+def detect_communities(graph_index, edges, seed=42, resolution=1.0):
+    """
+    Louvain communities over the full graph, weighted by connection strength.
+    Returns one label per node id; label 0 is the largest community.
+    """
+    graph = nx.Graph()
+    graph.add_nodes_from(range(graph_index.num_nodes))
+    src, dst, weights = aggregate_pairs(graph_index, edges)
+    graph.add_weighted_edges_from(zip(src.tolist(), dst.tolist(), weights.tolist()))
+    parts = nx.community.louvain_communities(graph, weight='weight', resolution=resolution, seed=seed)
+
+    labels = np.empty(graph_index.num_nodes, dtype=np.int64)
+    for label, members in enumerate(sorted(parts, key=len, reverse=True)):
+        labels[list(members)] = label
+    return labels
+
+
+def update_communities(previous, graph_index, edges, update, rounds=3):
+    """
+    Community labels after an edge change (see graph_index.update_graph_index), without running
+    Louvain over the whole graph again. HCPs whose edges did not change keep their community. The
+    others, and new HCPs, take the community they have the most connection strength to, over a few
+    rounds of local label propagation. Labels are then renumbered so that 0 is the largest community.
+    """
+    old_ids = update.old_node_ids(graph_index.num_nodes)
+    labels = np.where(old_ids >= 0, np.asarray(previous)[np.maximum(old_ids, 0)], -1)
+    touched = update.touched
+    offsets = np.asarray(graph_index.offsets)
+    entries = gather_slices(offsets, touched)
+    owners = np.repeat(np.arange(len(touched), dtype=np.int64), np.diff(offsets)[touched])
+    neighbors = np.asarray(graph_index.neighbors)[entries]
+    strength = edges['Overall Connection Strength'].to_numpy(dtype=float)[np.asarray(graph_index.edge_rows)[entries]]
+    strength = np.maximum(np.nan_to_num(strength), 0)
+    not_self = neighbors != touched[owners]
+    owners, neighbors, strength = owners[not_self], neighbors[not_self], strength[not_self]
+
+    for _ in range(rounds):
+        neighbor_labels = labels[neighbors]
+        labeled = neighbor_labels >= 0
+        width = max(int(labels.max()) + 1, 1) if len(labels) else 1
+        keys, inverse = np.unique(owners[labeled] * width + neighbor_labels[labeled], return_inverse=True)
+        totals = np.bincount(inverse, weights=strength[labeled], minlength=len(keys))
+        # Strongest community per HCP; ties go to the larger (lower-numbered) community
+        order = np.lexsort((keys % width, -totals, keys // width))
+        best_owner, first = np.unique(keys[order] // width, return_index=True)
+        labels[touched[best_owner]] = keys[order][first] % width
+
+    # HCPs not tied to any community yet each start their own
+    isolated = np.flatnonzero(labels < 0)
+    if len(isolated):
+        labels[isolated] = labels.max() + 1 + np.arange(len(isolated))
+    sizes = np.bincount(labels)
+    ranks = np.empty(len(sizes), dtype=np.int64)
+    ranks[np.argsort(-sizes, kind='stable')] = np.arange(len(sizes))
+    return ranks[labels]
+
+
+def save_communities(labels, path):
+    tmp_path = f"{path}.tmp-{os.getpid()}.npy"
+    np.save(tmp_path, labels)
+    os.replace(tmp_path, path)
+
+
+def load_communities(csv_path, graph_index, edges, cache_dir=None, version=None):
+    """
+    Returns community labels for a version of csv_path (by default the current one), computing them
+    the first time; they are persisted only while that version is current.
+    """
+    path = cache_path_for(csv_path, '.communities.npy', cache_dir, version)
+    if not os.path.exists(path):
+        labels = detect_communities(graph_index, edges)
+        if not is_current_version(csv_path, version, cache_dir):
+            return labels
+        save_communities(labels, path)
+        remove_stale_caches(path, '.communities.npy')
+    return np.load(path, mmap_mode='r')
+
+
+def community_overview(graph_index, edges, labels, max_communities=100, members_per_community=25):
+    """
+    Builds the level-of-detail view: the largest communities as super-nodes with summed
+    inter-community edge weights, plus the top members of each community for drill-down.
+    """
+    nodes = graph_index.nodes
+    labels = np.asarray(labels)
+    num_communities = int(labels.max()) + 1 if len(labels) else 0
+    shown = min(max_communities, num_communities)
+
+    # Super-nodes
+    sizes = np.bincount(labels, minlength=num_communities)
+    connections = nodes['connections'].to_numpy(dtype=float)
+    influence = nodes['influence'].to_numpy(dtype=float)
+    member_order = np.lexsort((-np.nan_to_num(connections, nan=-np.inf), labels))
+    starts = np.concatenate([[0], np.cumsum(sizes)])
+    super_nodes = pd.DataFrame({
+        'community': np.arange(shown),
+        'size': sizes[:shown],
+        'top_npi': graph_index.npis[member_order[starts[:shown]]] if shown else [],
+        'top_name': nodes['hcp_name'].to_numpy()[member_order[starts[:shown]]] if shown else [],
+        'avg_influence': (np.bincount(labels, weights=np.nan_to_num(influence), minlength=num_communities)[:shown] /
+                          np.maximum(sizes[:shown], 1)),
+    })
+    state_counts = pd.DataFrame({'community': labels, 'state': nodes['state'].astype(object)})
+    state_counts = state_counts[state_counts['community'] < shown].dropna()
+    top_states = state_counts.groupby('community')['state'].agg(lambda x: ", ".join(x.value_counts().index[:3]))
+    super_nodes['top_states'] = super_nodes['community'].map(top_states).fillna('N/A')
+    super_nodes['members_shown'] = np.minimum(super_nodes['size'], members_per_community)
+
+    # Super-edges: summed strength between displayed communities
+    src, dst, weights = aggregate_pairs(graph_index, edges)
+    c_src, c_dst = labels[src], labels[dst]
+    lo, hi = np.minimum(c_src, c_dst), np.maximum(c_src, c_dst)
+    keep = (lo != hi) & (hi < shown)
+    keys, inverse, counts = np.unique(lo[keep] * shown + hi[keep], return_inverse=True, return_counts=True)
+    super_edges = pd.DataFrame({
+        'source': keys // max(shown, 1), 'target': keys % max(shown, 1),
+        'weight': np.bincount(inverse, weights=weights[keep], minlength=len(keys)), 'count': counts
+    })
+
+    # Drill-down members: top members per displayed community, their internal edges and their
+    # summed links to other displayed communities
+    rank_in_community = np.empty(len(labels), dtype=np.int64)
+    rank_in_community[member_order] = np.arange(len(labels)) - starts[labels[member_order]]
+    is_member = (labels < shown) & (rank_in_community < members_per_community)
+    member_ids = np.flatnonzero(is_member)
+    members = nodes.iloc[member_ids].assign(community=labels[member_ids])
+
+    member_edge_rows = graph_index.induced_edge_rows(member_ids)
+    member_edges = edges.iloc[member_edge_rows][['NPI_1', 'NPI_2', 'Overall Connection Strength']]
+    same = labels[graph_index.edge_src[member_edge_rows]] == labels[graph_index.edge_dst[member_edge_rows]]
+    member_edges = member_edges[same].assign(community=labels[graph_index.edge_src[member_edge_rows][same]])
+
+    m_src = np.concatenate([src, dst])
+    m_dst = np.concatenate([dst, src])
+    m_weights = np.concatenate([weights, weights])
+    link = is_member[m_src] & (labels[m_dst] < shown) & (labels[m_dst] != labels[m_src])
+    link_keys, link_inverse = np.unique(m_src[link] * shown + labels[m_dst[link]], return_inverse=True)
+    member_links = pd.DataFrame({
+        'NPI': graph_index.npis[link_keys // max(shown, 1)],
+        'community': labels[link_keys // max(shown, 1)],
+        'target_community': link_keys % max(shown, 1),
+        'weight': np.bincount(link_inverse, weights=m_weights[link], minlength=len(link_keys)),
+    })
+
+    return {
+        'num_communities': num_communities,
+        'super_nodes': super_nodes,
+        'super_edges': super_edges,
+        'members': members,
+        'member_edges': member_edges,
+        'member_links': member_links,
+    }
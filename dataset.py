@@ -0,0 +1,188 @@
+import os
+import threading
+import numpy as np
+from ingest import cache_path_for, current_version, load_edge_table
+from graph_index import load_graph_index
+from summaries import load_summary_store
+from node_query import NodeQueryIndex
+from communities import load_communities
+from analytics import load_analytics
+from paths import shortest_path, strongest_path
+from name_search import NameSearchIndex
+from similarity import load_similarity_index
+
+# --- Shared, read-only dataset: one instance per version of the edge file for the whole process ---
+
+
+class Dataset:
+    """
+    Everything derived from one version of the edge file: the compact edge table, the graph index
+    with its node table, and the summary store. Instances are shared by every session, so nothing
+    here is mutated after construction; secondary indexes are built lazily, once, under a lock.
+    """
+
+    def __init__(self, csv_path, version, edges, graph_index, summary_store, cache_dir=None):
+        self.csv_path = csv_path
+        self.cache_dir = cache_dir
+        self.version = version
+        self.edges = edges
+        self.graph_index = graph_index
+        self.summary_store = summary_store
+        self._lock = threading.RLock()
+        # Community detection can run for minutes; it must not hold up the other lazy indexes
+        self._community_lock = threading.Lock()
+        self._query_index = None
+        self._community_labels = None
+        self._analytics = None
+        self._search_index = None
+        self._similarity_index = None
+
+    @property
+    def nodes(self):
+        return self.graph_index.nodes
+
+    @property
+    def query_index(self):
+        """
+        Pre-sorted node query index used by the sidebar filters.
+        """
+        with self._lock:
+            if self._query_index is None:
+                self._query_index = NodeQueryIndex(self.nodes)
+        return self._query_index
+
+    @property
+    def search_index(self):
+        """
+        Name/NPI typeahead index over the node table.
+        """
+        with self._lock:
+            if self._search_index is None:
+                self._search_index = NameSearchIndex(self.nodes)
+        return self._search_index
+
+    def query_index_for(self, metric):
+        """
+        The node query index with `metric` registered. An analytics metric is added on first use to a
+        copy of the index, which then replaces the shared one; indexes already handed out never change.
+        """
+        index = self.query_index
+        if metric in index.values:
+            return index
+        with self._lock:
+            if metric not in self._query_index.values:
+                self._query_index = self._query_index.with_metric(metric, self.analytics[metric].to_numpy())
+            return self._query_index
+
+    @property
+    def analytics(self):
+        """
+        Centrality metrics per node id (weighted degree, PageRank, eigenvector, betweenness),
+        computed on first use.
+        """
+        with self._lock:
+            if self._analytics is None:
+                self._analytics = load_analytics(
+                    self.csv_path, self.graph_index, self.edges, self.cache_dir, self.version
+                )
+        return self._analytics
+
+    def ego_network(self, npi, hops=1, min_strength=None, max_strength=None, max_fanout=None, max_nodes=None):
+        """
+        The k-hop neighborhood of an HCP: node rows with their 'hop' distance (center first) and
+        the edges among them within the strength window. Raises KeyError for an unknown NPI.
+        """
+        node_id = self.graph_index.node_id(npi)
+        if node_id is None:
+            raise KeyError(npi)
+        node_ids, distances = self.graph_index.ego_node_ids(
+            node_id, hops, min_strength, max_strength, max_fanout, max_nodes
+        )
+        edge_rows = self.graph_index.induced_edge_rows(node_ids, min_strength, max_strength)
+        return self.nodes.iloc[node_ids].assign(hop=distances), self.edges.iloc[edge_rows]
+
+    def collaboration_path(self, source_npi, target_npi, strongest=False, time_budget=None):
+        """
+        How two HCPs are connected: the fewest-hop path, or with strongest=True the path of
+        strongest collaborations. Returns the node rows and edge rows along the path, in order from
+        source to target, or None if they are not connected. Raises KeyError for an unknown NPI and
+        TimeoutError past time_budget seconds.
+        """
+        source, target = self.graph_index.node_id(source_npi), self.graph_index.node_id(target_npi)
+        if source is None or target is None:
+            raise KeyError(source_npi if source is None else target_npi)
+        search = strongest_path if strongest else shortest_path
+        path = search(self.graph_index, source, target, time_budget)
+        if path is None:
+            return None
+        node_ids, edge_rows = path
+        return self.nodes.iloc[node_ids], self.edges.iloc[edge_rows]
+
+    @property
+    def similarity_index(self):
+        """
+        MinHash/LSH index over neighbor sets for similar-HCP lookups, built on first use.
+        """
+        with self._lock:
+            if self._similarity_index is None:
+                self._similarity_index = load_similarity_index(
+                    self.csv_path, self.graph_index, self.edges, self.cache_dir, self.version
+                )
+        return self._similarity_index
+
+    def similar_hcps(self, npi, k=10):
+        """
+        The k HCPs whose collaborators overlap most with this HCP's: node rows with the estimated
+        'similarity' (Jaccard of the neighbor sets) and the exact 'shared_collaborators' count,
+        most similar first. Raises KeyError for an unknown NPI.
+        """
+        node_id = self.graph_index.node_id(npi)
+        if node_id is None:
+            raise KeyError(npi)
+        node_ids, estimates = self.similarity_index.similar(node_id, k)
+        own = np.setdiff1d(self.graph_index.neighbor_ids(node_id), [node_id])
+        shared = [len(np.intersect1d(own, self.graph_index.neighbor_ids(other))) for other in node_ids]
+        return self.nodes.iloc[node_ids].assign(similarity=estimates, shared_collaborators=shared)
+
+    @property
+    def communities_ready(self):
+        """
+        Whether community_labels returns without running detection (labels loaded or persisted).
+        """
+        if self._community_labels is not None:
+            return True
+        return os.path.exists(cache_path_for(self.csv_path, '.communities.npy', self.cache_dir, self.version))
+
+    def detect_communities_in_background(self):
+        """
+        Starts community detection on a daemon thread unless the labels are already persisted, so
+        the first Community Overview does not run Louvain inside a rerun. Readers of
+        community_labels wait for it under the lock instead of detecting a second time.
+        """
+        if not self.communities_ready:
+            threading.Thread(target=lambda: self.community_labels, name='community-detection', daemon=True).start()
+
+    @property
+    def community_labels(self):
+        """
+        Community label per node id, detected on first use.
+        """
+        with self._community_lock:
+            if self._community_labels is None:
+                self._community_labels = load_communities(
+                    self.csv_path, self.graph_index, self.edges, self.cache_dir, self.version
+                )
+        return self._community_labels
+
+
+def load_dataset(csv_path, cache_dir=None, version=None):
+    """
+    Loads (or builds and persists) every artifact for a version of csv_path, by default the
+    current one (the export plus any deltas applied on top of it).
+    """
+    if version is None:
+        version = current_version(csv_path, cache_dir)
+    edges = load_edge_table(csv_path, cache_dir, version=version)
+    graph_index = load_graph_index(csv_path, edges, cache_dir, version)
+    summary_store = load_summary_store(csv_path, graph_index, edges, cache_dir, version)
+    return Dataset(csv_path, version, edges, graph_index, summary_store, cache_dir)
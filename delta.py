@@ -0,0 +1,178 @@
+import argparse
+import datetime
+import hashlib
+import os
+import time
+import numpy as np
+import pandas as pd
+from ingest import (CATEGORY_COLUMNS, EDGE_COLUMNS, EDGE_TABLE_SUFFIX, NPI_COLUMNS, CategoryDictionary, cache_path_for,
+                    file_fingerprint, load_edge_table, normalize_edge_dtypes, read_feather_mmap, write_feather_atomic, write_edge_table,
+                    read_delta_manifest, write_delta_manifest, remove_stale_caches)
+from graph_index import gather_slices, update_node_table, update_graph_index, save_graph_index
+from summaries import update_summary_store, save_summary_store
+from analytics import update_analytics
+from communities import update_communities, save_communities
+from dataset import load_dataset
+
+# --- Incremental refresh: apply add/update/delete edge files on top of the current dataset version ---
+
+ACTION_COLUMN = 'Action'
+ACTIONS = ['add', 'update', 'delete']
+# Every per-version artifact, so the previous version's files can go once the new one is published
+ARTIFACT_SUFFIXES = ['.feather', EDGE_TABLE_SUFFIX, '.nodes.feather', '.index', '.summaries', '.analytics.feather', '.communities.npy',
+                     '.similarity']
+
+
+def read_edge_delta(delta_path):
+    """
+    Parses a delta file: rows in the export layout plus an Action column. 'delete' removes every
+    edge between that HCP pair (in either orientation), 'update' replaces them with the rows given
+    and 'add' appends rows. Delete rows only need the two NPIs. Returns (pairs to remove, typed rows
+    to add or None).
+    """
+    df = pd.read_csv(delta_path, low_memory=False, dtype={col: 'category' for col in CATEGORY_COLUMNS})
+    if ACTION_COLUMN not in df.columns:
+        raise KeyError(ACTION_COLUMN)
+    actions = df.pop(ACTION_COLUMN).astype(str).str.strip().str.lower()
+    unknown = sorted(set(actions) - set(ACTIONS))
+    if unknown:
+        raise ValueError(f"Unknown delta action(s): {', '.join(unknown)}")
+
+    pairs = df.loc[actions.isin(['update', 'delete']).to_numpy(), NPI_COLUMNS]
+    pairs = pairs.apply(pd.to_numeric, errors='coerce').dropna().astype('int64')
+    adding = actions.isin(['add', 'update']).to_numpy()
+    if not adding.any():
+        return pairs, None
+    added = normalize_edge_dtypes(df[adding].reset_index(drop=True))
+    for col in CATEGORY_COLUMNS:
+        if col in added.columns:
+            added[col] = added[col].cat.remove_unused_categories()
+    return pairs, added
+
+
+def pair_edge_rows(graph_index, pairs):
+    """
+    Edge rows between each listed HCP pair, in either orientation, found through the adjacency of
+    the first HCP of each pair.
+    """
+    first = graph_index.node_ids(pairs['NPI_1'].to_numpy())
+    second = graph_index.node_ids(pairs['NPI_2'].to_numpy())
+    known = (first >= 0) & (second >= 0)
+    first, second = first[known], second[known]
+    entries = gather_slices(np.asarray(graph_index.offsets), first)
+    owners = np.repeat(np.arange(len(first), dtype=np.int64), np.diff(graph_index.offsets)[first])
+    match = np.asarray(graph_index.neighbors)[entries] == second[owners]
+    return np.unique(np.asarray(graph_index.edge_rows)[entries[match]])
+
+
+def append_edge_rows(full, kept_rows, added):
+    """
+    The kept rows of the typed edge table followed by the added rows. Category dictionaries only
+    grow, so existing codes, and the metric columns derived from them, keep their meaning.
+    """
+    added = added.reindex(columns=full.columns)
+    for col in full.columns:
+        if isinstance(full[col].dtype, pd.CategoricalDtype):
+            dictionary = CategoryDictionary()
+            dictionary.conform(full[col])
+            added[col] = dictionary.conform(added[col].astype('category'))
+            full[col] = full[col].cat.set_categories(dictionary.categories)
+        else:
+            added[col] = added[col].astype(full[col].dtype)
+    return pd.concat([full[kept_rows], added], ignore_index=True)
+
+
+def _next_version(version, delta_path):
+    key = f"{version}|{file_fingerprint(delta_path)}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def apply_delta(csv_path, delta_path, cache_dir=None):
+    """
+    Applies one delta file on top of the current version of csv_path and publishes the result as a
+    new dataset version. Only the HCPs on changed edges are aggregated again; the adjacency,
+    summary store and (if already computed) analytics and communities are updated in place of a
+    rebuild. Every artifact of the new version is written before the delta record is replaced
+    atomically, so running sessions switch over on their next rerun without a cold load. Meant for
+    one writer at a time. Returns a dict describing the change.
+    """
+    start = time.perf_counter()
+    dataset = load_dataset(csv_path, cache_dir)
+    graph_index = dataset.graph_index
+    pairs, added = read_edge_delta(delta_path)
+    full = load_edge_table(csv_path, cache_dir, columns=None, version=dataset.version)
+    if added is None:
+        added = full.iloc[:0]
+
+    removed = pair_edge_rows(graph_index, pairs)
+    kept_rows = np.ones(graph_index.num_edges, dtype=bool)
+    kept_rows[removed] = False
+    full = append_edge_rows(full, kept_rows, added)
+    edges = full[[col for col in EDGE_COLUMNS if col in full.columns]]
+
+    # HCPs on changed edges, and every edge of the new table that touches them
+    ends = np.concatenate([graph_index.edge_src[removed], graph_index.edge_dst[removed]])
+    npis = np.union1d(graph_index.npis[ends], added[NPI_COLUMNS].to_numpy().ravel())
+    old_ids = graph_index.node_ids(npis)
+    rows = np.unique(np.asarray(graph_index.edge_rows)[gather_slices(np.asarray(graph_index.offsets), old_ids[old_ids >= 0])])
+    num_kept = int(kept_rows.sum())
+    rows = np.concatenate([
+        (np.cumsum(kept_rows) - 1)[rows[kept_rows[rows]]], num_kept + np.arange(len(added), dtype=np.int64)
+    ])
+
+    nodes = update_node_table(graph_index.nodes, full, npis, rows)
+    new_index, update = update_graph_index(graph_index, nodes, kept_rows, added)
+
+    version = _next_version(dataset.version, delta_path)
+    write_edge_table(full, cache_path_for(csv_path, '.feather', cache_dir, version))
+    write_edge_table(edges, cache_path_for(csv_path, EDGE_TABLE_SUFFIX, cache_dir, version), chunksize=None)
+    save_graph_index(new_index, cache_path_for(csv_path, '.index', cache_dir, version))
+    save_summary_store(update_summary_store(dataset.summary_store, new_index, edges, update),
+                       cache_path_for(csv_path, '.summaries', cache_dir, version))
+    # Analytics are carried forward only if the previous version had them
+    previous = cache_path_for(csv_path, '.analytics.feather', cache_dir, dataset.version)
+    if os.path.exists(previous):
+        write_feather_atomic(update_analytics(read_feather_mmap(previous), new_index, edges, update),
+                             cache_path_for(csv_path, '.analytics.feather', cache_dir, version))
+    # So are communities; without them the dashboard detects them in the background (see Dataset)
+    previous = cache_path_for(csv_path, '.communities.npy', cache_dir, dataset.version)
+    if os.path.exists(previous):
+        save_communities(update_communities(np.load(previous), new_index, edges, update),
+                         cache_path_for(csv_path, '.communities.npy', cache_dir, version))
+
+    change = {
+        'path': os.path.abspath(delta_path),
+        'applied': datetime.datetime.now().isoformat(timespec='seconds'),
+        'rows_removed': int(len(removed)),
+        'rows_added': int(len(added)),
+        'hcps_touched': int(len(update.touched)),
+    }
+    manifest = read_delta_manifest(csv_path, cache_dir)
+    if manifest is None or manifest['version'] != dataset.version:
+        manifest = {'base': file_fingerprint(csv_path), 'deltas': []}
+    manifest['deltas'].append(change)
+    manifest['version'] = version
+    write_delta_manifest(csv_path, manifest, cache_dir)
+    for suffix in ARTIFACT_SUFFIXES:
+        remove_stale_caches(cache_path_for(csv_path, suffix, cache_dir, version), suffix)
+
+    return {**change, 'version': version, 'edges': new_index.num_edges, 'hcps': new_index.num_nodes,
+            'seconds': round(time.perf_counter() - start, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply add/update/delete edge files to the HCP dataset without a full rebuild.")
+    parser.add_argument('data', help="the edge export the deltas apply to, e.g. 'Main DB_1.csv'")
+    parser.add_argument('deltas', nargs='+', help="delta CSV files, applied in order")
+    parser.add_argument('--cache-dir', default=None)
+    args = parser.parse_args()
+
+    for delta_path in args.deltas:
+        result = apply_delta(args.data, delta_path, args.cache_dir)
+        print(f"{delta_path}: -{result['rows_removed']:,} / +{result['rows_added']:,} edges, "
+              f"{result['hcps_touched']:,} HCPs touched -> version {result['version']} "
+              f"({result['edges']:,} edges, {result['hcps']:,} HCPs) in {result['seconds']:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,366 +1,210 @@
 import pandas as pd
-import networkx as nx
-from pyvis.network import Network
 import streamlit as st
-from streamlit.components.v1 import html
-import tempfile
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+import hashlib
 import os
-import math
+import numpy as np
+from ingest import current_version
+from dataset import load_dataset
+from communities import community_overview
+from analytics import ANALYTIC_METRICS
+from layout import compute_layout
+from render import (build_node_records, build_edge_records, build_community_records, network_options_json,
+                    community_network_html, highlight_path)
+from live_network import live_network, reset_live_network
+from instrumentation import instrumented_cache, stage, begin_rerun, end_rerun, cache_totals
+from query_api import filtered_nodes, induced_edge_rows, neighborhood, collaboration_path, hcp_summary
+
+# Edge export: one CSV, a directory of CSVs (e.g. one per region) or a glob pattern
+DATA_FILE = os.environ.get('HCP_DATA_SOURCE', "Main DB_1.csv")
+
+# Cached results are keyed on the dataset version token instead of hashing the frames themselves;
+# entries are evicted after CACHE_TTL seconds or when a function exceeds its entry budget.
+CACHE_TTL = 3600
+
+# "Select Top HCPs By" labels and the node metric each one ranks by
+SORT_OPTIONS = {
+    "No. of Connections": 'connections',
+    "Influence Score": 'influence',
+    "Weighted Degree": 'weighted_degree',
+    "PageRank": 'pagerank',
+    "Eigenvector Centrality": 'eigenvector',
+    "Betweenness (sampled)": 'betweenness',
+}
+
+# Matches offered by the HCP search boxes
+SEARCH_RESULTS = 20
 
 # --- 1. Data Processing and Graph Creation Functions ---
 
-@st.cache_data
-def get_all_hcps_details(df):
+def subgraph_key(nodes_df, edges_df):
     """
-    Computes aggregated details for all HCPs from the dataframe.
+    Cheap content key for a rendered subgraph: a digest of its node NPIs and edge rows.
     """
-    hcp1_cols = ['NPI_1', 'HCP_1', 'No. of Connections HCP 1', 'Influence score_1', 'City1', 'State1', 'Papers', 'Panels', 'Trials']
-    hcp2_cols = ['NPI_2', 'HCP_2', 'No. of Connections HCP 2', 'Influence score_2', 'City2', 'State2', 'Papers', 'Panels', 'Trials']
-    common_cols = ['NPI', 'hcp_name', 'connections', 'influence', 'city', 'state', 'papers', 'panels', 'trials']
-
-    hcp1_renamed = df[hcp1_cols].rename(columns=dict(zip(hcp1_cols, common_cols)))
-    hcp2_renamed = df[hcp2_cols].rename(columns=dict(zip(hcp2_cols, common_cols)))
-    
-    all_hcps_details = pd.concat([hcp1_renamed, hcp2_renamed]).groupby('NPI', as_index=False).agg(
-        hcp_name=('hcp_name', lambda x: x.dropna().iloc[0] if not x.dropna().empty else 'N/A'),
-        connections=('connections', 'max'),
-        influence=('influence', 'first'),
-        city=('city', 'first'),
-        state=('state', 'first'),
-        papers=('papers', lambda x: x.fillna(0).max()),
-        panels=('panels', lambda x: x.fillna(0).max()),
-        trials=('trials', lambda x: x.fillna(0).max())
-    )
-    return all_hcps_details
+    digest = hashlib.sha1()
+    if not nodes_df.empty:
+        digest.update(np.ascontiguousarray(nodes_df['NPI'].to_numpy(dtype=np.int64)).tobytes())
+    digest.update(b'|')
+    if not edges_df.empty:
+        digest.update(np.ascontiguousarray(edges_df.index.to_numpy(dtype=np.int64)).tobytes())
+    return digest.hexdigest()
+
+@instrumented_cache(st.cache_resource(max_entries=2))
+def get_dataset(dataset_version):
+    """
+    Loads the dataset once per version; every session shares this single read-only instance.
+    Communities not yet persisted for the version are detected in the background from here.
+    """
+    dataset = load_dataset(DATA_FILE, version=dataset_version)
+    dataset.detect_communities_in_background()
+    return dataset
 
-@st.cache_data
-def get_filtered_nodes(_all_hcps_details, top_n=50, selected_states=None, selected_cities=None,
+@instrumented_cache(st.cache_data(ttl=CACHE_TTL, max_entries=64))
+def get_filtered_nodes(dataset_version, _dataset, top_n=50, selected_states=None, selected_cities=None,
                       min_connections=0, min_influence=0, min_papers=0, min_panels=0, min_trials=0,
                       sort_by='connections'):
     """
     Filters HCPs (nodes) based on all criteria and sorts by specified metric.
     """
-    filtered_nodes_df = _all_hcps_details.copy()
+    return filtered_nodes(_dataset, top_n, selected_states, selected_cities, min_connections, min_influence,
+                          min_papers, min_panels, min_trials, sort_by)
+
+@instrumented_cache(st.cache_data(ttl=CACHE_TTL, max_entries=64))
+def get_filtered_edge_rows(dataset_version, _dataset, filtered_node_npis, min_strength, max_strength):
+    """
+    Returns the edge table rows within the strength range whose endpoints are both in filtered_node_npis,
+    answered from the strength-sorted adjacency of those nodes.
+    """
+    return induced_edge_rows(_dataset, filtered_node_npis, min_strength, max_strength)
 
-    if selected_states:
-        filtered_nodes_df = filtered_nodes_df[filtered_nodes_df['state'].isin(selected_states)]
-    if selected_cities:
-        filtered_nodes_df = filtered_nodes_df[filtered_nodes_df['city'].isin(selected_cities)]
+@instrumented_cache(st.cache_data(ttl=CACHE_TTL, max_entries=32))
+def get_ego_network(dataset_version, _dataset, npi, hops, min_strength, max_strength, max_fanout, max_nodes):
+    """
+    Returns the k-hop neighborhood of an HCP (nodes with their hop distance, and the edges among
+    them), answered by a breadth-first search over the adjacency index.
+    """
+    return neighborhood(_dataset, npi, hops, min_strength, max_strength, max_fanout, max_nodes)
 
-    filtered_nodes_df = filtered_nodes_df[
-        (filtered_nodes_df['connections'] >= min_connections) &
-        (filtered_nodes_df['influence'] >= min_influence) &
-        (filtered_nodes_df['papers'] >= min_papers) &
-        (filtered_nodes_df['panels'] >= min_panels) &
-        (filtered_nodes_df['trials'] >= min_trials)
-    ]
-    
-    if not filtered_nodes_df.empty:
-        filtered_nodes_df = filtered_nodes_df.nlargest(min(top_n, len(filtered_nodes_df)), sort_by)
-    else:
-        return pd.DataFrame()
-    return filtered_nodes_df
-
-@st.cache_data
-def get_filtered_edges_for_display(_original_df, filtered_node_npis, min_strength, max_strength):
-    """
-    Filters edges based on connection strength and ensures both connected nodes are in filtered_node_npis.
-    """
-    if not filtered_node_npis:
-        return pd.DataFrame()
-
-    filtered_edges = _original_df[
-        (_original_df['NPI_1'].isin(filtered_node_npis)) & 
-        (_original_df['NPI_2'].isin(filtered_node_npis)) &
-        (_original_df['Overall Connection Strength'] >= min_strength) & 
-        (_original_df['Overall Connection Strength'] <= max_strength)
-    ].copy()
-    return filtered_edges
-
-@st.cache_data
-def create_pyvis_network(_nodes_df, _edges_df, enable_physics,
-                        global_min_connections, global_max_connections,
-                        global_min_edge_strength, global_max_edge_strength):
+@instrumented_cache(st.cache_data(ttl=CACHE_TTL, max_entries=32))
+def get_collaboration_path(dataset_version, _dataset, source_npi, target_npi, strongest, min_strength, max_strength):
     """
-    Creates an interactive Pyvis network.
+    Finds how two HCPs are connected and the subgraph shown around the path: every HCP on it plus
+    their strongest collaborators. Returns (nodes, edges, path nodes, path edges), or None if the
+    HCPs are not connected.
     """
-    net = Network(
-        height="900px", width="100%", bgcolor="#0a0a0a", font_color=None,
-        directed=True, notebook=False, heading=""
-    )
-    
-    net.force_atlas_2based(
-        gravity=-500, central_gravity=0.03,
-        spring_length=400, spring_strength=0.002,
-        damping=1.5, overlap=1
+    return collaboration_path(_dataset, source_npi, target_npi, strongest, min_strength, max_strength)
+
+@instrumented_cache(st.cache_data(ttl=CACHE_TTL, max_entries=32))
+def compute_network_layout(dataset_version, graph_key, _nodes_df, _edges_df):
+    """
+    Computes fixed node coordinates for the displayed subgraph on the server.
+    """
+    if _nodes_df.empty:
+        return {}
+    if _edges_df.empty:
+        return compute_layout(_nodes_df['NPI'].to_numpy(), [], [])
+    return compute_layout(
+        _nodes_df['NPI'].to_numpy(), _edges_df['NPI_1'].to_numpy(), _edges_df['NPI_2'].to_numpy(),
+        _edges_df['Overall Connection Strength'].to_numpy()
     )
-    net.toggle_physics(enable_physics)
 
-    if not _nodes_df.empty:
-        for index, node_data in _nodes_df.iterrows():
-            node = node_data['NPI']
-            hcp_name = node_data.get('hcp_name', str(node))
-            connections = node_data.get('connections', 0)
-            
-            norm_connections = 0.5 if (global_max_connections - global_min_connections) == 0 else \
-                              max(0, min(1, (connections - global_min_connections) / (global_max_connections - global_min_connections)))
-            size = 15 + norm_connections * (70 - 15)
-
-            bg_color = 'hsl(120, 100%, 40%)'
-            border_color = 'hsl(60, 100%, 30%)'
-
-            tooltip = f"""
-            NPI ID: {node}<br/>
-            HCP Name: {hcp_name}<br/>
-            Connections: {connections}<br/>
-            Influence Score: {node_data.get('influence', 0):.2f}<br/>
-            Location: {node_data.get('city', 'N/A')}, {node_data.get('state', 'N/A')}<br/>
-            Papers: {node_data.get('papers', 0)}<br/>
-            Panels: {node_data.get('panels', 0)}<br/>
-            Trials: {node_data.get('trials', 0)}
-            """
-
-            net.add_node(
-                node, label=hcp_name, size=size, shape='dot',
-                color={'background': bg_color, 'border': border_color, 'highlight': {'background': '#FFD700', 'border': '#FFA500'}},
-                title=tooltip, borderWidth=2, borderWidthSelected=4,
-                font={'size': 35, 'color': '#FFFFFF', 'bold': True},
-                mass=max(1, connections / 50),
-                physics=enable_physics
-            )
+@instrumented_cache(st.cache_data(ttl=CACHE_TTL, max_entries=32))
+def build_network_records(dataset_version, graph_key, _nodes_df, _edges_df, enable_physics,
+                          global_min_connections, global_max_connections,
+                          global_min_edge_strength, global_max_edge_strength, path=None):
+    """
+    Builds the vis.js records of the interactive network. `path` ((NPIs, edge rows)) is highlighted
+    when given. Returns (node records, edge records, options JSON).
+    """
+    # Precomputed coordinates keep the layout stable across reruns; with physics enabled they
+    # only seed the browser simulation
+    positions = compute_network_layout(dataset_version, graph_key, _nodes_df, _edges_df)
 
-    if not _edges_df.empty:
-        for index, edge_data in _edges_df.iterrows():
-            u, v = edge_data['NPI_1'], edge_data['NPI_2']
-            weight = edge_data.get('Overall Connection Strength', 0)
-            
-            if net.get_node(u) and net.get_node(v):
-                norm_weight = 0.5 if (global_max_edge_strength - global_min_edge_strength) == 0 else \
-                             max(0, min(1, (weight - global_min_edge_strength) / (global_max_edge_strength - global_min_edge_strength)))
-                width = 1 + norm_weight * (10 - 1)
-
-                infl_u = _nodes_df[_nodes_df['NPI'] == u]['influence'].iloc[0] if not _nodes_df[_nodes_df['NPI'] == u].empty else 0
-                infl_v = _nodes_df[_nodes_df['NPI'] == v]['influence'].iloc[0] if not _nodes_df[_nodes_df['NPI'] == v].empty else 0
-                source_node, target_node = (u, v) if infl_u >= infl_v else (v, u)
-
-                edge_color = f'rgba(135, 206, 235, {0.4 + norm_weight * 0.5})'
-                net.add_edge(
-                    source_node, target_node, width=width, color={'color': edge_color, 'highlight': 'rgba(255, 255, 0, 0.9)'},
-                    arrows={'to': {'enabled': True, 'scaleFactor': 0.8}},
-                    arrowStrikethrough=False,
-                    smooth={'type': 'curvedCW', 'roundness': 0.15},
-                    physics=enable_physics
-                )
+    # Node and edge attributes are computed column-wise
+    node_records = build_node_records(_nodes_df, enable_physics, global_min_connections, global_max_connections, positions)
+    edge_records = build_edge_records(_edges_df, _nodes_df, enable_physics, global_min_edge_strength, global_max_edge_strength)
+    if path is not None:
+        highlight_path(node_records, edge_records, *path)
 
-    javascript_code = """
-    function setupNetworkInteractivity(network) {
-        network.on("click", function (properties) {
-            if (properties.nodes.length === 0) {
-                network.body.data.nodes.forEach(function(node) {
-                    node.color = { background: node.color.background, border: node.color.border };
-                    node.borderWidth = 2;
-                });
-                network.body.data.nodes.update(network.body.data.nodes.get());
-                return;
-            }
+    return node_records, edge_records, network_options_json(enable_physics)
 
-            var nodeId = properties.nodes[0];
-            if (nodeId) {
-                var connectedNodes = network.getConnectedNodes(nodeId);
-                var allNodesToHighlight = [nodeId].concat(connectedNodes);
-                network.body.data.nodes.forEach(function(node) {
-                    if (allNodesToHighlight.includes(node.id)) {
-                        node.color = node.color.highlight;
-                        node.borderWidth = 4;
-                    } else {
-                        node.color = { background: 'rgba(50,50,50,0.2)', border: 'rgba(30,30,30,0.2)' };
-                        node.borderWidth = 1;
-                    }
-                });
-                network.body.data.nodes.update(network.body.data.nodes.get());
-                network.focus(nodeId, { scale: 1.5, animation: { duration: 500 } });
-            }
-        });
-    }
+@instrumented_cache(st.cache_data(ttl=CACHE_TTL, max_entries=8))
+def get_community_overview(dataset_version, _dataset, max_communities=50, members_per_community=25):
     """
-    
-    net.html = net.html.replace(
-        'var network = new vis.Network(container, data, options);',
-        'var network = new vis.Network(container, data, options);\nsetupNetworkInteractivity(network);'
+    Detects communities over the full network and aggregates the largest ones into super-nodes.
+    """
+    return community_overview(_dataset.graph_index, _dataset.edges, _dataset.community_labels, max_communities,
+                              members_per_community)
+
+@instrumented_cache(st.cache_data(ttl=CACHE_TTL, max_entries=8))
+def create_community_network(dataset_version, max_communities, members_per_community, _overview, enable_physics,
+                             global_min_connections, global_max_connections,
+                             global_min_edge_strength, global_max_edge_strength):
+    """
+    Builds the level-of-detail network: one super-node per community, expandable in the browser.
+    """
+    super_nodes, super_edges = _overview['super_nodes'], _overview['super_edges']
+    positions = compute_layout(
+        super_nodes['community'].to_numpy(), super_edges['source'].to_numpy(),
+        super_edges['target'].to_numpy(), np.log1p(super_edges['weight'].to_numpy())
     )
-    net.html = net.html.replace(
-        '</body>',
-        '<script type="text/javascript">' + javascript_code + '</script>\n</body>'
+    return build_community_records(
+        _overview, enable_physics, global_min_connections, global_max_connections,
+        global_min_edge_strength, global_max_edge_strength, positions
     )
-    
-    return net
 
-@st.cache_data
-def generate_hcp_summary_data(selected_npi, _all_hcps_details_df, _original_df, default_top_n=5):
+@instrumented_cache(st.cache_data(ttl=CACHE_TTL, max_entries=256))
+def generate_hcp_summary_data(dataset_version, selected_npi, _dataset, default_top_n=5):
     """
-    Generates HCP summary data with lightweight high-impact metrics.
+    Generates HCP summary data with lightweight high-impact metrics and the most similar HCPs.
     """
-    if selected_npi is None or _all_hcps_details_df.empty:
+    if selected_npi is None or _dataset.nodes.empty:
         return None
-
-    hcp_data = _all_hcps_details_df[_all_hcps_details_df['NPI'] == selected_npi]
-    if hcp_data.empty:
+    try:
+        return hcp_summary(_dataset, selected_npi)
+    except KeyError:
         return None
 
-    hcp_data = hcp_data.iloc[0]
-    total_connections = hcp_data['connections']
-    influence_score = hcp_data['influence']
-    papers, panels, trials = int(hcp_data['papers']), int(hcp_data['panels']), int(hcp_data['trials'])
-    
-    # Influence Rank
-    influence_rank_text = " (only HCP in the network)"
-    influence_percentile = 0
-    if len(_all_hcps_details_df) > 1:
-        influence_percentile = ((_all_hcps_details_df['influence'] < influence_score).sum() / (len(_all_hcps_details_df) - 1) * 100) if influence_score != _all_hcps_details_df['influence'].min() else 0
-        influence_rank_text = f"placing them in the top {100 - influence_percentile:.1f}% of all HCPs"
-
-    # Direct Connections
-    direct_connections_df = _original_df[
-        (_original_df['NPI_1'] == selected_npi) | (_original_df['NPI_2'] == selected_npi)
-    ].copy()
-    avg_connection_strength = direct_connections_df['Overall Connection Strength'].mean() if not direct_connections_df.empty else 0.0
-
-    # Network Diversity
-    connected_npis_temp = set(direct_connections_df['NPI_1'].tolist() + direct_connections_df['NPI_2'].tolist())
-    connected_npis_temp.discard(selected_npi)
-    connected_hcps_details = _all_hcps_details_df[_all_hcps_details_df['NPI'].isin(connected_npis_temp)]
-    unique_states_connected = len(connected_hcps_details['state'].dropna().unique())
-    unique_cities_connected = len(connected_hcps_details['city'].dropna().unique())
-
-    # Dominant Metrics
-    all_direct_metrics = direct_connections_df['Metrics'].dropna().tolist() if 'Metrics' in direct_connections_df.columns else []
-    metric_counts = pd.Series(all_direct_metrics).value_counts()
-    dominant_metrics = metric_counts.nlargest(2).index.tolist() if not metric_counts.empty else []
-    dominant_metrics_text = " and ".join(dominant_metrics) if dominant_metrics else "no specific dominant metric identified"
-
-    # Collaboration Diversity Score (Entropy-based)
-    if metric_counts.empty:
-        collaboration_diversity_score = 0.0
-    else:
-        probabilities = metric_counts / metric_counts.sum()
-        entropy = -sum(p * math.log2(p) for p in probabilities if p > 0)
-        max_entropy = math.log2(len(metric_counts)) if len(metric_counts) > 0 else 1
-        collaboration_diversity_score = entropy / max_entropy if max_entropy > 0 else 0.0
-
-    # KOL Status
-    kol_thresholds = {
-        'influence': _all_hcps_details_df['influence'].quantile(0.9),
-        'connections': _all_hcps_details_df['connections'].quantile(0.9),
-        'activity': (_all_hcps_details_df['papers'] + _all_hcps_details_df['panels'] + _all_hcps_details_df['trials']).quantile(0.9)
-    }
-    is_kol = (
-        influence_score >= kol_thresholds['influence'] and
-        total_connections >= kol_thresholds['connections'] and
-        (papers + panels + trials) >= kol_thresholds['activity']
-    )
-    kol_status = "Key Opinion Leader" if is_kol else "Standard HCP"
-
-    # Top Connections
-    top_connections_list = []
-    if not direct_connections_df.empty:
-        for index, row in direct_connections_df.iterrows():
-            connected_npi = row['NPI_2'] if row['NPI_1'] == selected_npi else row['NPI_1']
-            connected_hcp_data = _all_hcps_details_df[_all_hcps_details_df['NPI'] == connected_npi]
-            
-            if not connected_hcp_data.empty:
-                connected_hcp_row = connected_hcp_data.iloc[0]
-                strength = row['Overall Connection Strength']
-                influence = connected_hcp_row['influence']
-                connection_metric_type = row.get('Metrics', 'General Collaboration')
-                
-                impact_statement_detail = "Engaged in a key professional collaboration."
-                if connection_metric_type == 'Publishers':
-                    impact_statement_detail = f"Co-authored on publications."
-                elif connection_metric_type == 'Affiliations':
-                    impact_statement_detail = f"Shared professional affiliations."
-                elif connection_metric_type == 'Promotional Events':
-                    impact_statement_detail = f"Collaborated on promotional events."
-                elif connection_metric_type == 'Clinical Trials':
-                    impact_statement_detail = f"Participated in clinical trials."
-                elif connection_metric_type == 'Panels':
-                    impact_statement_detail = f"Contributed to advisory panels."
-                elif connected_hcp_row['papers'] > 0:
-                    impact_statement_detail = f"Collaborated on {int(connected_hcp_row['papers'])} papers."
-                elif connected_hcp_row['panels'] > 0:
-                    impact_statement_detail = f"Contributed to {int(connected_hcp_row['panels'])} panels."
-                elif connected_hcp_row['trials'] > 0:
-                    impact_statement_detail = f"Engaged in {int(connected_hcp_row['trials'])} trials."
-
-                top_connections_list.append({
-                    'name': connected_hcp_row['hcp_name'],
-                    'npi': connected_npi,
-                    'strength': strength,
-                    'influence': influence,
-                    'metric_type': connection_metric_type,
-                    'impact_statement': impact_statement_detail
-                })
-        
-        top_connections_list.sort(key=lambda x: (0.6 * x['influence'] + 0.4 * x['strength']), reverse=True)
+CACHED_FUNCTIONS = [
+    get_dataset, get_filtered_nodes, get_filtered_edge_rows, get_ego_network, get_collaboration_path,
+    compute_network_layout, build_network_records, get_community_overview, create_community_network,
+    generate_hcp_summary_data
+]
+
+@st.cache_resource
+def get_loaded_dataset_state():
+    """
+    Process-wide record of the dataset version the caches were last filled for.
+    """
+    return {'version': None}
 
-    # Metrics Breakdown
-    defined_metrics = ['Publishers', 'Affiliations', 'Promotional Events', 'Clinical Trials', 'Panels']
-    connection_metrics_counts = {metric: 0 for metric in defined_metrics}
-    other_metrics_count = 0
+def invalidate_dataset_caches():
+    """
+    Drops every cached result derived from the dataset.
+    """
+    for cached_function in CACHED_FUNCTIONS:
+        cached_function.clear()
 
-    if 'Metrics' in direct_connections_df.columns:
-        for metric_value in direct_connections_df['Metrics'].dropna():
-            if metric_value in connection_metrics_counts:
-                connection_metrics_counts[metric_value] += 1
-            else:
-                other_metrics_count += 1
-    
-    total_metric_instances = sum(connection_metrics_counts.values()) + other_metrics_count
-    metrics_breakdown = []
-    metrics_interpretation = ""
-    if total_metric_instances > 0:
-        for metric, count in connection_metrics_counts.items():
-            if count > 0:
-                percentage = (count / total_metric_instances) * 100
-                metrics_breakdown.append(f"- **{metric}**: **{count}** connections (**{percentage:.1f}%** of direct metrics)")
-        
-        if other_metrics_count > 0:
-            other_percentage = (other_metrics_count / total_metric_instances) * 100
-            metrics_breakdown.append(f"- **Other/Undefined**: **{other_metrics_count}** connections (**{other_percentage:.1f}%** of direct metrics)")
-        
-        if metric_counts.empty:
-            metrics_interpretation = "This HCP's connection dynamics are not clearly categorized by the standard metrics."
-        else:
-            sorted_metric_items = sorted(connection_metrics_counts.items(), key=lambda x: x[1], reverse=True)
-            dominant_category_val = sorted_metric_items[0][0] if sorted_metric_items[0][1] > 0 else 'diverse engagement'
-            if len(sorted_metric_items) > 1 and sorted_metric_items[1][1] > 0:
-                secondary_category_val = sorted_metric_items[1][0]
-                metrics_interpretation = f"This highlights a strong focus on **{dominant_category_val}** connections, with notable engagement in **{secondary_category_val}**."
-            else:
-                metrics_interpretation = f"This HCP's network shows a strong focus on **{dominant_category_val}** connections."
-    else:
-        metrics_breakdown.append("- **No specific connection metrics or direct connections found for this HCP to analyze dynamics.**")
-
-    return {
-        'hcp_data': hcp_data,
-        'total_connections': total_connections,
-        'influence_score': influence_score,
-        'influence_rank_text': influence_rank_text,
-        'influence_percentile': influence_percentile,
-        'avg_connection_strength': avg_connection_strength,
-        'unique_states_connected': unique_states_connected,
-        'unique_cities_connected': unique_cities_connected,
-        'dominant_metrics_text': dominant_metrics_text,
-        'top_connections_list': top_connections_list,
-        'metrics_breakdown': metrics_breakdown,
-        'metrics_interpretation': metrics_interpretation,
-        'papers': papers,
-        'panels': panels,
-        'trials': trials,
-        'collaboration_diversity_score': collaboration_diversity_score,
-        'kol_status': kol_status
-    }
-
-def render_hcp_summary(summary_data, selected_npi, default_top_n=5):
+def hcp_search_box(label, search_index, key, disabled=False):
+    """
+    Typeahead HCP picker: a name/NPI search box whose top matches are offered in a selectbox.
+    Returns the chosen NPI, or None.
+    """
+    query = st.text_input(label, key=f"{key}_query", placeholder="Type an HCP name or NPI", disabled=disabled)
+    if not query.strip():
+        return None
+    node_ids = search_index.search(query, SEARCH_RESULTS)
+    if len(node_ids) == 0:
+        st.caption("No matching HCPs.")
+        return None
+    npis = search_index.npis[node_ids].tolist()
+    labels = dict(zip(npis, search_index.labels(node_ids)))
+    return st.selectbox(
+        f"{label} matches", npis, format_func=labels.get, key=f"{key}_match",
+        label_visibility="collapsed", disabled=disabled
+    )
+
+def render_hcp_summary(summary_data, selected_npi, all_hcps_details, default_top_n=5):
     """
     Renders the HCP summary with enhanced visuals and navigation.
     """
@@ -396,6 +240,7 @@ def render_hcp_summary(summary_data, selected_npi, default_top_n=5):
         st.markdown('<button class="toc-button" onclick="window.location.href=\'#overview\'">I. Overview & KOL Status</button>', unsafe_allow_html=True)
         st.markdown('<button class="toc-button" onclick="window.location.href=\'#connections\'">II. Top Connections</button>', unsafe_allow_html=True)
         st.markdown('<button class="toc-button" onclick="window.location.href=\'#metrics\'">III. Connection Metrics</button>', unsafe_allow_html=True)
+        st.markdown('<button class="toc-button" onclick="window.location.href=\'#similar\'">IV. Similar HCPs</button>', unsafe_allow_html=True)
 
     # Main Summary Content
     st.markdown(f"### {hcp_data['hcp_name']} (NPI: {selected_npi}) Summary")
@@ -407,14 +252,14 @@ def render_hcp_summary(summary_data, selected_npi, default_top_n=5):
         col1, col2 = st.columns([1, 1])
         with col1:
             # Color-coded Total Connections
-            conn_color = "#00FF00" if summary_data['total_connections'] > st.session_state['all_hcps_details']['connections'].quantile(0.75) else "#FFA500"
-            conn_arrow = "🟢↑" if summary_data['total_connections'] > st.session_state['all_hcps_details']['connections'].mean() else "🔴↓"
+            conn_color = "#00FF00" if summary_data['total_connections'] > all_hcps_details['connections'].quantile(0.75) else "#FFA500"
+            conn_arrow = "🟢↑" if summary_data['total_connections'] > all_hcps_details['connections'].mean() else "🔴↓"
             st.markdown(f"<span style='color:{conn_color}'>Total Connections: **{summary_data['total_connections']}** {conn_arrow}</span>", unsafe_allow_html=True)
             st.markdown(f"{summary_data['influence_rank_text']}")
 
             # Color-coded Influence Score
             infl_color = "#00FF00" if summary_data['influence_percentile'] > 75 else "#FFA500"
-            infl_arrow = "🟢↑" if summary_data['influence_score'] > st.session_state['all_hcps_details']['influence'].mean() else "🔴↓"
+            infl_arrow = "🟢↑" if summary_data['influence_score'] > all_hcps_details['influence'].mean() else "🔴↓"
             st.markdown(f"<span style='color:{infl_color}'>Influence Score: **{summary_data['influence_score']:.2f}** {infl_arrow}</span>", unsafe_allow_html=True)
         
         with col2:
@@ -444,7 +289,7 @@ def render_hcp_summary(summary_data, selected_npi, default_top_n=5):
             # Prepare data for table
             table_data = []
             for conn in top_connections_display:
-                infl_color = "#00FF00" if conn['influence'] > st.session_state['all_hcps_details']['influence'].quantile(0.75) else "#FFA500"
+                infl_color = "#00FF00" if conn['influence'] > all_hcps_details['influence'].quantile(0.75) else "#FFA500"
                 table_data.append({
                     'HCP Name': conn['name'],
                     'NPI': conn['npi'],
@@ -500,7 +345,27 @@ def render_hcp_summary(summary_data, selected_npi, default_top_n=5):
         st.markdown(f"**Metrics Interpretation**: {summary_data['metrics_interpretation']}")
         st.markdown(f"**Dominant Connection Drivers**: {summary_data['dominant_metrics_text']}")
 
-def main():
+    # Section IV: Similar HCPs
+    st.markdown('<a id="similar"></a>', unsafe_allow_html=True)
+    with st.expander("IV. Similar HCPs", expanded=True):
+        similar = summary_data['similar_hcps']
+        if not similar.empty:
+            st.caption("HCPs whose collaborators overlap most with this HCP's (estimated share of common collaborators).")
+            st.dataframe(
+                pd.DataFrame({
+                    'HCP Name': similar['hcp_name'].astype(str),
+                    'NPI': similar['NPI'].astype(str),
+                    'Location': similar['city'].astype(str) + ", " + similar['state'].astype(str),
+                    'Similarity': (similar['similarity'] * 100).round().astype(int).astype(str) + "%",
+                    'Shared Collaborators': similar['shared_collaborators'],
+                }),
+                use_container_width=True,
+                hide_index=True
+            )
+        else:
+            st.info("No HCPs with a similar collaboration network found.")
+
+def render_page():
     st.set_page_config(page_title="HCP Network Visualization", layout="wide", initial_sidebar_state="expanded")
     
     st.markdown(
@@ -613,19 +478,21 @@ def main():
         st.session_state['page'] = 'main'
     if 'selected_hcp_npi' not in st.session_state:
         st.session_state['selected_hcp_npi'] = None
-    if 'summary_data' not in st.session_state:
-        st.session_state['summary_data'] = None
-    if 'all_hcps_details' not in st.session_state:
-        st.session_state['all_hcps_details'] = None
-    if 'df' not in st.session_state:
-        st.session_state['df'] = None
-
-    # Load data
+
+    # Load data: one shared copy per dataset version; sessions only keep their own selections
     try:
-        df = pd.read_csv("Main DB_1.csv", low_memory=False)
-        st.session_state['df'] = df
+        with stage('load_dataset') as timing:
+            dataset_version = current_version(DATA_FILE)
+            loaded_state = get_loaded_dataset_state()
+            if loaded_state['version'] != dataset_version:
+                # A new export or an applied delta makes every cached result stale
+                if loaded_state['version'] is not None:
+                    invalidate_dataset_caches()
+                loaded_state['version'] = dataset_version
+            dataset = get_dataset(dataset_version)
+            timing['rows_out'] = len(dataset.edges)
     except FileNotFoundError:
-        st.error("File 'Main DB_1.csv' not found.")
+        st.error(f"File '{DATA_FILE}' not found.")
         return
     except pd.errors.EmptyDataError:
         st.error("The CSV file is empty.")
@@ -642,8 +509,9 @@ def main():
         st.error(f"An unexpected error occurred: {e}")
         return
 
-    all_hcps_details = get_all_hcps_details(df)
-    st.session_state['all_hcps_details'] = all_hcps_details
+    df = dataset.edges
+    graph_index = dataset.graph_index
+    all_hcps_details = dataset.nodes
 
     if all_hcps_details.empty:
         st.error("No HCP data available after processing. Please check the input CSV file.")
@@ -654,12 +522,11 @@ def main():
     global_min_influence = 0.0
     global_max_influence = float(all_hcps_details['influence'].max()) if not all_hcps_details.empty else 1.0
     global_min_edge_strength = 0.0
-    global_max_edge_strength = float(df['Overall Connection Strength'].max()) if not df.empty else 1.5
+    global_max_edge_strength = round(float(df['Overall Connection Strength'].max()), 6) if not df.empty else 1.5
 
     unique_states = sorted(all_hcps_details['state'].dropna().unique())
     unique_cities = sorted(all_hcps_details['city'].dropna().unique())
-    hcp_names = sorted(all_hcps_details['hcp_name'].dropna().unique().tolist())
-    hcp_names.insert(0, "Select an HCP for Summary")
+    search_index = dataset.search_index
 
     # Sidebar
     with st.sidebar:
@@ -674,6 +541,42 @@ def main():
                 st.rerun()
 
         if st.session_state['page'] == 'main':
+            st.subheader("Network View")
+            network_view = st.radio(
+                "Show", ["Top HCPs", "Ego Network", "Collaboration Path", "Community Overview"], index=0,
+                help="Ego Network shows the neighborhood of the HCP selected above; Collaboration Path shows how it "
+                     "connects to a second HCP. Community Overview groups the full network into communities; "
+                     "click a community to expand it."
+            )
+            max_communities = st.number_input(
+                "Number of Communities", min_value=1, max_value=200, value=50, step=10,
+                disabled=network_view != "Community Overview"
+            )
+            members_per_community = st.number_input(
+                "Members Shown per Community", min_value=1, max_value=500, value=25, step=25,
+                disabled=network_view != "Community Overview",
+                help="Expanding a community shows this many of its most connected HCPs."
+            )
+            ego_hops = st.radio(
+                "Hops", [1, 2, 3], index=1, horizontal=True, disabled=network_view != "Ego Network"
+            )
+            ego_max_fanout = st.number_input(
+                "Max Collaborators per HCP", min_value=1, max_value=1000, value=25, step=5,
+                disabled=network_view != "Ego Network",
+                help="Only the strongest collaborations of each HCP are followed outward."
+            )
+            ego_max_nodes = st.number_input(
+                "Max HCPs in Ego Network", min_value=2, max_value=5000, value=300, step=50,
+                disabled=network_view != "Ego Network"
+            )
+            path_target_npi = hcp_search_box(
+                "Path To", search_index, key="path_target", disabled=network_view != "Collaboration Path"
+            )
+            path_type = st.radio(
+                "Path Type", ["Fewest Hops", "Strongest Collaborations"], horizontal=True,
+                disabled=network_view != "Collaboration Path",
+                help="Strongest Collaborations prefers chains of strong ties, treating each edge as 1 / strength long."
+            )
             st.subheader("Geographic Filters")
             selected_states = st.multiselect(
                 "Filter by States", unique_states,
@@ -686,11 +589,13 @@ def main():
             st.subheader("HCP Core Scores")
             sort_by = st.selectbox(
                 "Select Top HCPs By",
-                options=["No. of Connections", "Influence Score"],
+                options=list(SORT_OPTIONS),
                 index=0,
-                help="Choose whether to display top HCPs based on connections or influence score."
+                help="Choose the metric used to pick the top HCPs. Graph metrics are computed over the full "
+                     "network the first time they are selected; betweenness is estimated from sampled sources."
             )
-            sort_by = 'connections' if sort_by == "No. of Connections" else 'influence'
+            sort_label = sort_by
+            sort_by = SORT_OPTIONS[sort_by]
             min_strength, max_strength = st.slider(
                 "Collaboration Score Range",
                 min_value=global_min_edge_strength, max_value=global_max_edge_strength,
@@ -726,7 +631,10 @@ def main():
                 min_value=1, max_value=max_top_n_for_input, value=min(50, max_top_n_for_input), step=10
             )
             st.subheader("Network Behavior")
-            enable_physics = st.checkbox("Enable Physics Simulation", True)
+            enable_physics = st.checkbox(
+                "Enable Physics Simulation", False,
+                help="Off: nodes use a layout precomputed on the server. On: the browser keeps simulating from that layout."
+            )
             if st.button("Reset Network View"):
                 st.session_state['reset_view'] = True
 
@@ -747,25 +655,10 @@ def main():
                 """,
                 unsafe_allow_html=True
             )
-            selected_hcp_name_for_summary = st.selectbox(
-                "Select an HCP for Summary:",
-                hcp_names,
-                key="hcp_summary_selector",
-                label_visibility="collapsed"  # Hide label for compact look
+            # Matches resolve to an NPI directly, so duplicate names stay distinguishable
+            st.session_state['selected_hcp_npi'] = hcp_search_box(
+                "Search an HCP for Summary:", search_index, key="hcp_summary"
             )
-            if selected_hcp_name_for_summary != "Select an HCP for Summary":
-                try:
-                    st.session_state['selected_hcp_npi'] = all_hcps_details[all_hcps_details['hcp_name'] == selected_hcp_name_for_summary]['NPI'].iloc[0]
-                    st.session_state['summary_data'] = generate_hcp_summary_data(
-                        st.session_state['selected_hcp_npi'], all_hcps_details, df
-                    )
-                except IndexError:
-                    st.error(f"HCP '{selected_hcp_name_for_summary}' not found in the dataset. Please select a valid HCP.")
-                    st.session_state['selected_hcp_npi'] = None
-                    st.session_state['summary_data'] = None
-            else:
-                st.session_state['selected_hcp_npi'] = None
-                st.session_state['summary_data'] = None
             st.button(
                 "Go to HCP Summary",
                 disabled=not st.session_state['selected_hcp_npi'],
@@ -774,54 +667,121 @@ def main():
             )
             st.markdown("</div>", unsafe_allow_html=True)
 
-        with st.spinner("Generating interactive network..."):
-            filtered_nodes_for_display = get_filtered_nodes(
-                all_hcps_details, top_n, selected_states, selected_cities,
-                min_connections, min_influence, min_papers, min_panels, min_trials,
-                sort_by
+        if network_view == "Community Overview":
+            reset_live_network()
+            if not dataset.communities_ready:
+                st.warning(
+                    f"Communities for this dataset version are still being detected over "
+                    f"{graph_index.num_nodes:,} HCPs and {graph_index.num_edges:,} connections. This runs once "
+                    "per version and can take several minutes on large networks; later views load instantly."
+                )
+            with st.spinner("Detecting communities..."):
+                with stage('community_overview', rows_in=len(df)) as timing:
+                    overview = get_community_overview(dataset_version, dataset, max_communities, members_per_community)
+                    nodes, edges, clusters = create_community_network(
+                        dataset_version, max_communities, members_per_community, overview, enable_physics,
+                        global_min_connections, global_max_connections,
+                        global_min_edge_strength, global_max_edge_strength
+                    )
+                    timing['rows_out'] = len(nodes) + len(edges)
+                html_content = community_network_html(nodes, edges, clusters, enable_physics,
+                                                      fit=st.session_state.get('reset_view', False))
+                st.session_state['reset_view'] = False
+                st.components.v1.html(html_content, height=900, scrolling=False)
+            st.caption(
+                f"Showing the {len(overview['super_nodes'])} largest of {overview['num_communities']} communities "
+                f"covering {int(overview['super_nodes']['size'].sum())} of {len(all_hcps_details)} HCPs. "
+                f"Click a community to expand its {members_per_community} most connected members (set under "
+                "Members Shown per Community); Reset Network View collapses them again."
             )
+            return
 
-            if filtered_nodes_for_display.empty:
-                st.warning("No HCPs found based on the selected criteria.")
-                net = Network(height="900px", width="100%", bgcolor="#0a0a0a", heading="")
-                with tempfile.NamedTemporaryFile(delete=False, suffix=".html") as tmp_file:
-                    tmp_path = tmp_file.name
-                    net.save_graph(tmp_path)
-                with open(tmp_path, 'r', encoding='utf-8') as f:
-                    html_content = f.read()
-                st.components.v1.html(html_content, height=900, scrolling=False)
-                os.unlink(tmp_path)
-                return
+        if network_view == "Ego Network" and not st.session_state['selected_hcp_npi']:
+            reset_live_network()
+            st.info("Search an HCP above to explore their collaboration neighborhood.")
+            return
+        if network_view == "Collaboration Path" and (
+                not st.session_state['selected_hcp_npi'] or path_target_npi is None):
+            reset_live_network()
+            st.info("Search an HCP above and a second HCP under 'Path To' in the sidebar to see how they are connected.")
+            return
 
-            filtered_node_npis = filtered_nodes_for_display['NPI'].tolist()
-            filtered_edges_for_display = get_filtered_edges_for_display(
-                df, filtered_node_npis, min_strength, max_strength
-            )
-            
-            net = create_pyvis_network(
-                filtered_nodes_for_display,
-                filtered_edges_for_display,
-                enable_physics,
-                global_min_connections, global_max_connections,
-                global_min_edge_strength, global_max_edge_strength
-            )
+        path = None
 
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".html") as tmp_file:
-                tmp_path = tmp_file.name
-                net.save_graph(tmp_path)
-            
-            with open(tmp_path, 'r', encoding='utf-8') as f:
-                html_content = f.read()
-            
-            if st.session_state.get('reset_view', False):
-                html_content = html_content.replace(
-                    'var network = new vis.Network(container, data, options);',
-                    'var network = new vis.Network(container, data, options); network.fit();'
+        with st.spinner("Generating interactive network..."):
+            if network_view == "Collaboration Path":
+                try:
+                    with stage('collaboration_path', rows_in=graph_index.num_edges) as timing:
+                        path_view = get_collaboration_path(
+                            dataset_version, dataset, st.session_state['selected_hcp_npi'], path_target_npi,
+                            path_type == "Strongest Collaborations", min_strength, max_strength
+                        )
+                        timing['rows_out'] = None if path_view is None else len(path_view[0])
+                except TimeoutError as e:
+                    reset_live_network()
+                    st.warning(f"{e}. Try the other path type.")
+                    return
+                if path_view is None:
+                    reset_live_network()
+                    st.warning("These HCPs are not connected in the collaboration network.")
+                    return
+                filtered_nodes_for_display, filtered_edges_for_display, path_nodes, path_edges = path_view
+                path = (tuple(path_nodes['NPI'].tolist()), tuple(path_edges.index.tolist()))
+                path_strength = round(float(path_edges['Overall Connection Strength'].astype(float).sum()), 2)
+                st.caption(
+                    " → ".join(path_nodes['hcp_name'].astype(str)) +
+                    f" ({len(path_edges)} hop(s), total collaboration score {path_strength})"
                 )
-                st.session_state['reset_view'] = False
-                
-            st.components.v1.html(html_content, height=900, scrolling=False)
-            os.unlink(tmp_path)
+            elif network_view == "Ego Network":
+                # Geographic and score filters do not apply; the strength range limits the traversal
+                with stage('ego_network', rows_in=graph_index.num_edges) as timing:
+                    filtered_nodes_for_display, filtered_edges_for_display = get_ego_network(
+                        dataset_version, dataset, st.session_state['selected_hcp_npi'], ego_hops,
+                        min_strength, max_strength, ego_max_fanout, ego_max_nodes
+                    )
+                    timing['rows_out'] = len(filtered_nodes_for_display)
+                st.caption(
+                    f"{len(filtered_nodes_for_display) - 1} HCPs within {ego_hops} hop(s) of "
+                    f"{filtered_nodes_for_display['hcp_name'].iloc[0]}, following up to {ego_max_fanout} "
+                    "strongest collaborations per HCP."
+                )
+            else:
+                with stage('filter_nodes', rows_in=len(all_hcps_details)) as timing:
+                    filtered_nodes_for_display = get_filtered_nodes(
+                        dataset_version, dataset, top_n, selected_states, selected_cities,
+                        min_connections, min_influence, min_papers, min_panels, min_trials,
+                        sort_by
+                    )
+                    timing['rows_out'] = len(filtered_nodes_for_display)
+
+                if filtered_nodes_for_display.empty:
+                    st.warning("No HCPs found based on the selected criteria.")
+                    live_network([], [], '{}')
+                    return
+
+                with stage('filter_edges', rows_in=len(df)) as timing:
+                    filtered_node_npis = filtered_nodes_for_display['NPI'].tolist()
+                    filtered_edge_rows = get_filtered_edge_rows(
+                        dataset_version, dataset, filtered_node_npis, min_strength, max_strength
+                    )
+                    filtered_edges_for_display = df.iloc[filtered_edge_rows]
+                    timing['rows_out'] = len(filtered_edges_for_display)
+
+            with stage('build_network', rows_in=len(filtered_nodes_for_display) + len(filtered_edges_for_display)) as timing:
+                node_records, edge_records, options_json = build_network_records(
+                    dataset_version, subgraph_key(filtered_nodes_for_display, filtered_edges_for_display),
+                    filtered_nodes_for_display,
+                    filtered_edges_for_display,
+                    enable_physics,
+                    global_min_connections, global_max_connections,
+                    global_min_edge_strength, global_max_edge_strength, path
+                )
+                timing['rows_out'] = len(node_records) + len(edge_records)
+
+            # Only the difference to what the browser already shows is sent
+            with stage('send_network', rows_in=len(node_records) + len(edge_records)):
+                live_network(node_records, edge_records, options_json, fit=st.session_state.get('reset_view', False))
+            st.session_state['reset_view'] = False
 
         st.markdown("---")
         st.subheader("Network Summary")
@@ -881,17 +841,53 @@ def main():
                     'Papers': data.get('papers', 0),
                     'Panels': data.get('panels', 0),
                     'Trials': data.get('trials', 0),
+                    **({'Hops from Center': data['hop']} if network_view == "Ego Network" else {}),
+                    **({sort_label: data[sort_by]} if network_view == "Top HCPs" and sort_by in ANALYTIC_METRICS else {}),
                 } for _, data in filtered_nodes_for_display.iterrows()]
                 st.dataframe(pd.DataFrame(hcp_data_for_table))
             else:
                 st.info("No HCPs to display.")
 
     else:  # Summary page
+        reset_live_network()
         st.markdown('<div class="custom-title">HCP Summary</div>', unsafe_allow_html=True)
         if st.session_state['selected_hcp_npi'] is None:
             st.error("No HCP selected. Please select an HCP from the main page.")
         else:
-            render_hcp_summary(st.session_state['summary_data'], st.session_state['selected_hcp_npi'])
+            selected_npi = st.session_state['selected_hcp_npi']
+            with stage('hcp_summary'):
+                summary_data = generate_hcp_summary_data(dataset_version, selected_npi, dataset)
+                render_hcp_summary(summary_data, selected_npi, all_hcps_details)
+
+def render_performance_panel(rerun):
+    """
+    Optional sidebar panel with the stage timings and cache hits/misses of the run that just finished.
+    """
+    with st.sidebar:
+        if not st.checkbox("Show Performance", key="show_performance",
+                           help="Server-side timings of this rerun; browser rendering and physics are not included."):
+            return
+        with st.expander("Performance", expanded=True):
+            cache_hits = sum(call['hit'] for call in rerun.cache_calls)
+            st.caption(f"Rerun: {rerun.seconds:.3f} s · cache {cache_hits}/{len(rerun.cache_calls)} hits")
+            if rerun.stages:
+                st.markdown("**Stages**")
+                st.dataframe(pd.DataFrame(rerun.stages).set_index('stage'))
+            if rerun.cache_calls:
+                st.markdown("**Cached functions (this rerun)**")
+                st.dataframe(pd.DataFrame(rerun.cache_calls).set_index('function'))
+            st.markdown("**Cache hits / misses (this process)**")
+            st.dataframe(pd.DataFrame.from_dict(cache_totals(), orient='index'))
+
+def main():
+    # Every rerun is measured and logged as one JSON line; the panel shows it when enabled
+    ctx = get_script_run_ctx()
+    rerun = begin_rerun(ctx.session_id if ctx else None)
+    try:
+        render_page()
+    finally:
+        end_rerun(rerun)
+    render_performance_panel(rerun)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,348 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from ingest import STRENGTH_COLUMN, cache_path_for, iter_edge_batches, read_feather_mmap, write_feather_atomic, remove_stale_caches
+from node_table import SOURCE_COLUMNS, aggregate_node_details, aggregate_node_details_chunked, finalize_node_aggregates
+
+# --- Graph index: node table plus CSR adjacency built once per dataset version ---
+
+INDEX_ARRAYS = ['edge_src', 'edge_dst', 'offsets', 'neighbors', 'edge_rows', 'entry_strengths']
+
+
+def gather_ranges(starts, ends):
+    """
+    Returns the positions covered by the half-open ranges [starts[i], ends[i]), range by range.
+    """
+    counts = np.maximum(ends - starts, 0)
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=np.int64)
+    shifts = np.repeat(starts - np.cumsum(counts) + counts, counts)
+    return shifts + np.arange(total, dtype=np.int64)
+
+
+def gather_slices(offsets, ids):
+    """
+    Returns the positions of all CSR entries belonging to `ids`, in id order.
+    """
+    return gather_ranges(offsets[ids], offsets[ids + 1])
+
+
+def search_segments(values, starts, ends, targets, side='left'):
+    """
+    Vectorized binary search of `targets` inside the ascending segments values[starts:ends]
+    (NaN sorts last). Returns one insertion position per segment, like np.searchsorted.
+    """
+    lo = np.array(starts, dtype=np.int64)
+    hi = np.array(ends, dtype=np.int64)
+    active = lo < hi
+    while active.any():
+        mid = (lo + hi) // 2
+        probe = values[np.where(active, mid, 0)]
+        go_right = (probe <= targets) if side == 'right' else (probe < targets)
+        lo = np.where(active & go_right, mid + 1, lo)
+        hi = np.where(active & ~go_right, mid, hi)
+        active = lo < hi
+    return lo
+
+
+class GraphIndex:
+    """
+    Read-only graph view of the edge table: NPI -> int id mapping, node attribute table and a CSR
+    adjacency (offsets, neighbor ids, edge row ids) over both directions of every edge. Within each
+    node's slice, entries are sorted by connection strength (ascending, NaN last, then edge row).
+    """
+
+    def __init__(self, nodes, edge_src, edge_dst, offsets, neighbors, edge_rows, entry_strengths):
+        self.nodes = nodes
+        self.npis = nodes['NPI'].to_numpy()
+        self.edge_src = edge_src
+        self.edge_dst = edge_dst
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.edge_rows = edge_rows
+        self.entry_strengths = entry_strengths
+
+    @property
+    def num_nodes(self):
+        return len(self.npis)
+
+    @property
+    def num_edges(self):
+        return len(self.edge_src)
+
+    def node_ids(self, npis):
+        """
+        Maps NPIs to node ids; unknown NPIs map to -1.
+        """
+        npis = np.asarray(npis, dtype=np.int64)
+        if len(self.npis) == 0:
+            return np.full(len(npis), -1, dtype=np.int64)
+        ids = np.searchsorted(self.npis, npis)
+        ids = np.minimum(ids, len(self.npis) - 1)
+        return np.where(self.npis[ids] == npis, ids, -1).astype(np.int64)
+
+    def node_id(self, npi):
+        """
+        Maps a single NPI to its node id, or None if it is not in the graph.
+        """
+        try:
+            node_id = int(self.node_ids([npi])[0])
+        except (TypeError, ValueError):
+            return None
+        return node_id if node_id >= 0 else None
+
+    def neighbor_ids(self, node_id):
+        """
+        Neighbor ids of a node, one entry per incident edge.
+        """
+        return self.neighbors[self.offsets[node_id]:self.offsets[node_id + 1]]
+
+    def incident_edge_rows(self, node_id):
+        """
+        Edge table rows touching a node, in edge table order.
+        """
+        return np.sort(self.edge_rows[self.offsets[node_id]:self.offsets[node_id + 1]])
+
+    def induced_edge_rows(self, node_ids, min_strength=None, max_strength=None):
+        """
+        Edge table rows with both endpoints in node_ids, in edge table order, found through the
+        adjacency of those nodes only (O(sum of degrees) instead of a scan over every edge).
+        With a strength window, each node's slice is narrowed by binary search first and edges
+        without a strength are excluded.
+        """
+        node_ids = np.unique(np.asarray(node_ids, dtype=np.int64))
+        node_ids = node_ids[node_ids >= 0]
+        if len(node_ids) == 0:
+            return np.empty(0, dtype=np.int64)
+        starts, ends = self.offsets[node_ids], self.offsets[node_ids + 1]
+        # Thresholds are compared at the storage precision of the strengths
+        as_stored = self.entry_strengths.dtype.type
+        if min_strength is not None:
+            starts = search_segments(self.entry_strengths, starts, ends, as_stored(min_strength), side='left')
+        if max_strength is not None:
+            ends = search_segments(self.entry_strengths, starts, ends, as_stored(max_strength), side='right')
+        entries = gather_ranges(starts, ends)
+        owners = np.repeat(node_ids, np.maximum(ends - starts, 0))
+        nbrs = self.neighbors[entries]
+        # Membership by direct lookup: hubs make the entry count far larger than the node set
+        member = np.zeros(self.num_nodes, dtype=bool)
+        member[node_ids] = True
+        # Each induced edge is listed under both endpoints; keep it under the smaller id
+        keep = member[nbrs] & (owners <= nbrs)
+        return np.sort(self.edge_rows[entries][keep])
+
+    def ego_node_ids(self, node_id, hops=1, min_strength=None, max_strength=None, max_fanout=None, max_nodes=None):
+        """
+        Breadth-first k-hop neighborhood of a node. Each level expands the whole frontier at once:
+        the strength window of every frontier node is found by binary search and, with max_fanout,
+        only its max_fanout strongest edges are followed. New nodes are ranked by their strongest
+        link, so max_nodes keeps the best-connected ones. Returns (node ids, hop distance of each),
+        center first.
+        """
+        as_stored = self.entry_strengths.dtype.type
+        seen = np.zeros(self.num_nodes, dtype=bool)
+        seen[node_id] = True
+        found, distances = [np.array([node_id], dtype=np.int64)], [np.zeros(1, dtype=np.int64)]
+        total = 1
+        frontier = found[0]
+        for depth in range(1, hops + 1):
+            if len(frontier) == 0 or (max_nodes is not None and total >= max_nodes):
+                break
+            starts, ends = self.offsets[frontier], self.offsets[frontier + 1]
+            if min_strength is not None:
+                starts = search_segments(self.entry_strengths, starts, ends, as_stored(min_strength), side='left')
+            if max_strength is not None:
+                ends = search_segments(self.entry_strengths, starts, ends, as_stored(max_strength), side='right')
+            elif max_fanout is not None:
+                # Edges without a strength sort last; never count them among the strongest
+                ends = search_segments(self.entry_strengths, starts, ends, as_stored(np.inf), side='right')
+            if max_fanout is not None:
+                starts = np.maximum(starts, ends - max_fanout)
+            entries = gather_ranges(starts, ends)
+            nbrs = self.neighbors[entries]
+            fresh = ~seen[nbrs]
+            entries, nbrs = entries[fresh], nbrs[fresh]
+
+            # Strongest link first, then the first occurrence of each new node
+            by_strength = nbrs[np.argsort(-self.entry_strengths[entries], kind='stable')]
+            new_ids, first = np.unique(by_strength, return_index=True)
+            new_ids = new_ids[np.argsort(first)]
+            if max_nodes is not None:
+                new_ids = new_ids[:max_nodes - total]
+            seen[new_ids] = True
+            found.append(new_ids)
+            distances.append(np.full(len(new_ids), depth, dtype=np.int64))
+            total += len(new_ids)
+            frontier = np.sort(new_ids)
+        return np.concatenate(found), np.concatenate(distances)
+
+
+def build_graph_index(df, nodes=None):
+    """
+    Builds the graph index for an edge table with vectorized operations only.
+    """
+    if nodes is None:
+        nodes = aggregate_node_details(df)
+    npis = nodes['NPI'].to_numpy()
+    num_nodes = len(npis)
+
+    edge_src = np.searchsorted(npis, df['NPI_1'].to_numpy()).astype(np.int64)
+    edge_dst = np.searchsorted(npis, df['NPI_2'].to_numpy()).astype(np.int64)
+    rows = np.arange(len(df), dtype=np.int64)
+
+    # Each edge is listed under both endpoints; self-loops only once
+    reverse = edge_src != edge_dst
+    owner = np.concatenate([edge_src, edge_dst[reverse]])
+    other = np.concatenate([edge_dst, edge_src[reverse]])
+    entry_rows = np.concatenate([rows, rows[reverse]])
+    entry_strengths = df[STRENGTH_COLUMN].to_numpy()[entry_rows]
+    order = np.lexsort((entry_rows, entry_strengths, owner))
+
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owner, minlength=num_nodes), out=offsets[1:])
+    return GraphIndex(nodes, edge_src, edge_dst, offsets, other[order], entry_rows[order], entry_strengths[order])
+
+
+class IndexUpdate:
+    """
+    How an updated graph index relates to the one it was derived from: new node id per old node
+    id, new position per old CSR entry (-1 where removed), and the nodes whose edges changed.
+    """
+
+    def __init__(self, node_map, entry_map, touched):
+        self.node_map = node_map
+        self.entry_map = entry_map
+        self.touched = touched
+
+    def old_node_ids(self, num_nodes):
+        """
+        Old node id per new node id; -1 for HCPs that are new.
+        """
+        old_ids = np.full(num_nodes, -1, dtype=np.int64)
+        kept = self.node_map >= 0
+        old_ids[self.node_map[kept]] = np.flatnonzero(kept)
+        return old_ids
+
+
+def update_node_table(nodes, edges, npis, rows):
+    """
+    Node table after an edge change. The HCPs in `npis` are aggregated again from `rows` of the new
+    edge table, which must hold every edge touching them in edge order; HCPs left without edges
+    drop out. Every other row is kept as it is.
+    """
+    fresh = aggregate_node_details(edges.iloc[np.sort(rows)][SOURCE_COLUMNS])
+    fresh = fresh[fresh['NPI'].isin(npis)]
+    kept = nodes[~nodes['NPI'].isin(npis)]
+    return finalize_node_aggregates(pd.concat([kept, fresh], ignore_index=True).set_index('NPI'))
+
+
+def update_graph_index(graph_index, nodes, kept_rows, added):
+    """
+    Graph index after dropping edge rows and appending new edges, without sorting the adjacency
+    again. Kept entries stay in order, because node ids and edge rows are remapped monotonically.
+    New entries are merged into their nodes' strength-sorted slices by binary search. `kept_rows`
+    is a boolean mask over the old edge rows and `added` becomes the last rows of the new edge
+    table. Returns (graph index, IndexUpdate).
+    """
+    npis = nodes['NPI'].to_numpy()
+    num_nodes = len(npis)
+    node_map = np.full(graph_index.num_nodes, -1, dtype=np.int64)
+    if num_nodes:
+        ids = np.minimum(np.searchsorted(npis, graph_index.npis), num_nodes - 1)
+        node_map = np.where(npis[ids] == graph_index.npis, ids, -1).astype(np.int64)
+    row_map = np.cumsum(kept_rows) - 1
+    num_kept_rows = int(kept_rows.sum())
+
+    # Kept entries, already in (owner, strength, row) order
+    old_owners = np.repeat(np.arange(graph_index.num_nodes, dtype=np.int64), np.diff(graph_index.offsets))
+    entry_kept = kept_rows[graph_index.edge_rows]
+    kept_entries = np.flatnonzero(entry_kept)
+    owners = node_map[old_owners[kept_entries]]
+    neighbors = node_map[graph_index.neighbors[kept_entries]]
+    edge_rows = row_map[graph_index.edge_rows[kept_entries]]
+    entry_strengths = graph_index.entry_strengths[kept_entries]
+
+    # New entries, sorted the same way
+    src = np.searchsorted(npis, added['NPI_1'].to_numpy()).astype(np.int64)
+    dst = np.searchsorted(npis, added['NPI_2'].to_numpy()).astype(np.int64)
+    rows = num_kept_rows + np.arange(len(added), dtype=np.int64)
+    reverse = src != dst
+    new_owners = np.concatenate([src, dst[reverse]])
+    new_neighbors = np.concatenate([dst, src[reverse]])
+    new_rows = np.concatenate([rows, rows[reverse]])
+    new_strengths = added[STRENGTH_COLUMN].to_numpy()[new_rows - num_kept_rows].astype(entry_strengths.dtype)
+    order = np.lexsort((new_rows, new_strengths, new_owners))
+    new_owners, new_neighbors = new_owners[order], new_neighbors[order]
+    new_rows, new_strengths = new_rows[order], new_strengths[order]
+
+    # New rows come after every kept row, so they go after kept entries of equal strength
+    kept_offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(owners, minlength=num_nodes), out=kept_offsets[1:])
+    starts, ends = kept_offsets[new_owners], kept_offsets[new_owners + 1]
+    positions = search_segments(entry_strengths, starts, ends, new_strengths, side='right')
+    positions = np.where(np.isnan(new_strengths), ends, positions)
+
+    offsets = np.zeros(num_nodes + 1, dtype=np.int64)
+    np.cumsum(np.bincount(np.concatenate([owners, new_owners]), minlength=num_nodes), out=offsets[1:])
+    kept_positions = np.arange(len(kept_entries), dtype=np.int64)
+    entry_map = np.full(len(graph_index.edge_rows), -1, dtype=np.int64)
+    entry_map[kept_entries] = kept_positions + np.searchsorted(positions, kept_positions, side='right')
+
+    removed_owners = node_map[old_owners[~entry_kept]]
+    touched = np.unique(np.concatenate([new_owners, removed_owners[removed_owners >= 0]]))
+    updated = GraphIndex(
+        nodes,
+        np.concatenate([node_map[graph_index.edge_src[kept_rows]], src]),
+        np.concatenate([node_map[graph_index.edge_dst[kept_rows]], dst]),
+        offsets,
+        np.insert(neighbors, positions, new_neighbors),
+        np.insert(edge_rows, positions, new_rows),
+        np.insert(entry_strengths, positions, new_strengths),
+    )
+    return updated, IndexUpdate(node_map, entry_map, touched)
+
+
+def save_graph_index(graph_index, path):
+    """
+    Persists the index as a directory of .npy arrays plus a Feather node table.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    os.makedirs(tmp_path, exist_ok=True)
+    write_feather_atomic(graph_index.nodes, os.path.join(tmp_path, 'nodes.feather'))
+    for name in INDEX_ARRAYS:
+        np.save(os.path.join(tmp_path, f"{name}.npy"), getattr(graph_index, name))
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        # Another process published the same version first
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def read_graph_index(path):
+    """
+    Loads a persisted index; arrays are memory-mapped read-only.
+    """
+    nodes = read_feather_mmap(os.path.join(path, 'nodes.feather'))
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in INDEX_ARRAYS}
+    return GraphIndex(nodes, **arrays)
+
+
+def load_graph_index(csv_path, df, cache_dir=None, version=None):
+    """
+    Returns the graph index for a version of csv_path (by default the current one), building and persisting it
+    next to the edge cache the first time. The node table is aggregated chunk by chunk from the
+    full typed edge store, since the compact edge table no longer carries names, locations and counts,
+    unless a multi-file ingest already left it behind.
+    """
+    path = cache_path_for(csv_path, '.index', cache_dir, version)
+    if not os.path.isdir(path):
+        nodes_path = cache_path_for(csv_path, '.nodes.feather', cache_dir, version)
+        if os.path.exists(nodes_path):
+            nodes = read_feather_mmap(nodes_path)
+        else:
+            nodes = aggregate_node_details_chunked(iter_edge_batches(csv_path, cache_dir, SOURCE_COLUMNS, version))
+        save_graph_index(build_graph_index(df, nodes), path)
+        remove_stale_caches(path, '.index')
+    return read_graph_index(path)
@@ -0,0 +1,471 @@
+import contextlib
+import glob
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import shutil
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.ipc as ipc
+from node_table import add_node_aggregates, merge_node_aggregates, finish_node_aggregates
+
+# --- Columnar ingest cache for the HCP edge export ---
+
+CACHE_DIR_NAME = ".hcp_cache"
+CACHE_FORMAT_VERSION = 5
+# Record of the delta files applied on top of an export, kept next to its caches
+DELTA_MANIFEST_SUFFIX = '.deltas.json'
+
+NPI_COLUMNS = ['NPI_1', 'NPI_2']
+REQUIRED_COLUMNS = [
+    'NPI_1', 'HCP_1', 'NPI_2', 'HCP_2', 'No. of Connections HCP 1', 'No. of Connections HCP 2',
+    'Influence score_1', 'Influence score_2', 'City1', 'State1', 'City2', 'State2',
+    'Overall Connection Strength'
+]
+OPTIONAL_NUMERIC_COLUMNS = ['Papers', 'Panels', 'Trials']
+NUMERIC_COLUMNS = [
+    'No. of Connections HCP 1', 'No. of Connections HCP 2', 'Influence score_1', 'Influence score_2',
+    'Overall Connection Strength'
+] + OPTIONAL_NUMERIC_COLUMNS
+CATEGORY_COLUMNS = ['HCP_1', 'HCP_2', 'City1', 'State1', 'City2', 'State2', 'Metrics']
+STRENGTH_COLUMN = 'Overall Connection Strength'
+# Columns kept on the in-memory edge table; names, locations and counts live on the node table
+EDGE_COLUMNS = ['NPI_1', 'NPI_2', STRENGTH_COLUMN, 'Metrics']
+# The edge table as a single record batch, next to the chunked edge store it is derived from
+EDGE_TABLE_SUFFIX = '.edges.feather'
+# Rows parsed per CSV chunk; bounds peak memory while converting the export
+CSV_CHUNK_ROWS = 250_000
+# Edge files picked up when the source is a directory
+SOURCE_PATTERN = '*.csv'
+
+
+def is_glob_pattern(source):
+    return any(char in source for char in '*?[')
+
+
+def source_files(source):
+    """
+    The edge files behind a source: a single CSV, every CSV in a directory, or the files matching a
+    glob pattern, in sorted order (which is also their order in the edge store).
+    """
+    if os.path.isdir(source):
+        files = sorted(glob.glob(os.path.join(source, SOURCE_PATTERN)))
+    elif is_glob_pattern(source):
+        files = sorted(glob.glob(source))
+    else:
+        return [source]
+    if not files:
+        raise FileNotFoundError(source)
+    return files
+
+
+def file_fingerprint(path):
+    """
+    Returns a short token identifying the current contents of a source (path, size and mtime of
+    each of its files).
+    """
+    parts = []
+    for file in source_files(path):
+        stat = os.stat(file)
+        parts.append(f"{os.path.abspath(file)}|{stat.st_size}|{stat.st_mtime_ns}")
+    key = "|".join(parts) + f"|{CACHE_FORMAT_VERSION}"
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+
+def get_cache_dir(csv_path, cache_dir=None):
+    """
+    Returns (and creates) the directory holding columnar caches for csv_path.
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_DIR_NAME)
+    os.makedirs(cache_dir, exist_ok=True)
+    return cache_dir
+
+
+def _cache_stem(csv_path):
+    name = os.path.splitext(os.path.basename(os.path.normpath(csv_path)))[0]
+    stem = re.sub(r'[^\w.-]', '_', name)
+    if is_glob_pattern(csv_path) or os.path.isdir(csv_path):
+        # Patterns such as '*.csv' all reduce to '_', and a directory can share its name with a file
+        # next to it; the full source path keeps their caches apart
+        source = os.path.normcase(os.path.abspath(csv_path))
+        stem = f"{stem}_{hashlib.sha1(source.encode('utf-8')).hexdigest()[:8]}"
+    return stem
+
+
+def cache_path_for(csv_path, suffix, cache_dir=None, version=None):
+    """
+    Returns the cache path of an artifact derived from a version of csv_path (by default the
+    current one).
+    """
+    if version is None:
+        version = current_version(csv_path, cache_dir)
+    cache_dir = get_cache_dir(csv_path, cache_dir)
+    return os.path.join(cache_dir, f"{_cache_stem(csv_path)}-{version}{suffix}")
+
+
+def delta_manifest_path(csv_path, cache_dir=None):
+    return os.path.join(get_cache_dir(csv_path, cache_dir), f"{_cache_stem(csv_path)}{DELTA_MANIFEST_SUFFIX}")
+
+
+def read_delta_manifest(csv_path, cache_dir=None):
+    """
+    The record of deltas applied on top of the current export of csv_path, or None if there is
+    none or it was written for an earlier export.
+    """
+    try:
+        with open(delta_manifest_path(csv_path, cache_dir)) as source:
+            manifest = json.load(source)
+    except (OSError, ValueError):
+        return None
+    return manifest if manifest.get('base') == file_fingerprint(csv_path) else None
+
+
+def write_delta_manifest(csv_path, manifest, cache_dir=None):
+    """
+    Publishes a new delta record. The replace is atomic, so readers see either the previous
+    version or the new one.
+    """
+    path = delta_manifest_path(csv_path, cache_dir)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    with open(tmp_path, 'w') as out:
+        json.dump(manifest, out, indent=2)
+    os.replace(tmp_path, path)
+
+
+def current_version(csv_path, cache_dir=None):
+    """
+    Version token of the data behind csv_path: the fingerprint of the export itself, or the version
+    published by the last delta applied on top of it. A delta version whose edge store is gone is
+    ignored, so the export is ingested again rather than served incomplete.
+    """
+    manifest = read_delta_manifest(csv_path, cache_dir)
+    if manifest is not None:
+        version = manifest['version']
+        if os.path.exists(cache_path_for(csv_path, '.feather', cache_dir, version)):
+            return version
+    return file_fingerprint(csv_path)
+
+
+def is_current_version(csv_path, version, cache_dir=None):
+    """
+    Whether artifacts built for `version` (None: the current one) may still be persisted. Sessions
+    that outlive a delta keep building lazily for their old version; those results stay in memory.
+    """
+    return version is None or version == current_version(csv_path, cache_dir)
+
+
+def iter_edge_csv_chunks(csv_path, chunksize=None):
+    """
+    Parses the raw edge CSV chunk by chunk, yielding typed edge tables of at most chunksize rows
+    (CSV_CHUNK_ROWS by default).
+    """
+    chunksize = chunksize or CSV_CHUNK_ROWS
+    reader = pd.read_csv(
+        csv_path, low_memory=False, chunksize=chunksize,
+        dtype={col: 'category' for col in CATEGORY_COLUMNS}
+    )
+    with reader:
+        for chunk in reader:
+            yield normalize_edge_dtypes(chunk)
+
+
+def normalize_edge_dtypes(df):
+    """
+    Coerces an edge table to the fixed cache schema: int64 NPIs, float64 scores, float32 connection
+    strength and categorical text.
+    """
+    missing = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing:
+        raise KeyError(", ".join(missing))
+
+    for col in OPTIONAL_NUMERIC_COLUMNS:
+        if col not in df.columns:
+            df[col] = float('nan')
+
+    # Edges without a valid NPI on both ends never reach the node table or the graph
+    for col in NPI_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce')
+    df = df.dropna(subset=NPI_COLUMNS)
+    df = df.astype({col: 'int64' for col in NPI_COLUMNS})
+
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype('float64')
+    df[STRENGTH_COLUMN] = df[STRENGTH_COLUMN].astype('float32')
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns and not isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype('category')
+    return df.reset_index(drop=True)
+
+
+class CategoryDictionary:
+    """
+    Append-only category list shared by every chunk of one text column, so chunk dictionaries only
+    ever grow and can be written as Arrow dictionary deltas.
+    """
+
+    def __init__(self):
+        self.categories = []
+        self.known = set()
+
+    def conform(self, series):
+        new = [value for value in series.cat.categories if value not in self.known]
+        self.categories.extend(new)
+        self.known.update(new)
+        return series.cat.set_categories(self.categories)
+
+
+def _edge_store_schema(chunk):
+    """
+    Arrow schema of the edge store, with fixed-width dictionary indices for categorical columns.
+    """
+    schema = pa.Schema.from_pandas(chunk, preserve_index=False).remove_metadata()
+    return pa.schema([
+        pa.field(field.name, pa.dictionary(pa.int32(), field.type.value_type))
+        if pa.types.is_dictionary(field.type) else field
+        for field in schema
+    ])
+
+
+def write_edge_chunks(chunks, path):
+    """
+    Streams typed edge chunks into an uncompressed Feather (Arrow IPC) file, extending the category
+    dictionaries as new values appear. Returns False (and writes nothing) if there were no chunks.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    dictionaries = {}
+    schema, writer = None, None
+    try:
+        for chunk in chunks:
+            for col in CATEGORY_COLUMNS:
+                if col in chunk.columns:
+                    chunk[col] = dictionaries.setdefault(col, CategoryDictionary()).conform(chunk[col])
+            if writer is None:
+                schema = _edge_store_schema(chunk)
+                writer = ipc.new_file(tmp_path, schema, options=ipc.IpcWriteOptions(emit_dictionary_deltas=True))
+            writer.write_batch(pa.RecordBatch.from_pandas(chunk, schema=schema, preserve_index=False))
+    finally:
+        if writer is not None:
+            writer.close()
+    if writer is None:
+        return False
+    os.replace(tmp_path, path)
+    return True
+
+
+def write_edge_store(csv_path, path, chunksize=None, chunks=None):
+    """
+    Streams the CSV (or `chunks` already parsed from it) into an uncompressed Feather (Arrow IPC)
+    file one chunk at a time, so peak memory is bounded by chunksize rather than by the size of the
+    export.
+    """
+    if chunks is None:
+        chunks = iter_edge_csv_chunks(csv_path, chunksize)
+    if not write_edge_chunks(chunks, path):
+        # Header-only export: keep the typed (empty) schema
+        write_feather_atomic(normalize_edge_dtypes(pd.read_csv(csv_path, nrows=0)), path)
+
+
+def _ingest_edge_file(csv_path, part_path):
+    """
+    Map step of the multi-file ingest, run in a worker process: writes one edge file as a part
+    store and returns the partial node aggregates of its edges.
+    """
+    partial = None
+
+    def chunks():
+        nonlocal partial
+        for chunk in iter_edge_csv_chunks(csv_path):
+            partial = add_node_aggregates(partial, chunk)
+            yield chunk
+
+    write_edge_store(csv_path, part_path, chunks=chunks())
+    return partial
+
+
+def _part_chunks(part_paths):
+    """
+    Every chunk of the part stores in order, with the union of their columns; columns missing
+    from a file are filled with nulls.
+    """
+    columns = []
+    for part_path in part_paths:
+        with pa.memory_map(part_path) as source:
+            columns += [col for col in ipc.open_file(source).schema.names if col not in columns]
+    for part_path in part_paths:
+        for chunk in iter_feather_batches(part_path):
+            for col in columns:
+                if col not in chunk.columns:
+                    chunk[col] = pd.Categorical([None] * len(chunk)) if col in CATEGORY_COLUMNS else float('nan')
+            yield chunk[columns]
+
+
+def ingest_edge_files(files, path, workers=None):
+    """
+    Parses several edge files in a process pool and writes them, in order, as one edge store at
+    `path`. Each worker also aggregates the nodes of its own file; the partial aggregates are then
+    merged pairwise, in file order, in the same pool. Returns the node table, so the graph index
+    does not need another pass over the edges.
+    """
+    workers = workers or min(len(files), os.cpu_count() or 1)
+    part_paths = [f"{path}.part{i}-{os.getpid()}" for i in range(len(files))]
+    try:
+        # Spawned workers: the app would fork from a multi-threaded server otherwise. With a single
+        # worker the pool is pure overhead, so the files are read in this process instead.
+        with (ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'))
+              if workers > 1 else contextlib.nullcontext()) as pool:
+            run = map if pool is None else pool.map
+            partials = list(run(_ingest_edge_file, files, part_paths))
+            while len(partials) > 1:
+                merged = list(run(merge_node_aggregates, partials[0::2], partials[1::2]))
+                partials = merged + partials[len(merged) * 2:]
+        if not write_edge_chunks(_part_chunks(part_paths), path):
+            os.replace(part_paths[0], path)
+    finally:
+        for part_path in part_paths:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+    return finish_node_aggregates(partials[0])
+
+
+def write_edge_table(df, path, chunksize=CSV_CHUNK_ROWS):
+    """
+    Writes a typed edge table with the same schema the streaming ingest produces, in record
+    batches of chunksize rows (None: a single batch, for copy-free memory-mapped reads).
+    """
+    table = pa.Table.from_pandas(df, schema=_edge_store_schema(df), preserve_index=False)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    feather.write_feather(table, tmp_path, compression='uncompressed', chunksize=chunksize or max(len(df), 1))
+    os.replace(tmp_path, path)
+
+
+def write_feather_atomic(df, path):
+    """
+    Writes df as an uncompressed Feather file of a single record batch, so later reads can be
+    memory-mapped without copying.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    feather.write_feather(df, tmp_path, compression='uncompressed', chunksize=max(len(df), 1))
+    os.replace(tmp_path, path)
+
+
+def iter_feather_batches(path, columns=None):
+    """
+    Yields a memory-mapped Feather file one record batch at a time as DataFrames.
+    """
+    with pa.memory_map(path) as source:
+        reader = ipc.open_file(source)
+        for i in range(reader.num_record_batches):
+            batch = reader.get_batch(i)
+            if columns is not None:
+                batch = batch.select([col for col in columns if col in batch.schema.names])
+            yield batch.to_pandas(split_blocks=True)
+
+
+def read_feather_mmap(path, columns=None):
+    """
+    Loads a Feather file through a memory map. Numeric columns of a single-batch file (as
+    write_feather_atomic writes them) are not copied; a file of several record batches is
+    concatenated into new memory. Only the listed columns that exist in the file are read when
+    `columns` is given.
+    """
+    table = feather.read_table(path, memory_map=True)
+    if columns is not None:
+        table = table.select([col for col in columns if col in table.column_names])
+    return table.to_pandas(split_blocks=True)
+
+
+def _published_version(cache_dir, stem):
+    try:
+        with open(os.path.join(cache_dir, f"{stem}{DELTA_MANIFEST_SUFFIX}")) as source:
+            return json.load(source).get('version')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def remove_stale_caches(keep_path, suffix):
+    """
+    Deletes artifacts with the same suffix left behind by older versions of the same source file.
+    The version published by the delta record is never deleted, even when keep_path is older.
+    """
+    cache_dir, name = os.path.split(keep_path)
+    stem = name[:-len(suffix)].rsplit('-', 1)[0]
+    published = _published_version(cache_dir, stem)
+    # Exactly '<stem>-<version><suffix>': '-*.feather' alone would also match other artifacts
+    # ('-<version>.analytics.feather') and other sources whose stem starts with '<stem>-'
+    versioned = re.compile(re.escape(stem) + r'-[0-9a-f]{16}' + re.escape(suffix))
+    for path in glob.glob(os.path.join(glob.escape(cache_dir), f"{glob.escape(stem)}-*{suffix}")):
+        if os.path.abspath(path) == os.path.abspath(keep_path):
+            continue
+        if not versioned.fullmatch(os.path.basename(path)):
+            continue
+        if published is not None and os.path.basename(path) == f"{stem}-{published}{suffix}":
+            continue
+        try:
+            if os.path.isdir(path):
+                shutil.rmtree(path)
+            else:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def edge_store_path(csv_path, cache_dir=None, version=None):
+    """
+    Returns the Feather edge store of a version of csv_path (by default the current one), streaming
+    the CSV into it the first time that version is seen.
+    """
+    if version is None:
+        version = current_version(csv_path, cache_dir)
+    cache_path = cache_path_for(csv_path, '.feather', cache_dir, version)
+    if not os.path.exists(cache_path):
+        if version != file_fingerprint(csv_path):
+            # Delta versions are only ever written by apply_delta; the export does not hold their edges
+            raise FileNotFoundError(cache_path)
+        files = source_files(csv_path)
+        if len(files) > 1:
+            nodes_path = cache_path_for(csv_path, '.nodes.feather', cache_dir, version)
+            write_feather_atomic(ingest_edge_files(files, cache_path), nodes_path)
+            remove_stale_caches(nodes_path, '.nodes.feather')
+        else:
+            write_edge_store(files[0], cache_path)
+        remove_stale_caches(cache_path, '.feather')
+    return cache_path
+
+
+def edge_table_path(csv_path, cache_dir=None, version=None):
+    """
+    Returns the edge table file of a version of csv_path: EDGE_COLUMNS as a single record batch.
+    The streamed edge store holds one batch per CSV chunk or file, which can only be read by
+    concatenating (copying) them, so the compact columns are combined once here and written again.
+    """
+    if version is None:
+        version = current_version(csv_path, cache_dir)
+    path = cache_path_for(csv_path, EDGE_TABLE_SUFFIX, cache_dir, version)
+    if not os.path.exists(path):
+        edges = read_feather_mmap(edge_store_path(csv_path, cache_dir, version), EDGE_COLUMNS)
+        write_edge_table(edges, path, chunksize=None)
+        remove_stale_caches(path, EDGE_TABLE_SUFFIX)
+    return path
+
+
+def load_edge_table(csv_path, cache_dir=None, columns=EDGE_COLUMNS, version=None):
+    """
+    Returns the compact edge table for csv_path, memory-mapped from the edge table file so its
+    numeric columns are shared rather than copied. Pass columns=None for every typed column of the
+    export, read (and copied) from the chunked edge store.
+    """
+    if columns is not None and set(columns) <= set(EDGE_COLUMNS):
+        return read_feather_mmap(edge_table_path(csv_path, cache_dir, version), columns)
+    return read_feather_mmap(edge_store_path(csv_path, cache_dir, version), columns)
+
+
+def iter_edge_batches(csv_path, cache_dir=None, columns=None, version=None):
+    """
+    Yields the edge store chunk by chunk (as written by the streaming ingest).
+    """
+    return iter_feather_batches(edge_store_path(csv_path, cache_dir, version), columns)
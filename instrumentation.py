@@ -0,0 +1,167 @@
+import functools
+import json
+import logging
+import os
+import platform
+import threading
+import time
+from contextlib import contextmanager
+
+# --- Per-rerun stage timings, cache hit/miss counters and memory deltas, logged as JSON lines ---
+
+LOGGER_NAME = 'hcp_network.performance'
+LOG_LEVEL_ENV = 'HCP_PERF_LOG_LEVEL'
+
+_local = threading.local()
+_totals_lock = threading.Lock()
+_cache_totals = {}
+
+
+def current_rss():
+    """
+    Resident set size of this process in bytes (Linux /proc; elsewhere the peak from getrusage).
+    """
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        import resource
+        # ru_maxrss is in KiB on Linux and bytes on macOS
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if platform.system() == 'Darwin' else peak * 1024
+
+
+def _logger():
+    logger = logging.getLogger(LOGGER_NAME)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter('%(message)s'))
+        logger.addHandler(handler)
+        logger.setLevel(os.environ.get(LOG_LEVEL_ENV, 'INFO').upper())
+        logger.propagate = False
+    return logger
+
+
+def _row_count(value):
+    shape = getattr(value, 'shape', None)
+    if isinstance(shape, tuple):
+        return int(shape[0]) if shape else None
+    if isinstance(value, (list, tuple)):
+        return len(value)
+    return None
+
+
+class Rerun:
+    """
+    Everything measured during one script run: stages in the order they finished and every call
+    to an instrumented cached function.
+    """
+
+    def __init__(self, session_id=None):
+        self.session_id = session_id
+        self.started = time.perf_counter()
+        self.rss_start = current_rss()
+        self.stages = []
+        self.cache_calls = []
+        self.seconds = None
+
+    def record(self):
+        rss = current_rss()
+        return {
+            'event': 'rerun', 'session': self.session_id, 'seconds': self.seconds,
+            'rss_mb': round(rss / 2 ** 20, 1), 'rss_delta_mb': round((rss - self.rss_start) / 2 ** 20, 1),
+            'stages': self.stages, 'cache': self.cache_calls,
+        }
+
+
+def current_rerun():
+    return getattr(_local, 'rerun', None)
+
+
+def begin_rerun(session_id=None):
+    """
+    Starts collecting measurements for the script run on this thread.
+    """
+    _local.rerun = Rerun(session_id)
+    _local.cache_frames = []
+    return _local.rerun
+
+
+def end_rerun(rerun):
+    """
+    Closes the run and emits it as one structured log line.
+    """
+    rerun.seconds = round(time.perf_counter() - rerun.started, 4)
+    _local.rerun = None
+    _logger().info(json.dumps(rerun.record(), default=str))
+    return rerun
+
+
+@contextmanager
+def stage(name, rows_in=None):
+    """
+    Times a block and its memory delta. Set `.rows_out` on the yielded dict to record output size.
+    """
+    entry = {'stage': name, 'rows_in': rows_in, 'rows_out': None}
+    rss_start = current_rss()
+    start = time.perf_counter()
+    try:
+        yield entry
+    finally:
+        entry['seconds'] = round(time.perf_counter() - start, 4)
+        entry['rss_delta_mb'] = round((current_rss() - rss_start) / 2 ** 20, 1)
+        rerun = current_rerun()
+        if rerun is not None:
+            rerun.stages.append(entry)
+
+
+def instrumented_cache(cache_decorator):
+    """
+    Wraps a Streamlit cache decorator so every call records whether it was a hit or a miss and
+    how long it took. The wrapped function body only runs on a miss, which is how misses are
+    detected; nested cached calls each get their own frame.
+    """
+    def decorate(func):
+        @functools.wraps(func)
+        def compute(*args, **kwargs):
+            frames = getattr(_local, 'cache_frames', None)
+            if frames:
+                frames[-1]['miss'] = True
+            return func(*args, **kwargs)
+
+        cached = cache_decorator(compute)
+
+        @functools.wraps(func)
+        def call(*args, **kwargs):
+            if not hasattr(_local, 'cache_frames'):
+                _local.cache_frames = []
+            frame = {'miss': False}
+            _local.cache_frames.append(frame)
+            start = time.perf_counter()
+            try:
+                result = cached(*args, **kwargs)
+            finally:
+                _local.cache_frames.pop()
+            seconds = round(time.perf_counter() - start, 4)
+            with _totals_lock:
+                totals = _cache_totals.setdefault(func.__name__, {'hits': 0, 'misses': 0})
+                totals['misses' if frame['miss'] else 'hits'] += 1
+            rerun = current_rerun()
+            if rerun is not None:
+                rerun.cache_calls.append({
+                    'function': func.__name__, 'hit': not frame['miss'], 'seconds': seconds,
+                    'rows_out': _row_count(result),
+                })
+            return result
+
+        call.clear = cached.clear
+        return call
+    return decorate
+
+
+def cache_totals():
+    """
+    Process-wide hit/miss counts per instrumented cached function.
+    """
+    with _totals_lock:
+        return {name: dict(counts) for name, counts in _cache_totals.items()}
@@ -0,0 +1,105 @@
+import numpy as np
+import networkx as nx
+
+# --- Server-side graph layout: fixed coordinates computed once per dataset/filter ---
+
+NX_LAYOUT_LIMIT = 500       # networkx's dense spring layout is used below this size
+EXACT_REPULSION_LIMIT = 1000  # above this, repulsion is estimated against sampled anchor nodes
+REPULSION_SAMPLE = 400
+REPULSION_CHUNK = 512
+PIXELS_PER_NODE = 120
+
+
+def _networkx_layout(num_nodes, src, dst, weights, iterations, seed):
+    graph = nx.Graph()
+    graph.add_nodes_from(range(num_nodes))
+    graph.add_weighted_edges_from(zip(src.tolist(), dst.tolist(), weights.tolist()))
+    pos = nx.spring_layout(graph, weight='weight', iterations=iterations, seed=seed)
+    return np.array([pos[i] for i in range(num_nodes)])
+
+
+def _repulsion(pos, k, anchors):
+    """
+    Fruchterman-Reingold repulsion of every node against `anchors`, computed in row chunks
+    to bound memory; sampled anchors are scaled up to stand in for the whole graph.
+    """
+    disp = np.zeros_like(pos)
+    anchor_x, anchor_y = pos[anchors, 0], pos[anchors, 1]
+    scale = k * k * len(pos) / len(anchors)
+    for start in range(0, len(pos), REPULSION_CHUNK):
+        chunk = pos[start:start + REPULSION_CHUNK]
+        dx = chunk[:, 0:1] - anchor_x
+        dy = chunk[:, 1:2] - anchor_y
+        inv = scale / np.maximum(dx * dx + dy * dy, 1e-6)
+        disp[start:start + REPULSION_CHUNK, 0] = (dx * inv).sum(axis=1)
+        disp[start:start + REPULSION_CHUNK, 1] = (dy * inv).sum(axis=1)
+    return disp
+
+
+def _force_layout(num_nodes, src, dst, weights, iterations, seed):
+    """
+    Vectorized Fruchterman-Reingold for graphs too large for networkx's dense solver.
+    """
+    rng = np.random.default_rng(seed)
+    pos = rng.random((num_nodes, 2), dtype=np.float32)
+    weights = weights.astype(np.float32)
+    k = np.float32(1 / np.sqrt(num_nodes))
+    temperature = 0.1
+    cooling = temperature / (iterations + 1)
+    exact = num_nodes <= EXACT_REPULSION_LIMIT
+
+    for _ in range(iterations):
+        anchors = np.arange(num_nodes) if exact else rng.choice(num_nodes, REPULSION_SAMPLE, replace=False)
+        disp = _repulsion(pos, k, anchors)
+
+        delta = pos[src] - pos[dst]
+        dist = np.maximum(np.sqrt((delta ** 2).sum(axis=1)), 1e-6)
+        pull = delta * (dist * weights / k)[:, None]
+        for axis in range(2):
+            disp[:, axis] -= np.bincount(src, weights=pull[:, axis], minlength=num_nodes).astype(np.float32)
+            disp[:, axis] += np.bincount(dst, weights=pull[:, axis], minlength=num_nodes).astype(np.float32)
+
+        length = np.maximum(np.sqrt((disp ** 2).sum(axis=1)), 1e-6)
+        pos += disp * (np.minimum(length, temperature) / length)[:, None]
+        temperature -= cooling
+    return pos.astype(float)
+
+
+def compute_layout(node_npis, edge_npis_1, edge_npis_2, weights=None, iterations=50, seed=42):
+    """
+    Computes 2D pixel coordinates for a subgraph and returns them as {NPI: (x, y)}.
+    Edges with an endpoint outside node_npis are ignored.
+    """
+    node_npis = np.asarray(node_npis, dtype=np.int64)
+    num_nodes = len(node_npis)
+    if num_nodes == 0:
+        return {}
+    if num_nodes == 1:
+        return {int(node_npis[0]): (0.0, 0.0)}
+
+    order = np.argsort(node_npis)
+    sorted_npis = node_npis[order]
+    edge_npis_1 = np.asarray(edge_npis_1, dtype=np.int64)
+    edge_npis_2 = np.asarray(edge_npis_2, dtype=np.int64)
+    pos_1 = np.minimum(np.searchsorted(sorted_npis, edge_npis_1), num_nodes - 1)
+    pos_2 = np.minimum(np.searchsorted(sorted_npis, edge_npis_2), num_nodes - 1)
+    keep = (sorted_npis[pos_1] == edge_npis_1) & (sorted_npis[pos_2] == edge_npis_2) & (pos_1 != pos_2)
+    src, dst = order[pos_1[keep]], order[pos_2[keep]]
+
+    if weights is None:
+        weights = np.ones(len(keep))
+    weights = np.nan_to_num(np.asarray(weights, dtype=float)[keep], nan=0.0)
+    if len(weights) and weights.max() > 0:
+        weights = 0.1 + weights / weights.max()
+
+    if num_nodes < NX_LAYOUT_LIMIT:
+        pos = _networkx_layout(num_nodes, src, dst, weights, iterations, seed)
+    else:
+        pos = _force_layout(num_nodes, src, dst, weights, iterations, seed)
+
+    # Center, then spread the layout so that node density stays roughly constant
+    pos = pos - pos.mean(axis=0)
+    extent = np.abs(pos).max()
+    if extent > 0:
+        pos = pos / extent * (PIXELS_PER_NODE * np.sqrt(num_nodes))
+    return {int(npi): (float(x), float(y)) for npi, (x, y) in zip(node_npis, pos)}
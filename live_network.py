@@ -0,0 +1,95 @@
+import json
+import os
+import streamlit as st
+import streamlit.components.v1 as components
+
+# --- Persistent network component: the browser keeps its vis.js DataSets and receives diffs ---
+
+COMPONENT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "network_component")
+SYNC_STATE_KEY = 'network_sync'
+REVISION_KEY = 'network_sync_revision'
+POSITION_KEYS = ('x', 'y')
+
+_live_network = components.declare_component("live_network", path=COMPONENT_DIR)
+
+
+def _without_positions(record):
+    return {key: value for key, value in record.items() if key not in POSITION_KEYS}
+
+
+def record_digests(records):
+    """
+    Returns {id: hash} of vis.js records, ignoring positions. This is all a session keeps of what
+    the browser shows; the records themselves stay in the shared network cache.
+    """
+    return {
+        record['id']: hash(json.dumps(_without_positions(record), sort_keys=True, separators=(',', ':')))
+        for record in records
+    }
+
+
+def diff_records(previous, records):
+    """
+    Compares vis.js records against the digests of the ones already in the browser ({id: hash}).
+    Returns (added, updated, removed_ids, current digests). Records already shown keep their
+    browser position, so they are sent without coordinates.
+    """
+    current = record_digests(records)
+    added, updated = [], []
+    for record in records:
+        digest = previous.get(record['id'])
+        if digest is None:
+            added.append(record)
+        elif digest != current[record['id']]:
+            updated.append(_without_positions(record))
+    removed = [record_id for record_id in previous if record_id not in current]
+    return added, updated, removed, current
+
+
+def reset_live_network():
+    """
+    Forgets what the browser holds, so the next render sends a full snapshot.
+    """
+    st.session_state.pop(SYNC_STATE_KEY, None)
+
+
+def live_network(nodes, edges, options_json, fit=False, height=900, key="live_network"):
+    """
+    Renders the network in a component that survives reruns. Only the nodes and edges added,
+    changed or removed since the previous run are sent; a browser that missed a revision
+    (e.g. a reloaded frame) asks for a resync and gets a full snapshot.
+    """
+    state = st.session_state.get(SYNC_STATE_KEY)
+    reply = st.session_state.get(key) or {}
+    if state is not None and reply.get('resync') and reply.get('request') != state['handled_request']:
+        state = None
+    handled_request = state['handled_request'] if state else reply.get('request')
+
+    # Revisions only ever grow within a session, so a snapshot never repeats an id the browser saw
+    last_revision = st.session_state.get(REVISION_KEY, 0)
+    if state is None:
+        # Full snapshot: the browser clears its DataSets before applying it
+        base, revision = None, last_revision + 1
+        node_delta = (list(nodes), [], [], record_digests(nodes))
+        edge_delta = (list(edges), [], [], record_digests(edges))
+        options_changed = True
+    else:
+        base, revision = last_revision, last_revision
+        node_delta = diff_records(state['nodes'], nodes)
+        edge_delta = diff_records(state['edges'], edges)
+        options_changed = options_json != state['options']
+        if fit or options_changed or any(node_delta[:3]) or any(edge_delta[:3]):
+            revision += 1
+
+    st.session_state[REVISION_KEY] = revision
+    st.session_state[SYNC_STATE_KEY] = {
+        'nodes': node_delta[3], 'edges': edge_delta[3],
+        'options': options_json, 'handled_request': handled_request
+    }
+    delta = {
+        'base': base, 'revision': revision, 'fit': bool(fit),
+        'options': options_json if options_changed else None,
+        'nodes': {'add': node_delta[0], 'update': node_delta[1], 'remove': node_delta[2]},
+        'edges': {'add': edge_delta[0], 'update': edge_delta[1], 'remove': edge_delta[2]},
+    }
+    return _live_network(delta=delta, height=height, key=key, default=None)
@@ -0,0 +1,48 @@
+import sys
+import pandas as pd
+from ingest import load_edge_table
+from graph_index import INDEX_ARRAYS, load_graph_index
+
+# --- Memory footprint of the in-memory data model, before and after the compact representation ---
+
+
+def frame_bytes(df):
+    """
+    Deep in-memory size of a DataFrame, including Python string objects and categories.
+    """
+    return int(df.memory_usage(index=True, deep=True).sum())
+
+
+def memory_report(csv_path):
+    """
+    Compares the footprint of the raw pandas frame with the compact edge table, node table and
+    graph index that the app keeps per dataset. Returns one row per representation.
+    """
+    raw = pd.read_csv(csv_path, low_memory=False)
+    full = load_edge_table(csv_path, columns=None)
+    edges = load_edge_table(csv_path)
+    graph_index = load_graph_index(csv_path, edges)
+    index_bytes = sum(getattr(graph_index, name).nbytes for name in INDEX_ARRAYS)
+
+    rows = [
+        ('raw read_csv (before)', raw.shape, frame_bytes(raw)),
+        ('typed edge table, all columns', full.shape, frame_bytes(full)),
+        ('compact edge table', edges.shape, frame_bytes(edges)),
+        ('node table', graph_index.nodes.shape, frame_bytes(graph_index.nodes)),
+        ('graph index arrays', (graph_index.num_edges, len(INDEX_ARRAYS)), index_bytes),
+    ]
+    report = pd.DataFrame(
+        [(name, shape[0], shape[1], size) for name, shape, size in rows],
+        columns=['representation', 'rows', 'columns', 'bytes']
+    )
+    report['MB'] = (report['bytes'] / 2 ** 20).round(2)
+    report['vs raw'] = (report['bytes'] / report['bytes'].iloc[0]).round(3)
+    return report
+
+
+if __name__ == "__main__":
+    csv_path = sys.argv[1] if len(sys.argv) > 1 else "Main DB_1.csv"
+    report = memory_report(csv_path)
+    print(report.to_string(index=False))
+    after = report.set_index('representation').loc[['compact edge table', 'node table'], 'bytes'].sum()
+    print(f"\nEdge + node tables: {after / 2 ** 20:.2f} MB vs {report['bytes'].iloc[0] / 2 ** 20:.2f} MB raw")
@@ -0,0 +1,162 @@
+import re
+import numpy as np
+import pandas as pd
+
+# --- HCP search: name token prefixes, name trigrams for typos, and NPI lookup ---
+
+NPI_DIGITS = 10
+MIN_TRIGRAM_SIMILARITY = 0.3
+
+
+def normalize_name(text):
+    return re.sub(r'\s+', ' ', str(text)).strip().lower()
+
+
+def _trigram_codes(texts):
+    """
+    Byte trigrams of every text (padded with spaces) as integer codes, vectorized over one
+    concatenated buffer. Returns (codes, owner position of each code).
+    """
+    encoded = [f"  {text} ".encode('utf-8') for text in texts]
+    lengths = np.fromiter((len(data) for data in encoded), dtype=np.int64, count=len(encoded))
+    buffer = np.frombuffer(b''.join(encoded), dtype=np.uint8).astype(np.int64)
+    if len(buffer) < 3:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    owners = np.repeat(np.arange(len(encoded), dtype=np.int64), lengths)
+    codes = (buffer[:-2] << 16) | (buffer[1:-1] << 8) | buffer[2:]
+    # Keep trigrams that start and end within the same text
+    same = owners[:-2] == owners[2:]
+    return codes[same], owners[:-2][same]
+
+
+class NameSearchIndex:
+    """
+    Typeahead search over the node table. Every word of every name is kept in one sorted array,
+    so a query word is a prefix range found by binary search (a flattened trie), and whole names are
+    sorted the same way for exact and prefix matches. Queries with typos fall back to trigram postings
+    scored by Jaccard similarity, and digit queries are exact or prefix lookups on the sorted NPIs.
+    """
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+        self.npis = nodes['NPI'].to_numpy()
+        self.names = (nodes['hcp_name'].astype(str).str.replace(r'\s+', ' ', regex=True).str.strip().str.lower()
+                      .to_numpy(dtype=object))
+        # Better-connected HCPs first among equally good matches
+        self.rank = np.argsort(np.argsort(-nodes['connections'].to_numpy(dtype=float), kind='stable'), kind='stable')
+
+        self.name_order = np.argsort(self.names.astype(str), kind='stable')
+        self.sorted_names = self.names.astype(str)[self.name_order]
+
+        words = pd.Series(self.names).str.split(' ').explode()
+        words = words[words.astype(bool)]
+        order = np.argsort(words.to_numpy(dtype=str), kind='stable')
+        self.words = words.to_numpy(dtype=str)[order]
+        self.word_owners = words.index.to_numpy(dtype=np.int64)[order]
+
+        codes, owners = _trigram_codes(self.names)
+        # Postings per trigram: sorted, de-duplicated (trigram, node id) pairs
+        num_names = max(len(self.names), 1)
+        pairs = np.sort(codes * num_names + owners)
+        pairs = pairs[np.r_[True, pairs[1:] != pairs[:-1]]] if len(pairs) else pairs
+        codes, owners = pairs // num_names, pairs % num_names
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.empty(0, dtype=np.int64)
+        self.trigrams = codes[starts]
+        self.trigram_offsets = np.append(starts, len(codes))
+        self.trigram_owners = owners
+        self.trigram_counts = np.bincount(owners, minlength=len(self.names))
+
+    def _name_range(self, query, prefix=False):
+        """
+        Node ids whose whole name equals (or, with prefix, starts with) the query.
+        """
+        lo = np.searchsorted(self.sorted_names, query, side='left')
+        if prefix:
+            hi = np.searchsorted(self.sorted_names, query + '\uffff', side='left')
+        else:
+            hi = np.searchsorted(self.sorted_names, query, side='right')
+        return self.name_order[lo:hi]
+
+    def _word_matches(self, words):
+        """
+        Node ids whose name has a word starting with each query word.
+        """
+        matched = np.ones(len(self.names), dtype=bool)
+        for word in words:
+            lo = np.searchsorted(self.words, word, side='left')
+            hi = np.searchsorted(self.words, word + '\uffff', side='left')
+            mask = np.zeros(len(self.names), dtype=bool)
+            mask[self.word_owners[lo:hi]] = True
+            matched &= mask
+        return np.flatnonzero(matched)
+
+    def _best_connected(self, ids, k):
+        if len(ids) > k:
+            ids = ids[np.argpartition(self.rank[ids], k)[:k]]
+        return ids[np.argsort(self.rank[ids])]
+
+    def _fuzzy_matches(self, query, limit):
+        """
+        Node ids most similar to the query by trigram Jaccard similarity, best first.
+        """
+        codes = np.unique(_trigram_codes([query])[0])
+        pos = np.searchsorted(self.trigrams, codes)
+        found = pos < len(self.trigrams)
+        found[found] = self.trigrams[pos[found]] == codes[found]
+        pos = pos[found]
+        if len(pos) == 0:
+            return np.empty(0, dtype=np.int64)
+        owners = np.concatenate([self.trigram_owners[self.trigram_offsets[p]:self.trigram_offsets[p + 1]] for p in pos])
+        candidates, shared = np.unique(owners, return_counts=True)
+        similarity = shared / (len(codes) + self.trigram_counts[candidates] - shared)
+        keep = similarity >= MIN_TRIGRAM_SIMILARITY
+        candidates, similarity = candidates[keep], similarity[keep]
+        order = np.lexsort((self.rank[candidates], -similarity))[:limit]
+        return candidates[order]
+
+    def _npi_matches(self, digits):
+        """
+        Node ids with exactly this NPI, or whose 10-digit NPI starts with these digits.
+        """
+        value = int(digits)
+        if len(digits) >= NPI_DIGITS:
+            lo, hi = value, value + 1
+        else:
+            scale = 10 ** (NPI_DIGITS - len(digits))
+            lo, hi = value * scale, (value + 1) * scale
+        ids = np.arange(np.searchsorted(self.npis, lo), np.searchsorted(self.npis, hi), dtype=np.int64)
+        exact = np.searchsorted(self.npis, value)
+        if exact < len(self.npis) and self.npis[exact] == value and exact not in ids:
+            ids = np.append(exact, ids)
+        return ids
+
+    def search(self, query, k=10):
+        """
+        Node ids of the best k matches for a name fragment or NPI, best first.
+        """
+        query = normalize_name(query)
+        if not query or k <= 0:
+            return np.empty(0, dtype=np.int64)
+        if query.isdigit():
+            return self._npi_matches(query)[:k]
+
+        # Exact names, then whole-name prefixes, then names matching every query word; each tier by connections
+        found = np.empty(0, dtype=np.int64)
+        for tier in (self._name_range(query), self._name_range(query, prefix=True), self._word_matches(query.split(' '))):
+            tier = tier[~np.isin(tier, found)]
+            found = np.concatenate([found, self._best_connected(tier, k - len(found))])
+            if len(found) >= k:
+                return found
+        fuzzy = self._fuzzy_matches(query, k + len(found))
+        return np.concatenate([found, fuzzy[~np.isin(fuzzy, found)]])[:k]
+
+    def labels(self, node_ids):
+        """
+        Display label per node id: name, NPI and location, unambiguous for duplicate names.
+        """
+        rows = self.nodes.iloc[node_ids]
+        return [
+            f"{name} (NPI {npi}) · {city}, {state}"
+            for name, npi, city, state in zip(rows['hcp_name'], rows['NPI'], rows['city'].astype(object).fillna('N/A'),
+                                             rows['state'].astype(object).fillna('N/A'))
+        ]
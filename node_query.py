@@ -0,0 +1,154 @@
+import copy
+import numpy as np
+import pandas as pd
+
+# --- Node query engine: pre-sorted metric orders and coded state/city postings ---
+
+RANGE_METRICS = ['connections', 'influence', 'papers', 'panels', 'trials']
+CODED_COLUMNS = ['state', 'city']
+WALK_CHUNK = 1024
+
+
+def _descending_order(values):
+    """
+    Node ids by descending value, ties in node order and NaN last (the order of DataFrame.nlargest).
+    """
+    order = np.argsort(-values, kind='stable')
+    return order[np.argsort(np.isnan(values[order]), kind='stable')]
+
+
+class NodeQueryIndex:
+    """
+    Answers the sidebar filters over the node table without scanning it: every metric keeps its
+    node ids in descending order, so a minimum threshold is a binary search giving a prefix of
+    that order, and state/city selections are posting lists of node ids per category code.
+    Top-N results come from walking the pre-sorted order of the sort metric.
+    """
+
+    def __init__(self, nodes, metrics=None):
+        self.nodes = nodes
+        self.values = {}
+        self.orders = {}
+        self.sort_keys = {}
+        self.valid_counts = {}
+        for metric in metrics or RANGE_METRICS:
+            self.add_metric(metric, nodes[metric].to_numpy(dtype=float))
+
+        self.codes = {}
+        self.categories = {}
+        self.postings = {}
+        for column in CODED_COLUMNS:
+            series = nodes[column]
+            if not isinstance(series.dtype, pd.CategoricalDtype):
+                series = series.astype('category')
+            codes = series.cat.codes.to_numpy().astype(np.int64)
+            order = np.argsort(codes, kind='stable')
+            offsets = np.searchsorted(codes[order], np.arange(len(series.cat.categories) + 1))
+            self.codes[column] = codes
+            self.categories[column] = {category: code for code, category in enumerate(series.cat.categories)}
+            self.postings[column] = (offsets, order)
+
+    @property
+    def num_nodes(self):
+        return len(self.nodes)
+
+    def add_metric(self, metric, values):
+        """
+        Registers a per-node metric (one value per node id) for range filters and sorting.
+        """
+        values = np.asarray(values, dtype=float)
+        order = _descending_order(values)
+        self.values[metric] = values
+        self.orders[metric] = order
+        # Negated values in walk order are ascending, with NaN last, so thresholds binary-search them
+        self.sort_keys[metric] = -values[order]
+        self.valid_counts[metric] = len(values) - int(np.count_nonzero(np.isnan(values)))
+
+    def with_metric(self, metric, values):
+        """
+        A copy of this index with `metric` added, leaving this one untouched for its current readers.
+        The per-metric dicts are copied; the arrays, postings and node table are shared.
+        """
+        index = copy.copy(self)
+        index.values, index.orders = dict(self.values), dict(self.orders)
+        index.sort_keys, index.valid_counts = dict(self.sort_keys), dict(self.valid_counts)
+        index.add_metric(metric, values)
+        return index
+
+    def at_least(self, metric, threshold):
+        """
+        Node ids whose metric is >= threshold, in descending metric order (a view, no copy).
+        """
+        count = np.searchsorted(self.sort_keys[metric], -threshold, side='right')
+        return self.orders[metric][:count]
+
+    def members(self, column, selected):
+        """
+        Node ids whose state/city is one of `selected`, in node order.
+        """
+        offsets, order = self.postings[column]
+        codes = sorted({self.categories[column][value] for value in selected if value in self.categories[column]})
+        if not codes:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate([order[offsets[code]:offsets[code + 1]] for code in codes]))
+
+    def _allowed_codes(self, column, selected):
+        allowed = np.zeros(len(self.categories[column]) + 1, dtype=bool)
+        for value in selected:
+            if value in self.categories[column]:
+                allowed[self.categories[column][value]] = True
+        return allowed
+
+    def _predicate(self, ids, minimums, coded):
+        keep = np.ones(len(ids), dtype=bool)
+        for metric, threshold in minimums.items():
+            keep &= self.values[metric][ids] >= threshold
+        for column, allowed in coded.items():
+            # Code -1 (missing) indexes the trailing False slot
+            keep &= allowed[self.codes[column][ids]]
+        return keep
+
+    def query(self, top_n, minimums, selected=None, sort_by='connections'):
+        """
+        Returns the node ids of the top_n nodes by `sort_by` among those meeting every minimum
+        ({metric: threshold}) and state/city selection ({column: values}), matching
+        DataFrame.nlargest on the filtered table.
+        """
+        selected = {column: values for column, values in (selected or {}).items() if values}
+        coded = {column: self._allowed_codes(column, values) for column, values in selected.items()}
+
+        # Smallest candidate set among the individual filters, sized by binary search / posting offsets
+        best, best_size = None, self.num_nodes
+        for metric, threshold in minimums.items():
+            size = np.searchsorted(self.sort_keys[metric], -threshold, side='right')
+            if size < best_size:
+                best, best_size = ('metric', metric, threshold), size
+        for column, values in selected.items():
+            offsets = self.postings[column][0]
+            size = sum(offsets[code + 1] - offsets[code] for code in np.flatnonzero(coded[column][:-1]))
+            if size < best_size:
+                best, best_size = ('coded', column, values), size
+
+        # Selective filters: check the few candidates, then rank them by the sort metric. Walking
+        # the sort order is expected to visit top_n * num_nodes / best_size nodes instead.
+        if best is not None and best_size * best_size < top_n * self.num_nodes:
+            kind, name, argument = best
+            candidates = self.at_least(name, argument) if kind == 'metric' else self.members(name, argument)
+            hits = candidates[self._predicate(candidates, minimums, coded)]
+            hits = hits[~np.isnan(self.values[sort_by][hits])]
+            return hits[np.lexsort((hits, -self.values[sort_by][hits]))][:top_n]
+
+        # Broad filters: walk the pre-sorted order until top_n nodes pass
+        order = self.orders[sort_by]
+        valid = self.valid_counts[sort_by]
+        found = []
+        remaining = top_n
+        start, chunk = 0, max(WALK_CHUNK, 2 * top_n)
+        while remaining > 0 and start < valid:
+            ids = order[start:min(start + chunk, valid)]
+            hits = ids[self._predicate(ids, minimums, coded)][:remaining]
+            found.append(hits)
+            remaining -= len(hits)
+            start += chunk
+            chunk *= 2
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
@@ -0,0 +1,108 @@
+import numpy as np
+import pandas as pd
+
+# --- Per-HCP node table aggregated from the edge export (get_all_hcps_details semantics) ---
+
+NODE_COLUMNS = ['NPI', 'hcp_name', 'connections', 'influence', 'city', 'state', 'papers', 'panels', 'trials']
+HCP1_COLUMNS = ['NPI_1', 'HCP_1', 'No. of Connections HCP 1', 'Influence score_1', 'City1', 'State1', 'Papers', 'Panels', 'Trials']
+HCP2_COLUMNS = ['NPI_2', 'HCP_2', 'No. of Connections HCP 2', 'Influence score_2', 'City2', 'State2', 'Papers', 'Panels', 'Trials']
+FIRST_COLUMNS = ['hcp_name', 'influence', 'city', 'state']
+MAX_COLUMNS = ['connections', 'papers', 'panels', 'trials']
+SOURCE_COLUMNS = list(dict.fromkeys(HCP1_COLUMNS + HCP2_COLUMNS))
+
+
+def _side_aggregates(df, side_cols):
+    """
+    Aggregates one endpoint side of the edge table per NPI (first non-null / max).
+    """
+    side = df[side_cols].rename(columns=dict(zip(side_cols, NODE_COLUMNS)))
+    agg = side.groupby('NPI', sort=False, observed=True).agg(
+        {**{col: 'first' for col in FIRST_COLUMNS}, **{col: 'max' for col in MAX_COLUMNS}}
+    )
+    for col in ['hcp_name', 'city', 'state']:
+        agg[col] = agg[col].astype(object)
+    return agg
+
+
+def combine_node_aggregates(first, second):
+    """
+    Merges two partial aggregates; `first` wins for first-non-null columns, max is taken for counts.
+    """
+    index = first.index.union(second.index)
+    first = first.reindex(index)
+    second = second.reindex(index)
+    combined = pd.DataFrame(index=index)
+    for col in FIRST_COLUMNS:
+        combined[col] = first[col].where(first[col].notna(), second[col])
+    for col in MAX_COLUMNS:
+        combined[col] = np.fmax(first[col].to_numpy(), second[col].to_numpy())
+    return combined
+
+
+def finalize_node_aggregates(combined):
+    """
+    Turns a merged aggregate (indexed by NPI) into the node table layout used across the app.
+    """
+    nodes = combined.sort_index()
+    nodes.index.name = 'NPI'
+    nodes = nodes.reset_index()
+    nodes['hcp_name'] = nodes['hcp_name'].fillna('N/A')
+    for col in ['papers', 'panels', 'trials']:
+        nodes[col] = nodes[col].fillna(0)
+    # The edge cache stores counts as floats; show them as integers when they are whole numbers
+    for col in MAX_COLUMNS:
+        values = nodes[col]
+        if values.notna().all() and (values % 1 == 0).all():
+            nodes[col] = values.astype('int64')
+    nodes['influence'] = nodes['influence'].astype('float64')
+    nodes['city'] = nodes['city'].astype('category')
+    nodes['state'] = nodes['state'].astype('category')
+    return nodes[NODE_COLUMNS]
+
+
+def add_node_aggregates(partial, df):
+    """
+    Adds one edge chunk to a partial aggregate. A partial aggregate is a pair of per-NPI aggregates,
+    one per endpoint side, kept apart so that every HCP_1 occurrence still takes precedence over
+    HCP_2 occurrences, as in the original concat. None stands for no edges yet.
+    """
+    if df.empty:
+        return partial
+    return merge_node_aggregates(partial, (_side_aggregates(df, HCP1_COLUMNS), _side_aggregates(df, HCP2_COLUMNS)))
+
+
+def merge_node_aggregates(first, second):
+    """
+    Merges the partial aggregates of two consecutive runs of edges; `first` covers the earlier edges.
+    """
+    if first is None or second is None:
+        return second if first is None else first
+    return combine_node_aggregates(first[0], second[0]), combine_node_aggregates(first[1], second[1])
+
+
+def finish_node_aggregates(partial):
+    """
+    The node table for a partial aggregate that covers every edge.
+    """
+    if partial is None:
+        return pd.DataFrame(columns=NODE_COLUMNS)
+    return finalize_node_aggregates(combine_node_aggregates(*partial))
+
+
+def aggregate_node_details(df):
+    """
+    Computes the per-HCP node table with the same semantics as the original concat + groupby,
+    without materializing the doubled frame or running Python aggregators.
+    """
+    return aggregate_node_details_chunked([df])
+
+
+def aggregate_node_details_chunked(chunks):
+    """
+    Same result as aggregate_node_details over the concatenation of `chunks`, holding one chunk at a
+    time plus the running per-NPI aggregates.
+    """
+    partial = None
+    for df in chunks:
+        partial = add_node_aggregates(partial, df)
+    return finish_node_aggregates(partial)
@@ -0,0 +1,140 @@
+import heapq
+import time
+import numpy as np
+from graph_index import gather_slices
+
+# --- Collaboration paths between two HCPs: bidirectional search over the CSR adjacency ---
+
+
+def _deadline(time_budget):
+    return None if time_budget is None else time.perf_counter() + time_budget
+
+
+def _check_deadline(deadline, time_budget):
+    if deadline is not None and time.perf_counter() > deadline:
+        raise TimeoutError(f"Path search exceeded its {time_budget:g} s budget")
+
+
+def _trace(graph_index, parents, entries, meet, reverse):
+    """
+    Follows parent pointers from `meet` back to the search root. Returns the node ids from the
+    root to `meet` (or the reverse) and the edge rows along the way.
+    """
+    node_ids, edge_rows = [meet], []
+    while parents[node_ids[-1]] >= 0:
+        edge_rows.append(int(graph_index.edge_rows[entries[node_ids[-1]]]))
+        node_ids.append(int(parents[node_ids[-1]]))
+    if not reverse:
+        node_ids.reverse()
+        edge_rows.reverse()
+    return node_ids, edge_rows
+
+
+def _join(graph_index, parents, entries, meet):
+    head_nodes, head_rows = _trace(graph_index, parents[0], entries[0], meet, reverse=False)
+    tail_nodes, tail_rows = _trace(graph_index, parents[1], entries[1], meet, reverse=True)
+    return np.array(head_nodes + tail_nodes[1:], dtype=np.int64), np.array(head_rows + tail_rows, dtype=np.int64)
+
+
+def shortest_path(graph_index, source, target, time_budget=None):
+    """
+    Fewest-hop path between two node ids by bidirectional breadth-first search, always expanding
+    the side whose frontier has fewer incident edges. Returns (node ids from source to target,
+    edge rows along the path), or None if they are not connected. Where HCPs share several edges,
+    the strongest one is reported.
+    """
+    if source == target:
+        return np.array([source], dtype=np.int64), np.empty(0, dtype=np.int64)
+    deadline = _deadline(time_budget)
+    offsets, neighbors = graph_index.offsets, graph_index.neighbors
+    dist = [np.full(graph_index.num_nodes, -1, dtype=np.int64) for _ in range(2)]
+    parents = [np.full(graph_index.num_nodes, -1, dtype=np.int64) for _ in range(2)]
+    entries = [np.full(graph_index.num_nodes, -1, dtype=np.int64) for _ in range(2)]
+    frontiers = [np.array([source], dtype=np.int64), np.array([target], dtype=np.int64)]
+    dist[0][source], dist[1][target] = 0, 0
+
+    while len(frontiers[0]) and len(frontiers[1]):
+        _check_deadline(deadline, time_budget)
+        work = [int((offsets[f + 1] - offsets[f]).sum()) for f in frontiers]
+        side = 0 if work[0] <= work[1] else 1
+        frontier = frontiers[side]
+
+        # Reversed, so the strongest of parallel edges (last in a strength-sorted slice) comes first
+        reached = gather_slices(offsets, frontier)[::-1]
+        owners = np.repeat(frontier, offsets[frontier + 1] - offsets[frontier])[::-1]
+        nbrs = neighbors[reached]
+        fresh = dist[side][nbrs] < 0
+        reached, owners, nbrs = reached[fresh], owners[fresh], nbrs[fresh]
+        new_ids, first = np.unique(nbrs, return_index=True)
+        depth = dist[side][frontier[0]] + 1
+        dist[side][new_ids] = depth
+        parents[side][new_ids] = owners[first]
+        entries[side][new_ids] = reached[first]
+
+        met = new_ids[dist[1 - side][new_ids] >= 0]
+        if len(met):
+            meet = int(met[np.argmin(dist[1 - side][met])])
+            return _join(graph_index, parents, entries, meet)
+        frontiers[side] = new_ids
+    return None
+
+
+def strongest_path(graph_index, source, target, time_budget=None):
+    """
+    Path of strongest collaborations between two node ids: bidirectional Dijkstra where an edge
+    costs 1 / strength, so strong ties are short and weak ties are long. Edges without a positive
+    strength are not followed. Returns (node ids from source to target, edge rows along the path),
+    or None if they are not connected.
+    """
+    if source == target:
+        return np.array([source], dtype=np.int64), np.empty(0, dtype=np.int64)
+    deadline = _deadline(time_budget)
+    offsets, neighbors, strengths = graph_index.offsets, graph_index.neighbors, graph_index.entry_strengths
+    as_stored = strengths.dtype.type
+    dist = [np.full(graph_index.num_nodes, np.inf) for _ in range(2)]
+    parents = [np.full(graph_index.num_nodes, -1, dtype=np.int64) for _ in range(2)]
+    entries = [np.full(graph_index.num_nodes, -1, dtype=np.int64) for _ in range(2)]
+    settled = [np.zeros(graph_index.num_nodes, dtype=bool) for _ in range(2)]
+    heaps = [[(0.0, source)], [(0.0, target)]]
+    dist[0][source], dist[1][target] = 0.0, 0.0
+    best, meet = np.inf, -1
+
+    while heaps[0] and heaps[1]:
+        _check_deadline(deadline, time_budget)
+        if heaps[0][0][0] + heaps[1][0][0] >= best:
+            break
+        side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+        cost, node = heapq.heappop(heaps[side])
+        if settled[side][node] or cost > dist[side][node]:
+            continue
+        settled[side][node] = True
+
+        # Positive, finite strengths form a contiguous run of the strength-sorted slice
+        start, end = offsets[node], offsets[node + 1]
+        lo = start + np.searchsorted(strengths[start:end], as_stored(0), side='right')
+        hi = start + np.searchsorted(strengths[start:end], as_stored(np.inf), side='right')
+        reached = np.arange(lo, hi, dtype=np.int64)
+        nbrs = neighbors[reached]
+        costs = cost + 1.0 / strengths[reached].astype(float)
+        better = costs < dist[side][nbrs]
+        reached, nbrs, costs = reached[better], nbrs[better], costs[better]
+        if len(nbrs) == 0:
+            continue
+        # Cheapest of parallel edges per neighbor
+        order = np.lexsort((costs, nbrs))
+        new_ids, first = np.unique(nbrs[order], return_index=True)
+        picked = order[first]
+        dist[side][new_ids] = costs[picked]
+        parents[side][new_ids] = node
+        entries[side][new_ids] = reached[picked]
+        for new_cost, new_id in zip(costs[picked].tolist(), new_ids.tolist()):
+            heapq.heappush(heaps[side], (new_cost, new_id))
+
+        totals = costs[picked] + dist[1 - side][new_ids]
+        closest = int(np.argmin(totals))
+        if totals[closest] < best:
+            best, meet = totals[closest], int(new_ids[closest])
+
+    if meet < 0:
+        return None
+    return _join(graph_index, parents, entries, meet)
@@ -0,0 +1,292 @@
+import json
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+from node_query import RANGE_METRICS
+from analytics import ANALYTIC_METRICS
+
+# --- Headless queries over a Dataset: the dashboard's lookups for scripts, notebooks and the API server ---
+
+# Collaboration paths: search time limit (seconds) and strongest collaborators shown around each HCP on the path
+PATH_TIME_BUDGET = 5.0
+PATH_CONTEXT = 5
+# Neighborhood defaults, as in the Ego Network view
+NEIGHBORHOOD_MAX_FANOUT = 25
+NEIGHBORHOOD_MAX_NODES = 300
+# Similar HCPs listed with a summary
+SIMILAR_HCPS = 10
+ARROW_MEDIA_TYPE = 'application/vnd.apache.arrow.stream'
+
+
+def filtered_nodes(dataset, top_n=50, states=None, cities=None, min_connections=None, min_influence=None,
+                   min_papers=None, min_panels=None, min_trials=None, sort_by='connections'):
+    """
+    The top_n HCPs by `sort_by` among those meeting every minimum and state/city selection, as node
+    rows. Minimums left as None do not filter. Sorting by an analytics metric adds it as a column.
+    """
+    if sort_by not in RANGE_METRICS + ANALYTIC_METRICS:
+        raise ValueError(f"Unknown sort metric {sort_by!r}")
+    query_index = dataset.query_index_for(sort_by)
+    minimums = {'connections': min_connections, 'influence': min_influence, 'papers': min_papers,
+                'panels': min_panels, 'trials': min_trials}
+    node_ids = query_index.query(
+        top_n,
+        {metric: threshold for metric, threshold in minimums.items() if threshold is not None},
+        {'state': states, 'city': cities},
+        sort_by
+    )
+    filtered = query_index.nodes.iloc[node_ids]
+    if sort_by not in filtered.columns:
+        # Analytics metrics live in the query index, not the node table
+        filtered = filtered.assign(**{sort_by: query_index.values[sort_by][node_ids]})
+    return filtered
+
+
+def induced_edge_rows(dataset, npis, min_strength=None, max_strength=None):
+    """
+    Edge table rows within the strength range whose endpoints are both in `npis`.
+    """
+    if len(npis) == 0:
+        return np.empty(0, dtype=np.int64)
+    graph_index = dataset.graph_index
+    return graph_index.induced_edge_rows(graph_index.node_ids(npis), min_strength, max_strength)
+
+
+def induced_edges(dataset, npis, min_strength=None, max_strength=None):
+    """
+    The edges among a set of HCPs, e.g. the nodes returned by filtered_nodes.
+    """
+    return dataset.edges.iloc[induced_edge_rows(dataset, npis, min_strength, max_strength)]
+
+
+def neighborhood(dataset, npi, hops=1, min_strength=None, max_strength=None,
+                 max_fanout=NEIGHBORHOOD_MAX_FANOUT, max_nodes=NEIGHBORHOOD_MAX_NODES):
+    """
+    The k-hop neighborhood of an HCP: (node rows with their 'hop' distance, edges among them).
+    Raises KeyError for an unknown NPI.
+    """
+    return dataset.ego_network(npi, hops, min_strength, max_strength, max_fanout, max_nodes)
+
+
+def collaboration_path(dataset, source_npi, target_npi, strongest=False, min_strength=None, max_strength=None,
+                       time_budget=PATH_TIME_BUDGET):
+    """
+    How two HCPs are connected and the subgraph shown around the path: every HCP on it plus
+    their strongest collaborators. Returns (nodes, edges, path nodes, path edges), or None if the
+    HCPs are not connected. Raises KeyError for an unknown NPI and TimeoutError past time_budget.
+    """
+    path = dataset.collaboration_path(source_npi, target_npi, strongest, time_budget)
+    if path is None:
+        return None
+    path_nodes, path_edges = path
+    graph_index = dataset.graph_index
+    node_ids = np.unique(np.concatenate([
+        graph_index.ego_node_ids(node_id, 1, min_strength, max_strength, PATH_CONTEXT)[0]
+        for node_id in graph_index.node_ids(path_nodes['NPI'])
+    ]))
+    edge_rows = np.union1d(graph_index.induced_edge_rows(node_ids, min_strength, max_strength), path_edges.index)
+    return dataset.nodes.iloc[node_ids], dataset.edges.iloc[edge_rows], path_nodes, path_edges
+
+
+def hcp_summary(dataset, npi, similar=SIMILAR_HCPS):
+    """
+    The HCP Summary page data for one HCP, including its `similar` most similar HCPs
+    ('similar_hcps'). Raises KeyError for an unknown NPI.
+    """
+    summary = dataset.summary_store.summary(npi)
+    if summary is None:
+        raise KeyError(npi)
+    summary['similar_hcps'] = similar_hcps(dataset, npi, similar)
+    return summary
+
+
+def similar_hcps(dataset, npi, k=SIMILAR_HCPS):
+    """
+    The k HCPs whose collaboration networks overlap most with this HCP's, with the estimated
+    'similarity' and exact 'shared_collaborators' count. Raises KeyError for an unknown NPI.
+    """
+    return dataset.similar_hcps(npi, k)
+
+
+def search_hcps(dataset, text, limit=20):
+    """
+    Node rows of the best name/NPI matches for `text`, best first, with their display label.
+    """
+    search_index = dataset.search_index
+    node_ids = search_index.search(text, limit)
+    return dataset.nodes.iloc[node_ids].assign(label=search_index.labels(node_ids))
+
+
+# --- Request layer: named queries with loosely typed parameters, results as named tables ---
+
+def _text_list(value):
+    if isinstance(value, str):
+        return [item.strip() for item in value.split(',') if item.strip()]
+    return [str(item) for item in value]
+
+
+def _npi_list(value):
+    return [int(item) for item in _text_list(value)]
+
+
+def _flag(value):
+    if isinstance(value, str):
+        if value.lower() not in ('1', '0', 'true', 'false', 'yes', 'no'):
+            raise ValueError(f"Not a boolean: {value!r}")
+        return value.lower() in ('1', 'true', 'yes')
+    return bool(value)
+
+
+_MINIMUMS = {'min_connections': float, 'min_influence': float, 'min_papers': float, 'min_panels': float,
+             'min_trials': float}
+_STRENGTH = {'min_strength': float, 'max_strength': float}
+
+# Query name -> (function, {parameter: converter})
+QUERIES = {
+    'nodes': (filtered_nodes, {'top_n': int, 'states': _text_list, 'cities': _text_list, **_MINIMUMS, 'sort_by': str}),
+    'edges': (induced_edges, {'npis': _npi_list, **_STRENGTH}),
+    'neighborhood': (neighborhood, {'npi': int, 'hops': int, **_STRENGTH, 'max_fanout': int, 'max_nodes': int}),
+    'path': (collaboration_path, {'source_npi': int, 'target_npi': int, 'strongest': _flag, **_STRENGTH}),
+    'summary': (hcp_summary, {'npi': int, 'similar': int}),
+    'similar': (similar_hcps, {'npi': int, 'k': int}),
+    'search': (search_hcps, {'text': str, 'limit': int}),
+}
+
+
+def _named_tables(name, result):
+    """
+    Wire form of a query result: a dict of DataFrames (and, for summaries, one record).
+    """
+    if name in ('nodes', 'search', 'similar'):
+        return {'nodes': result}
+    if name == 'edges':
+        return {'edges': result}
+    if name == 'neighborhood':
+        return {'nodes': result[0], 'edges': result[1]}
+    if name == 'path':
+        if result is None:
+            return {'connected': False}
+        return {'connected': True, 'nodes': result[0], 'edges': result[1], 'path_nodes': result[2], 'path_edges': result[3]}
+    hcp_data = result['hcp_data']
+    record = {key: value for key, value in result.items() if key not in ('hcp_data', 'top_connections_list', 'similar_hcps')}
+    return {'summary': {**hcp_data.to_dict(), **record}, 'top_connections': pd.DataFrame(result['top_connections_list']),
+            'similar_hcps': result['similar_hcps']}
+
+
+def run_query(dataset, name, params=None):
+    """
+    Runs one named query with parameters given as strings (query strings) or JSON values, and
+    returns its named tables. Raises ValueError for unknown queries or parameters, and whatever
+    the query raises (KeyError for unknown NPIs, TimeoutError for slow path searches).
+    """
+    if name not in QUERIES:
+        raise ValueError(f"Unknown query {name!r}; expected one of {', '.join(QUERIES)}")
+    function, converters = QUERIES[name]
+    params = dict(params or {})
+    unknown = sorted(set(params) - set(converters))
+    if unknown:
+        raise ValueError(f"Unknown parameter(s) for {name!r}: {', '.join(unknown)}")
+    kwargs = {}
+    for key, value in params.items():
+        kwargs[key] = None if value is None else converters[key](value)
+    return _named_tables(name, function(dataset, **kwargs))
+
+
+def run_batch(dataset, requests):
+    """
+    Runs a list of {'query': name, 'params': {...}} requests against one dataset version. A failed
+    request does not fail the batch: its entry holds 'error' and 'status' instead of 'result'.
+    """
+    results = []
+    for request in requests:
+        try:
+            results.append({'result': run_query(dataset, request.get('query'), request.get('params'))})
+        except Exception as e:
+            results.append({'error': describe_error(e), 'status': error_status(e)})
+    return results
+
+
+def error_status(error):
+    """
+    HTTP status for an exception raised by a query.
+    """
+    if isinstance(error, KeyError):
+        return 404
+    if isinstance(error, (ValueError, TypeError)):
+        return 400
+    if isinstance(error, TimeoutError):
+        return 504
+    return 500
+
+
+def describe_error(error):
+    if isinstance(error, KeyError):
+        return f"Unknown HCP: {error.args[0]}"
+    return str(error)
+
+
+# --- Encoders ---
+
+def _jsonable(value):
+    if isinstance(value, pd.DataFrame):
+        return json.loads(value.to_json(orient='records', double_precision=15))
+    if isinstance(value, dict):
+        return {str(key): _jsonable(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_jsonable(item) for item in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and np.isnan(value):
+        return None
+    return value
+
+
+def to_json(value):
+    """
+    JSON text for query results; tables become lists of records and NaN becomes null.
+    """
+    return json.dumps(_jsonable(value))
+
+
+def _arrow_table(value):
+    frame = pd.DataFrame([value]) if isinstance(value, dict) else value.reset_index(drop=True)
+    # Plain values rather than per-frame dictionaries, so results from a batch concatenate
+    for col in frame.columns:
+        if isinstance(frame[col].dtype, pd.CategoricalDtype):
+            frame[col] = frame[col].astype(object)
+    return pa.Table.from_pandas(frame, preserve_index=False)
+
+
+def result_table(tables, table=None):
+    """
+    Picks one named table of a result (the first one by default) for Arrow responses.
+    """
+    names = [name for name, value in tables.items() if isinstance(value, (pd.DataFrame, dict))]
+    if table is None:
+        if not names:
+            raise ValueError("Result has no table")
+        table = names[0]
+    if table not in names:
+        raise ValueError(f"Unknown table {table!r}; expected one of {', '.join(names)}")
+    return tables[table]
+
+
+def to_arrow(tables, request_ids=None):
+    """
+    Arrow IPC stream of one or more tables. With request_ids, the tables of a batch are stacked
+    and tagged with the index of the request each row answers.
+    """
+    if request_ids is None:
+        combined = _arrow_table(tables)
+    elif tables:
+        parts = [_arrow_table(table) for table in tables]
+        parts = [part.append_column('request', pa.array(np.full(part.num_rows, request_id, dtype=np.int64)))
+                 for part, request_id in zip(parts, request_ids)]
+        combined = pa.concat_tables(parts, promote_options='permissive')
+    else:
+        combined = pa.table({'request': pa.array([], type=pa.int64())})
+    sink = pa.BufferOutputStream()
+    with ipc.new_stream(sink, combined.schema) as writer:
+        writer.write_table(combined)
+    return sink.getvalue().to_pybytes()
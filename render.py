@@ -0,0 +1,386 @@
+import json
+from functools import lru_cache
+import numpy as np
+import pandas as pd
+
+# --- Batch construction of vis.js node/edge records ---
+
+NODE_COLOR = {'background': 'hsl(120, 100%, 40%)', 'border': 'hsl(60, 100%, 30%)',
+              'highlight': {'background': '#FFD700', 'border': '#FFA500'}}
+NODE_FONT = {'size': 35, 'color': '#FFFFFF', 'bold': True}
+EDGE_ARROWS = {'to': {'enabled': True, 'scaleFactor': 0.8}}
+EDGE_SMOOTH = {'type': 'curvedCW', 'roundness': 0.15}
+EDGE_HIGHLIGHT = 'rgba(255, 255, 0, 0.9)'
+
+
+def _normalize(values, low, high):
+    """
+    Scales values into [0, 1] against a global range; a degenerate range maps to 0.5.
+    """
+    if high - low == 0:
+        return np.full(len(values), 0.5)
+    return np.clip((values - low) / (high - low), 0, 1)
+
+
+def _text(series, missing='N/A'):
+    return series.astype(object).where(series.notna(), missing).astype(str)
+
+
+def _float_values(series):
+    """
+    Column values as float64; float32 columns are rounded back to the decimals they were parsed from.
+    """
+    values = series.to_numpy()
+    if values.dtype == np.float32:
+        return np.round(values.astype(float), 6)
+    return values.astype(float)
+
+
+def _column(df, name, default):
+    return df[name] if name in df.columns else pd.Series(default, index=df.index)
+
+
+def build_node_records(nodes_df, enable_physics, global_min_connections, global_max_connections, positions=None):
+    """
+    Computes size, mass and tooltip for every node as whole columns and returns vis.js node dicts.
+    Nodes found in `positions` ({NPI: (x, y)}) get fixed coordinates.
+    """
+    if nodes_df.empty:
+        return []
+
+    npis = nodes_df['NPI'].to_numpy().tolist()
+    names = _column(nodes_df, 'hcp_name', None).where(lambda x: x.notna(), _text(nodes_df['NPI']))
+    connections = _column(nodes_df, 'connections', 0)
+
+    connection_values = connections.to_numpy(dtype=float)
+    sizes = 15 + _normalize(connection_values, global_min_connections, global_max_connections) * (70 - 15)
+    masses = np.maximum(1, connection_values / 50)
+
+    tooltips = (
+        'NPI ID: ' + _text(nodes_df['NPI']) +
+        '<br/>HCP Name: ' + _text(names) +
+        '<br/>Connections: ' + _text(connections) +
+        '<br/>Influence Score: ' + _column(nodes_df, 'influence', 0.0).map('{:.2f}'.format) +
+        '<br/>Location: ' + _text(_column(nodes_df, 'city', 'N/A')) + ', ' + _text(_column(nodes_df, 'state', 'N/A')) +
+        '<br/>Papers: ' + _text(_column(nodes_df, 'papers', 0)) +
+        '<br/>Panels: ' + _text(_column(nodes_df, 'panels', 0)) +
+        '<br/>Trials: ' + _text(_column(nodes_df, 'trials', 0))
+    )
+
+    labels = [name if name else npi for name, npi in zip(names.tolist(), npis)]
+    records = [
+        {
+            'id': npi, 'label': label, 'shape': 'dot', 'size': size, 'title': title,
+            'color': NODE_COLOR, 'borderWidth': 2, 'borderWidthSelected': 4,
+            'font': NODE_FONT, 'mass': mass, 'physics': enable_physics
+        }
+        for npi, label, size, title, mass in zip(npis, labels, sizes.tolist(), tooltips.tolist(), masses.tolist())
+    ]
+    if positions:
+        for record in records:
+            if record['id'] in positions:
+                record['x'], record['y'] = positions[record['id']]
+    return records
+
+
+def build_edge_records(edges_df, nodes_df, enable_physics, global_min_edge_strength, global_max_edge_strength):
+    """
+    Computes width, color and direction for every edge as whole columns and returns vis.js edge dicts.
+    Edges point from the more influential HCP to the less influential one; edges with an endpoint
+    outside nodes_df are dropped. Edge ids are the row labels of edges_df.
+    """
+    if edges_df.empty or nodes_df.empty:
+        return []
+
+    # One NPI -> influence lookup for all edges
+    node_npis = nodes_df['NPI'].to_numpy()
+    order = np.argsort(node_npis, kind='stable')
+    sorted_npis = node_npis[order]
+    influence = _column(nodes_df, 'influence', 0.0).to_numpy(dtype=float)[order]
+
+    u = edges_df['NPI_1'].to_numpy()
+    v = edges_df['NPI_2'].to_numpy()
+    pos_u = np.minimum(np.searchsorted(sorted_npis, u), len(sorted_npis) - 1)
+    pos_v = np.minimum(np.searchsorted(sorted_npis, v), len(sorted_npis) - 1)
+    present = (sorted_npis[pos_u] == u) & (sorted_npis[pos_v] == v)
+
+    ids = edges_df.index.to_numpy()[present].tolist()
+    u, v = u[present], v[present]
+    infl_u, infl_v = influence[pos_u[present]], influence[pos_v[present]]
+    forward = infl_u >= infl_v
+    sources = np.where(forward, u, v).tolist()
+    targets = np.where(forward, v, u).tolist()
+
+    weights = _float_values(_column(edges_df, 'Overall Connection Strength', 0.0))[present]
+    norm_weights = _normalize(weights, global_min_edge_strength, global_max_edge_strength)
+    widths = 1 + norm_weights * (10 - 1)
+    colors = ('rgba(135, 206, 235, ' + pd.Series(0.4 + norm_weights * 0.5).astype(str) + ')').tolist()
+
+    return [
+        {
+            'id': edge_id, 'from': source, 'to': target, 'width': width,
+            'color': {'color': color, 'highlight': EDGE_HIGHLIGHT},
+            'arrows': EDGE_ARROWS, 'arrowStrikethrough': False,
+            'smooth': EDGE_SMOOTH, 'physics': enable_physics
+        }
+        for edge_id, source, target, width, color in zip(ids, sources, targets, widths.tolist(), colors)
+    ]
+
+
+PATH_NODE_COLOR = {'background': '#FF8C00', 'border': '#FFD700',
+                   'highlight': {'background': '#FFD700', 'border': '#FFFFFF'}}
+PATH_EDGE_COLOR = {'color': 'rgba(255, 165, 0, 0.95)', 'highlight': EDGE_HIGHLIGHT}
+
+
+def highlight_path(node_records, edge_records, path_npis, path_edge_ids):
+    """
+    Marks the nodes and edges of a collaboration path in already built vis.js records (in place).
+    """
+    path_npis, path_edge_ids = set(path_npis), set(path_edge_ids)
+    for record in node_records:
+        if record['id'] in path_npis:
+            record.update(color=PATH_NODE_COLOR, borderWidth=6)
+    for record in edge_records:
+        if record['id'] in path_edge_ids:
+            record.update(color=PATH_EDGE_COLOR, width=max(record['width'], 8))
+
+
+# --- Community super-nodes with drill-down members ---
+
+def community_node_id(community):
+    return f"community-{int(community)}"
+
+
+def community_color(community):
+    """
+    Distinct, stable color per community (golden-angle hue steps).
+    """
+    hue = (int(community) * 137.508) % 360
+    return {'background': f'hsl({hue:.0f}, 70%, 45%)', 'border': f'hsl({hue:.0f}, 70%, 30%)',
+            'highlight': NODE_COLOR['highlight']}
+
+
+def build_community_records(overview, enable_physics, global_min_connections, global_max_connections,
+                            global_min_edge_strength, global_max_edge_strength, positions=None):
+    """
+    Returns (nodes, edges, clusters) for the level-of-detail view: one node per community,
+    summed-weight edges between communities and, per community, the member nodes and edges
+    the browser swaps in when that community is expanded.
+    """
+    super_nodes = overview['super_nodes']
+    super_edges = overview['super_edges']
+    if super_nodes.empty:
+        return [], [], {}
+
+    max_size = super_nodes['size'].max()
+    sizes = 20 + 60 * np.sqrt(super_nodes['size'].to_numpy() / max_size)
+    tooltips = (
+        'Community ' + (super_nodes['community'] + 1).astype(str) +
+        '<br/>HCPs: ' + super_nodes['size'].astype(str) +
+        '<br/>Most connected HCP: ' + _text(super_nodes['top_name']) + ' (NPI: ' + super_nodes['top_npi'].astype(str) + ')' +
+        '<br/>Average Influence Score: ' + super_nodes['avg_influence'].map('{:.2f}'.format) +
+        '<br/>Main States: ' + super_nodes['top_states'].astype(str) +
+        '<br/>Click to expand (shows the ' + super_nodes['members_shown'].astype(str) + ' most connected of ' +
+        super_nodes['size'].astype(str) + ' members)'
+    )
+    nodes = [
+        {
+            'id': community_node_id(community), 'label': f"Community {community + 1} ({size} HCPs)",
+            'shape': 'dot', 'size': node_size, 'title': title, 'color': community_color(community),
+            'borderWidth': 2, 'borderWidthSelected': 4, 'font': NODE_FONT,
+            'mass': max(1, size / 50), 'physics': enable_physics
+        }
+        for community, size, node_size, title in zip(
+            super_nodes['community'].tolist(), super_nodes['size'].tolist(), sizes.tolist(), tooltips.tolist())
+    ]
+    if positions:
+        for community, node in zip(super_nodes['community'].tolist(), nodes):
+            if community in positions:
+                node['x'], node['y'] = positions[community]
+
+    log_weights = np.log1p(super_edges['weight'].to_numpy())
+    norm_weights = _normalize(log_weights, 0, log_weights.max() if len(log_weights) else 0)
+    edges = [
+        {
+            'from': community_node_id(source), 'to': community_node_id(target), 'width': 1 + norm * 9,
+            'color': {'color': f'rgba(135, 206, 235, {0.3 + norm * 0.5})', 'highlight': EDGE_HIGHLIGHT},
+            'title': f"{count} connections, total strength {weight:.2f}",
+            'smooth': EDGE_SMOOTH, 'physics': enable_physics
+        }
+        for source, target, weight, count, norm in zip(
+            super_edges['source'].tolist(), super_edges['target'].tolist(),
+            super_edges['weight'].tolist(), super_edges['count'].tolist(), norm_weights.tolist())
+    ]
+
+    # Members, their internal edges and their summed links to the other communities
+    members = overview['members']
+    member_edges = overview['member_edges']
+    member_links = overview['member_links']
+    clusters = {community_node_id(community): {'nodes': [], 'edges': []} for community in super_nodes['community']}
+    for community, group in members.groupby('community'):
+        records = build_node_records(group, enable_physics, global_min_connections, global_max_connections)
+        for record in records:
+            record['color'] = community_color(community)
+        clusters[community_node_id(community)]['nodes'] = records
+    for community, group in member_edges.groupby('community'):
+        clusters[community_node_id(community)]['edges'] = build_edge_records(
+            group, members, enable_physics, global_min_edge_strength, global_max_edge_strength)
+    if not member_links.empty:
+        log_links = np.log1p(member_links['weight'].to_numpy())
+        norm_links = _normalize(log_links, 0, log_links.max())
+        for npi, community, target, norm in zip(
+                member_links['NPI'].tolist(), member_links['community'].tolist(),
+                member_links['target_community'].tolist(), norm_links.tolist()):
+            clusters[community_node_id(community)]['edges'].append({
+                'from': npi, 'to': community_node_id(target), 'width': 1 + norm * 4,
+                'color': {'color': 'rgba(135, 206, 235, 0.3)', 'highlight': EDGE_HIGHLIGHT},
+                'dashes': True, 'smooth': EDGE_SMOOTH, 'physics': enable_physics
+            })
+    return nodes, edges, clusters
+
+
+# --- In-memory HTML emission: a cached page template plus a JSON data blob ---
+
+GRAPH_DATA_TOKEN = "__GRAPH_DATA__"
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<link rel="stylesheet" href="https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/dist/vis-network.min.css" integrity="sha512-WgxfT5LWjfszlPHXRmBWHkV2eceiWTOBvrKCNbdgDYTHrT2AeLCGbF4sZlZw3UMN3WtL0tGUoIAKsu8mllg/XA==" crossorigin="anonymous" referrerpolicy="no-referrer" />
+<script src="https://cdnjs.cloudflare.com/ajax/libs/vis-network/9.1.2/dist/vis-network.min.js" integrity="sha512-LnvoEWDFrqGHlHmDD2101OrLcbsfkrzoSpvtSQtxK3RMnRV0eOkhhBN2dXHKRrUU8p2DGRTk35n4O8nWSVe1mQ==" crossorigin="anonymous" referrerpolicy="no-referrer"></script>
+<style type="text/css">
+    html, body { margin: 0; padding: 0; background-color: %(bgcolor)s; }
+    #mynetwork { width: %(width)s; height: %(height)s; background-color: %(bgcolor)s; position: relative; }
+</style>
+</head>
+<body>
+<div id="mynetwork"></div>
+<script type="text/javascript">
+    var originalColors = {};
+    var expandableClusters = {};
+
+    function setupNetworkInteractivity(network, nodes) {
+        nodes.forEach(function (node) { originalColors[node.id] = node.color; });
+
+        network.on("click", function (properties) {
+            if (properties.nodes.length === 0) {
+                nodes.update(nodes.getIds().map(function (id) {
+                    return { id: id, color: originalColors[id], borderWidth: 2 };
+                }));
+                return;
+            }
+
+            var nodeId = properties.nodes[0];
+            if (expandableClusters[nodeId]) {
+                // Expanded by setupClusterExpansion instead
+                return;
+            }
+            var highlighted = new Set([nodeId].concat(network.getConnectedNodes(nodeId)));
+            nodes.update(nodes.getIds().map(function (id) {
+                if (highlighted.has(id)) {
+                    return { id: id, color: originalColors[id].highlight || originalColors[id], borderWidth: 4 };
+                }
+                return { id: id, color: { background: 'rgba(50,50,50,0.2)', border: 'rgba(30,30,30,0.2)' }, borderWidth: 1 };
+            }));
+            network.focus(nodeId, { scale: 1.5, animation: { duration: 500 } });
+        });
+    }
+
+    // Community super-nodes expand into their members on click
+    function setupClusterExpansion(network, nodes, edges, clusters) {
+        expandableClusters = clusters;
+        network.on("click", function (properties) {
+            var clusterId = properties.nodes[0];
+            var cluster = clusterId !== undefined ? clusters[clusterId] : undefined;
+            if (!cluster) {
+                return;
+            }
+            var position = network.getPositions([clusterId])[clusterId] || { x: 0, y: 0 };
+            edges.remove(edges.getIds({ filter: function (edge) { return edge.from === clusterId || edge.to === clusterId; } }));
+            nodes.remove(clusterId);
+            cluster.nodes.forEach(function (node, i) {
+                originalColors[node.id] = node.color;
+                var angle = 2 * Math.PI * i / cluster.nodes.length;
+                node.x = position.x + 300 * Math.cos(angle);
+                node.y = position.y + 300 * Math.sin(angle);
+            });
+            nodes.add(cluster.nodes);
+            edges.add(cluster.edges);
+            delete clusters[clusterId];
+        });
+    }
+
+    var graph = __GRAPH_DATA__;
+    var nodes = new vis.DataSet(graph.nodes);
+    var edges = new vis.DataSet(graph.edges);
+    var network = new vis.Network(document.getElementById('mynetwork'), { nodes: nodes, edges: edges }, graph.options);
+    setupNetworkInteractivity(network, nodes);
+    if (graph.clusters) {
+        setupClusterExpansion(network, nodes, edges, graph.clusters);
+    }
+    if (graph.fit) {
+        network.fit();
+    }
+</script>
+</body>
+</html>
+"""
+
+
+@lru_cache(maxsize=8)
+def page_template(height="900px", width="100%", bgcolor="#0a0a0a"):
+    """
+    Returns the page split around the data blob; built once per size/background combination.
+    """
+    page = PAGE_TEMPLATE % {'height': height, 'width': width, 'bgcolor': bgcolor}
+    head, tail = page.split(GRAPH_DATA_TOKEN)
+    return head, tail
+
+
+def graph_payload(nodes, edges, options_json, fit=False, clusters=None):
+    """
+    Serializes nodes, edges and vis.js options into the compact JSON blob embedded in the page.
+    """
+    dumps = lambda value: json.dumps(value, separators=(',', ':'))
+    payload = (
+        '{"nodes":' + dumps(nodes) + ',"edges":' + dumps(edges) +
+        ',"options":' + options_json + ',"fit":' + dumps(bool(fit)) +
+        (',"clusters":' + dumps(clusters) if clusters else '') + '}'
+    )
+    # Keep tooltips containing "</" from closing the surrounding script tag
+    return payload.replace('</', '<\\/')
+
+
+# vis.js options of every network view: a force_atlas_2based layout (only run when physics is enabled)
+NETWORK_OPTIONS = {
+    'configure': {'enabled': False},
+    'edges': {'color': {'inherit': True}, 'smooth': {'enabled': True, 'type': 'dynamic'}},
+    'interaction': {'dragNodes': True, 'hideEdgesOnDrag': False, 'hideNodesOnDrag': False},
+    'physics': {
+        'enabled': True,
+        'forceAtlas2Based': {'avoidOverlap': 1, 'centralGravity': 0.03, 'damping': 1.5,
+                             'gravitationalConstant': -500, 'springConstant': 0.002, 'springLength': 400},
+        'solver': 'forceAtlas2Based',
+        'stabilization': {'enabled': True, 'fit': True, 'iterations': 1000, 'onlyDynamicEdges': False,
+                          'updateInterval': 50}
+    }
+}
+
+
+@lru_cache(maxsize=2)
+def network_options_json(enable_physics):
+    """
+    Returns NETWORK_OPTIONS as JSON, with the physics simulation switched on or off.
+    """
+    options = dict(NETWORK_OPTIONS, physics=dict(NETWORK_OPTIONS['physics'], enabled=bool(enable_physics)))
+    return json.dumps(options, separators=(',', ':'))
+
+
+def community_network_html(nodes, edges, clusters, enable_physics, fit=False):
+    """
+    Renders the community view as a self-contained page with the shared network options.
+    """
+    head, tail = page_template()
+    return head + graph_payload(nodes, edges, network_options_json(enable_physics), fit, clusters) + tail
+
@@ -0,0 +1,369 @@
+import argparse
+import csv
+import functools
+import html
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from dataset import load_dataset
+from query_api import filtered_nodes, hcp_summary
+
+# --- Bulk export of the HCP Summary page as static reports (Markdown, HTML, CSV) ---
+
+FORMATS = ['md', 'html', 'csv']
+# HCPs per worker task: large enough to amortize the round trip, small enough for steady progress
+REPORT_BATCH = 200
+# Top connections listed per report, as on the summary page
+REPORT_TOP_CONNECTIONS = 5
+CSV_COLUMNS = [
+    'NPI', 'hcp_name', 'city', 'state', 'kol_status', 'total_connections', 'influence_score',
+    'influence_percentile', 'avg_connection_strength', 'unique_states_connected', 'unique_cities_connected',
+    'collaboration_diversity_score', 'papers', 'panels', 'trials', 'dominant_metrics', 'top_connections',
+    'similar_hcps'
+]
+
+HTML_STYLE = """
+body { font-family: 'Inter', sans-serif; background: #0a0a0a; color: #E0E0E0; max-width: 960px; margin: 24px auto; }
+h2 { border-bottom: 1px solid #4a4a6a; padding-bottom: 8px; }
+h3 { color: #00BFFF; }
+table { width: 100%; border-collapse: collapse; background: #1a1a2e; }
+th, td { padding: 8px; text-align: left; border-bottom: 1px solid #4a4a6a; }
+th { background: #2a2a4a; color: #00BFFF; }
+.badge { color: white; padding: 5px; border-radius: 5px; }
+.good { color: #00FF00; } .low { color: #FFA500; }
+"""
+
+
+def report_context(nodes):
+    """
+    Network-wide reference values the summary page compares each HCP against.
+    """
+    return {
+        'connections_q75': nodes['connections'].quantile(0.75),
+        'connections_mean': nodes['connections'].mean(),
+        'influence_q75': nodes['influence'].quantile(0.75),
+        'influence_mean': nodes['influence'].mean(),
+    }
+
+
+def _report_fields(summary, context, top_connections):
+    """
+    The values shown on the summary page, with the same highlighting decisions.
+    """
+    return {
+        'connections_good': summary['total_connections'] > context['connections_q75'],
+        'connections_arrow': "🟢↑" if summary['total_connections'] > context['connections_mean'] else "🔴↓",
+        'influence_good': summary['influence_percentile'] > 75,
+        'influence_arrow': "🟢↑" if summary['influence_score'] > context['influence_mean'] else "🔴↓",
+        'connections': [
+            dict(conn, influence_good=conn['influence'] > context['influence_q75'])
+            for conn in summary['top_connections_list'][:top_connections]
+        ],
+    }
+
+
+def markdown_report(npi, summary, context, top_connections=REPORT_TOP_CONNECTIONS):
+    hcp_data = summary['hcp_data']
+    fields = _report_fields(summary, context, top_connections)
+    lines = [
+        f"# {hcp_data['hcp_name']} (NPI: {npi}) Summary",
+        "",
+        "## I. Overview & KOL Status",
+        "",
+        f"- Total Connections: **{summary['total_connections']}** {fields['connections_arrow']}",
+        f"- {summary['influence_rank_text']}",
+        f"- Influence Score: **{summary['influence_score']:.2f}** {fields['influence_arrow']}",
+        f"- Status: **{summary['kol_status']}**",
+        f"- Network Diversity: **{summary['unique_states_connected']} States**, **{summary['unique_cities_connected']} Cities**",
+        f"- Collaboration Diversity Score: **{summary['collaboration_diversity_score']:.2f}** (Higher = More Diverse)",
+        "",
+        "## II. Top Connections",
+        "",
+    ]
+    if fields['connections']:
+        lines += ["| HCP Name | NPI | Influence Score | Connection Type | Impact |", "|---|---|---|---|---|"]
+        for conn in fields['connections']:
+            cells = [conn['name'], conn['npi'], f"{conn['influence']:.2f}", conn['metric_type'], conn['impact_statement']]
+            lines.append("| " + " | ".join(str(cell).replace('|', '\\|') for cell in cells) + " |")
+    else:
+        lines.append("No direct connections found for this HCP.")
+    lines += ["", "## III. Connection Metrics", "", "**How You Connect**:", ""]
+    lines += summary['metrics_breakdown']
+    lines += [
+        "",
+        f"**Metrics Interpretation**: {summary['metrics_interpretation']}",
+        "",
+        f"**Dominant Connection Drivers**: {summary['dominant_metrics_text']}",
+        "",
+        "## IV. Similar HCPs",
+        "",
+    ]
+    similar = summary['similar_hcps']
+    if not similar.empty:
+        lines += ["| HCP Name | NPI | Location | Similarity | Shared Collaborators |", "|---|---|---|---|---|"]
+        for row in similar.itertuples(index=False):
+            cells = [row.hcp_name, row.NPI, f"{row.city}, {row.state}", f"{row.similarity:.0%}", row.shared_collaborators]
+            lines.append("| " + " | ".join(str(cell).replace('|', '\\|') for cell in cells) + " |")
+    else:
+        lines.append("No HCPs with a similar collaboration network found.")
+    lines.append("")
+    return "\n".join(lines)
+
+
+def _html_text(text):
+    # The summary texts use Markdown bold
+    return re.sub(r'\*\*(.+?)\*\*', r'<strong>\1</strong>', html.escape(str(text)))
+
+
+def html_report(npi, summary, context, top_connections=REPORT_TOP_CONNECTIONS):
+    hcp_data = summary['hcp_data']
+    fields = _report_fields(summary, context, top_connections)
+    title = html.escape(f"{hcp_data['hcp_name']} (NPI: {npi}) Summary")
+    kol_color = "#00BFFF" if summary['kol_status'] == "Key Opinion Leader" else "#808080"
+    parts = [
+        f"<!DOCTYPE html><html><head><meta charset='utf-8'><title>{title}</title><style>{HTML_STYLE}</style></head><body>",
+        f"<h2>{title}</h2>",
+        "<h3>I. Overview &amp; KOL Status</h3>",
+        f"<p class='{'good' if fields['connections_good'] else 'low'}'>Total Connections: "
+        f"<strong>{summary['total_connections']}</strong> {fields['connections_arrow']}</p>",
+        f"<p>{_html_text(summary['influence_rank_text'])}</p>",
+        f"<p class='{'good' if fields['influence_good'] else 'low'}'>Influence Score: "
+        f"<strong>{summary['influence_score']:.2f}</strong> {fields['influence_arrow']}</p>",
+        f"<p><span class='badge' style='background-color:{kol_color}'>{html.escape(summary['kol_status'])}</span></p>",
+        f"<p>Network Diversity: <strong>{summary['unique_states_connected']} States</strong>, "
+        f"<strong>{summary['unique_cities_connected']} Cities</strong></p>",
+        f"<p><progress value='{summary['collaboration_diversity_score']:.4f}' max='1'></progress> "
+        f"Collaboration Diversity Score: <strong>{summary['collaboration_diversity_score']:.2f}</strong> (Higher = More Diverse)</p>",
+        "<h3>II. Top Connections</h3>",
+    ]
+    if fields['connections']:
+        parts.append("<table><tr><th>HCP Name</th><th>NPI</th><th>Influence Score</th><th>Connection Type</th><th>Impact</th></tr>")
+        for conn in fields['connections']:
+            parts.append(
+                f"<tr><td>{html.escape(str(conn['name']))}</td><td>{conn['npi']}</td>"
+                f"<td class='{'good' if conn['influence_good'] else 'low'}'>{conn['influence']:.2f}</td>"
+                f"<td>{html.escape(str(conn['metric_type']))}</td><td>{html.escape(conn['impact_statement'])}</td></tr>"
+            )
+        parts.append("</table>")
+    else:
+        parts.append("<p>No direct connections found for this HCP.</p>")
+    parts.append("<h3>III. Connection Metrics</h3><p><strong>How You Connect</strong>:</p><ul>")
+    parts += [f"<li>{_html_text(metric.removeprefix('- '))}</li>" for metric in summary['metrics_breakdown']]
+    parts += [
+        "</ul>",
+        f"<p><strong>Metrics Interpretation</strong>: {_html_text(summary['metrics_interpretation'])}</p>",
+        f"<p><strong>Dominant Connection Drivers</strong>: {_html_text(summary['dominant_metrics_text'])}</p>",
+        "<h3>IV. Similar HCPs</h3>",
+    ]
+    similar = summary['similar_hcps']
+    if not similar.empty:
+        parts.append("<table><tr><th>HCP Name</th><th>NPI</th><th>Location</th><th>Similarity</th><th>Shared Collaborators</th></tr>")
+        for row in similar.itertuples(index=False):
+            parts.append(
+                f"<tr><td>{html.escape(str(row.hcp_name))}</td><td>{row.NPI}</td>"
+                f"<td>{html.escape(f'{row.city}, {row.state}')}</td><td>{row.similarity:.0%}</td>"
+                f"<td>{row.shared_collaborators}</td></tr>"
+            )
+        parts.append("</table>")
+    else:
+        parts.append("<p>No HCPs with a similar collaboration network found.</p>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+
+def csv_row(npi, summary, top_connections=REPORT_TOP_CONNECTIONS):
+    hcp_data = summary['hcp_data']
+    return [
+        npi, hcp_data['hcp_name'], hcp_data['city'], hcp_data['state'], summary['kol_status'],
+        summary['total_connections'], summary['influence_score'], round(float(summary['influence_percentile']), 2),
+        summary['avg_connection_strength'], summary['unique_states_connected'], summary['unique_cities_connected'],
+        summary['collaboration_diversity_score'], summary['papers'], summary['panels'], summary['trials'],
+        summary['dominant_metrics_text'],
+        "; ".join(str(conn['name']) for conn in summary['top_connections_list'][:top_connections]),
+        "; ".join(summary['similar_hcps']['hcp_name'].astype(str)),
+    ]
+
+
+# --- Workers: each process attaches to the persisted (memory-mapped) dataset once ---
+
+_worker = {}
+
+
+def _init_worker(csv_path, cache_dir, version):
+    dataset = load_dataset(csv_path, cache_dir, version)
+    _worker['dataset'] = dataset
+    _worker['context'] = report_context(dataset.nodes)
+
+
+def _write_reports(npis, out_dir, formats, top_connections):
+    """
+    Writes the Markdown/HTML reports of a batch of HCPs and returns their CSV rows (None for
+    unknown NPIs), in batch order.
+    """
+    dataset, context = _worker['dataset'], _worker['context']
+    rows = []
+    for npi in npis:
+        try:
+            summary = hcp_summary(dataset, npi)
+        except KeyError:
+            rows.append(None)
+            continue
+        if 'md' in formats:
+            with open(os.path.join(out_dir, f"{npi}.md"), 'w', encoding='utf-8') as f:
+                f.write(markdown_report(npi, summary, context, top_connections))
+        if 'html' in formats:
+            with open(os.path.join(out_dir, f"{npi}.html"), 'w', encoding='utf-8') as f:
+                f.write(html_report(npi, summary, context, top_connections))
+        rows.append(csv_row(npi, summary, top_connections) if 'csv' in formats else [])
+    return rows
+
+
+def export_reports(csv_path, npis, out_dir, formats=('md',), workers=None, cache_dir=None,
+                   top_connections=REPORT_TOP_CONNECTIONS, progress=None):
+    """
+    Writes one summary report per HCP in `npis` (Markdown and/or HTML files named <NPI>.<format>)
+    and, for 'csv', one summaries.csv row per HCP in input order. Batches are spread over a
+    process pool; the parent loads (or builds) the dataset first, so workers only memory-map the
+    persisted artifacts and never re-read the CSV. progress(done, total) is called as batches
+    finish. Returns (reports written, NPIs not found).
+    """
+    unknown_formats = sorted(set(formats) - set(FORMATS))
+    if unknown_formats:
+        raise ValueError(f"Unknown report format(s): {', '.join(unknown_formats)}")
+    dataset = load_dataset(csv_path, cache_dir)
+    # Built (and persisted) here once, so workers only map it
+    dataset.similarity_index
+    npis = [int(npi) for npi in npis]
+    batches = [npis[start:start + REPORT_BATCH] for start in range(0, len(npis), REPORT_BATCH)]
+    workers = workers or min(len(batches), os.cpu_count() or 1)
+    os.makedirs(out_dir, exist_ok=True)
+
+    written, missing, done = 0, [], 0
+    csv_file = open(os.path.join(out_dir, 'summaries.csv'), 'w', newline='', encoding='utf-8') if 'csv' in formats else None
+    try:
+        writer = csv.writer(csv_file) if csv_file else None
+        if writer:
+            writer.writerow(CSV_COLUMNS)
+        write = functools.partial(_write_reports, out_dir=out_dir, formats=formats, top_connections=top_connections)
+        if workers > 1:
+            pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn'),
+                                       initializer=_init_worker, initargs=(csv_path, cache_dir, dataset.version))
+            results = pool.map(write, batches)
+        else:
+            # A single worker would only add process start-up; render in this process instead
+            pool = None
+            _worker.update(dataset=dataset, context=report_context(dataset.nodes))
+            results = map(write, batches)
+        try:
+            # Results arrive in batch order, so the CSV is streamed in input order
+            for batch, rows in zip(batches, results):
+                for npi, row in zip(batch, rows):
+                    if row is None:
+                        missing.append(npi)
+                        continue
+                    written += 1
+                    if writer:
+                        writer.writerow(row)
+                done += len(batch)
+                if progress:
+                    progress(done, len(npis))
+        finally:
+            if pool is not None:
+                pool.shutdown(cancel_futures=True)
+    finally:
+        if csv_file:
+            csv_file.close()
+    return written, missing
+
+
+def export_npis(dataset, top_n=None, states=None, cities=None, min_connections=None, min_influence=None,
+                sort_by='connections'):
+    """
+    NPIs of the HCPs a filtered export covers, best first by sort_by. HCPs without a sort_by value
+    are never in its sorted order, so those matching the filter are added at the end. Without any
+    filter, every HCP is exported in NPI order.
+    """
+    graph_index = dataset.graph_index
+    if top_n is None and not states and not cities and min_connections is None and min_influence is None:
+        return graph_index.npis.tolist()
+    limit = top_n or graph_index.num_nodes
+    npis = filtered_nodes(dataset, limit, states, cities, min_connections, min_influence, sort_by=sort_by)['NPI'].tolist()
+    if len(npis) < limit:
+        query_index = dataset.query_index_for(sort_by)
+        node_ids = np.flatnonzero(np.isnan(query_index.values[sort_by]))
+        keep = np.ones(len(node_ids), dtype=bool)
+        for column, selected in [('state', states), ('city', cities)]:
+            if selected:
+                keep &= query_index.nodes[column].take(node_ids).isin(selected).to_numpy()
+        for metric, threshold in [('connections', min_connections), ('influence', min_influence)]:
+            if threshold is not None:
+                keep &= query_index.values[metric][node_ids] >= threshold
+        npis += graph_index.npis[node_ids[keep]][:limit - len(npis)].tolist()
+    return npis
+
+
+def _read_npi_file(path):
+    """
+    NPIs from a text file (one per line) or a CSV with an NPI column.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        first = f.readline()
+        f.seek(0)
+        if 'NPI' in first.upper() and not first.strip().isdigit():
+            reader = csv.DictReader(f)
+            column = next(name for name in reader.fieldnames if name.strip().upper() == 'NPI')
+            return [row[column] for row in reader if row[column].strip()]
+        return [line.strip() for line in f if line.strip()]
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Export HCP Summary reports for a list of NPIs or every HCP matching a filter."
+    )
+    parser.add_argument('--data', default=os.environ.get('HCP_DATA_SOURCE', "Main DB_1.csv"),
+                        help="edge export: a CSV, a directory of CSVs or a glob pattern")
+    parser.add_argument('--out', required=True, help="output directory")
+    parser.add_argument('--format', nargs='+', default=['md'], choices=FORMATS, dest='formats')
+    parser.add_argument('--npis', nargs='+', default=None, help="NPIs to export")
+    parser.add_argument('--npi-file', default=None, help="file with one NPI per line, or a CSV with an NPI column")
+    parser.add_argument('--states', nargs='+', default=None, help="filter: HCPs in these states")
+    parser.add_argument('--cities', nargs='+', default=None, help="filter: HCPs in these cities")
+    parser.add_argument('--min-connections', type=float, default=None)
+    parser.add_argument('--min-influence', type=float, default=None)
+    parser.add_argument('--top-n', type=int, default=None, help="filter: only the top N HCPs (default: all matches)")
+    parser.add_argument('--sort-by', default='connections')
+    parser.add_argument('--top-connections', type=int, default=REPORT_TOP_CONNECTIONS)
+    parser.add_argument('--workers', type=int, default=None)
+    parser.add_argument('--cache-dir', default=None)
+    args = parser.parse_args()
+
+    if args.npis or args.npi_file:
+        npis = (args.npis or []) + (_read_npi_file(args.npi_file) if args.npi_file else [])
+    else:
+        dataset = load_dataset(args.data, args.cache_dir)
+        npis = export_npis(dataset, args.top_n, args.states, args.cities, args.min_connections, args.min_influence,
+                           args.sort_by)
+        print(f"Exporting {len(npis):,} of {dataset.graph_index.num_nodes:,} HCPs "
+              f"({dataset.graph_index.num_nodes - len(npis):,} excluded by the filter)")
+
+    start = time.perf_counter()
+
+    def progress(done, total):
+        elapsed = time.perf_counter() - start
+        sys.stderr.write(f"\r{done:,}/{total:,} HCPs ({done / max(elapsed, 1e-9):,.0f}/s)")
+        sys.stderr.flush()
+
+    written, missing = export_reports(args.data, npis, args.out, args.formats, args.workers, args.cache_dir,
+                                      args.top_connections, progress)
+    sys.stderr.write("\n")
+    print(f"{written:,} report(s) written to {args.out} in {time.perf_counter() - start:.1f} s")
+    if missing:
+        print(f"{len(missing):,} NPI(s) not found: {', '.join(map(str, missing[:10]))}{' ...' if len(missing) > 10 else ''}")
+
+
+if __name__ == "__main__":
+    main()
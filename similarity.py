@@ -0,0 +1,229 @@
+import json
+import os
+import shutil
+import numpy as np
+from ingest import STRENGTH_COLUMN, cache_path_for, is_current_version, remove_stale_caches
+
+# --- "Similar HCPs": MinHash signatures of neighbor sets, bucketed by LSH bands ---
+
+# Signature length and banding: 32 bands of 2 rows make HCPs with a Jaccard similarity of 0.2 a
+# candidate pair about 3 times in 4, and pairs above 0.35 almost always. Collaboration networks
+# are sparse, so similar HCPs rarely share more than a fraction of their collaborators.
+NUM_PERM = 64
+BANDS = 32
+# Strength-weighted signatures count an edge 1-4 times, by strength quartile (weighted Jaccard)
+STRENGTH_LEVELS = 4
+# Candidates taken from one bucket; huge buckets (e.g. HCPs whose only collaborator is the same
+# hub) would otherwise make a lookup linear in the number of HCPs
+MAX_BUCKET = 500
+# Layout of the persisted band tables; saved with the build parameters so older indexes are rebuilt
+SIMILARITY_FORMAT = 2
+SIMILARITY_WEIGHTED = False
+SIMILARITY_BY_METRIC = False
+SIMILARITY_ARRAYS = ['signatures', 'node_keys', 'band_keys', 'band_nodes']
+EMPTY_SLOT = np.uint32(0xFFFFFFFF)
+
+
+def _mix64(values):
+    """
+    splitmix64 finalizer over a uint64 array (wrapping arithmetic).
+    """
+    values = values.astype(np.uint64, copy=True)
+    with np.errstate(over='ignore'):
+        values ^= values >> np.uint64(30)
+        values *= np.uint64(0xBF58476D1CE4E5B9)
+        values ^= values >> np.uint64(27)
+        values *= np.uint64(0x94D049BB133111EB)
+        values ^= values >> np.uint64(31)
+    return values
+
+
+def _neighbor_tokens(graph_index, edges, weighted, by_metric):
+    """
+    (owner node ids ascending, feature token per owner) from the adjacency. A token is the
+    neighbor, optionally combined with the Metrics type of the edge; weighted signatures repeat
+    each token once per strength level, each copy hashing differently.
+    """
+    offsets = np.asarray(graph_index.offsets)
+    neighbors = np.asarray(graph_index.neighbors).astype(np.int64)
+    edge_rows = np.asarray(graph_index.edge_rows)
+    owners = np.repeat(np.arange(graph_index.num_nodes, dtype=np.int64), np.diff(offsets))
+    not_self = neighbors != owners
+    owners, neighbors, edge_rows = owners[not_self], neighbors[not_self], edge_rows[not_self]
+
+    tokens = neighbors.astype(np.uint64)
+    if by_metric and 'Metrics' in edges.columns:
+        metrics = edges['Metrics'].cat
+        codes = metrics.codes.to_numpy().astype(np.int64)[edge_rows] + 1
+        tokens = tokens * np.uint64(len(metrics.categories) + 1) + codes.astype(np.uint64)
+    if weighted:
+        strength = edges[STRENGTH_COLUMN].to_numpy(dtype=float)
+        valid = strength[~np.isnan(strength)]
+        cuts = np.quantile(valid, np.linspace(0, 1, STRENGTH_LEVELS + 1)[1:-1]) if len(valid) else []
+        levels = np.searchsorted(cuts, np.nan_to_num(strength[edge_rows], nan=-np.inf), side='right') + 1
+        starts = np.cumsum(levels) - levels
+        copies = np.arange(int(levels.sum()), dtype=np.int64) - np.repeat(starts, levels)
+        owners = np.repeat(owners, levels)
+        tokens = np.repeat(tokens, levels) * np.uint64(STRENGTH_LEVELS) + copies.astype(np.uint64)
+    return owners, _mix64(tokens)
+
+
+def minhash_signatures(graph_index, edges, num_perm=NUM_PERM, weighted=SIMILARITY_WEIGHTED,
+                       by_metric=SIMILARITY_BY_METRIC, seed=42):
+    """
+    One MinHash signature (num_perm uint32 values) per node id over its neighbor set; nodes
+    without neighbors get EMPTY_SLOT everywhere. Each permutation is a multiply-shift hash of the
+    mixed token, reduced per node with one minimum.reduceat over the adjacency.
+    """
+    owners, mixed = _neighbor_tokens(graph_index, edges, weighted, by_metric)
+    rng = np.random.default_rng(seed)
+    salts = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64)
+    multipliers = rng.integers(0, 2**63, size=num_perm, dtype=np.uint64) * np.uint64(2) + np.uint64(1)
+
+    signatures = np.full((graph_index.num_nodes, num_perm), EMPTY_SLOT, dtype=np.uint32)
+    if len(owners) == 0:
+        return signatures
+    # Owners come in adjacency order, so each node's tokens are one contiguous run
+    starts = np.flatnonzero(np.concatenate([[True], owners[1:] != owners[:-1]]))
+    present = owners[starts]
+    with np.errstate(over='ignore'):
+        for i in range(num_perm):
+            hashes = (((mixed ^ salts[i]) * multipliers[i]) >> np.uint64(32)).astype(np.uint32)
+            signatures[present, i] = np.minimum.reduceat(hashes, starts)
+    return signatures
+
+
+def band_keys(signatures, bands=BANDS):
+    """
+    One uint64 key per node and LSH band, hashed from the band's rows of the signature.
+    """
+    rows = signatures.shape[1] // bands
+    keys = np.zeros((len(signatures), bands), dtype=np.uint64)
+    for row in range(rows):
+        keys = _mix64(keys ^ signatures[:, row::rows][:, :bands].astype(np.uint64))
+    return keys
+
+
+class SimilarityIndex:
+    """
+    Answers "HCPs whose collaboration network looks like this one's" without comparing neighbor
+    sets pairwise: candidates are the HCPs sharing at least one LSH band bucket, and they are
+    ranked by the share of equal MinHash slots, an estimate of the Jaccard similarity of their
+    neighbor sets (weighted Jaccard for strength-weighted signatures).
+    """
+
+    def __init__(self, graph_index, signatures, node_keys, band_keys, band_nodes):
+        self.graph_index = graph_index
+        self.signatures = signatures
+        self.node_keys = node_keys
+        # Per band: the keys of every node with neighbors, sorted, and the node id of each key
+        self.band_keys = band_keys
+        self.band_nodes = band_nodes
+
+    def candidates(self, node_id):
+        """
+        Node ids sharing a band bucket with node_id, excluding itself. Buckets larger than
+        MAX_BUCKET are approximate: within a bucket, nodes are ordered by their key in the next
+        band, and the MAX_BUCKET nodes around node_id's own next-band key are taken. Those include
+        every node that shares the next band too, rather than whichever HCPs were ingested first.
+        """
+        if (np.asarray(self.signatures[node_id]) == EMPTY_SLOT).all():
+            return np.empty(0, dtype=np.int64)
+        bands = self.band_keys.shape[0]
+        found = []
+        for band in range(bands):
+            keys = self.band_keys[band]
+            key = self.node_keys[node_id, band]
+            start = np.searchsorted(keys, key, side='left')
+            end = np.searchsorted(keys, key, side='right')
+            if end - start > MAX_BUCKET + 1:
+                next_keys = np.asarray(self.node_keys[self.band_nodes[band, start:end], (band + 1) % bands])
+                middle = start + np.searchsorted(next_keys, self.node_keys[node_id, (band + 1) % bands])
+                start = min(max(middle - MAX_BUCKET // 2, start), end - MAX_BUCKET - 1)
+                end = start + MAX_BUCKET + 1
+            found.append(self.band_nodes[band, start:end])
+        found = np.unique(np.concatenate(found))
+        return found[found != node_id]
+
+    def similar(self, node_id, k=10, min_similarity=0.0):
+        """
+        (node ids, estimated similarity) of the k most similar HCPs, most similar first; ties go
+        to the lower node id.
+        """
+        candidates = self.candidates(node_id)
+        estimates = (np.asarray(self.signatures[candidates]) == np.asarray(self.signatures[node_id])).mean(axis=1)
+        keep = estimates >= min_similarity
+        candidates, estimates = candidates[keep], estimates[keep]
+        order = np.lexsort((candidates, -estimates))[:k]
+        return candidates[order], estimates[order]
+
+
+def build_similarity_index(graph_index, edges, num_perm=NUM_PERM, bands=BANDS, weighted=SIMILARITY_WEIGHTED,
+                           by_metric=SIMILARITY_BY_METRIC):
+    signatures = minhash_signatures(graph_index, edges, num_perm, weighted, by_metric)
+    node_keys = band_keys(signatures, bands)
+    indexed = np.flatnonzero((signatures != EMPTY_SLOT).any(axis=1))
+    # Within a bucket, nodes are ordered by their key in the next band (see SimilarityIndex.candidates)
+    keys = node_keys[indexed]
+    orders = np.stack([np.lexsort((keys[:, (band + 1) % bands], keys[:, band])) for band in range(bands)], axis=1)
+    band_nodes = indexed[orders].T.copy()
+    sorted_keys = np.take_along_axis(keys, orders, axis=0).T.copy()
+    return SimilarityIndex(graph_index, signatures, node_keys, sorted_keys, band_nodes)
+
+
+def _index_params(num_perm, bands, weighted, by_metric):
+    return {'num_perm': num_perm, 'bands': bands, 'weighted': bool(weighted), 'by_metric': bool(by_metric),
+            'format': SIMILARITY_FORMAT}
+
+
+def save_similarity_index(index, path, params):
+    """
+    Persists the signatures and band tables as .npy arrays, plus the build parameters.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    os.makedirs(tmp_path, exist_ok=True)
+    for name in SIMILARITY_ARRAYS:
+        np.save(os.path.join(tmp_path, f"{name}.npy"), getattr(index, name))
+    with open(os.path.join(tmp_path, 'params.json'), 'w') as f:
+        json.dump(params, f)
+    if os.path.isdir(path):
+        # Built with other parameters; replaced as a whole
+        shutil.rmtree(path, ignore_errors=True)
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def read_similarity_index(path, graph_index):
+    """
+    Loads a persisted similarity index; arrays are memory-mapped read-only.
+    """
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in SIMILARITY_ARRAYS}
+    return SimilarityIndex(graph_index, **arrays)
+
+
+def _saved_params(path):
+    try:
+        with open(os.path.join(path, 'params.json')) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_similarity_index(csv_path, graph_index, edges, cache_dir=None, version=None, num_perm=NUM_PERM,
+                          bands=BANDS, weighted=SIMILARITY_WEIGHTED, by_metric=SIMILARITY_BY_METRIC):
+    """
+    Returns the similarity index for a version of csv_path (by default the current one), building
+    it the first time, or again if it was built with other parameters. It is persisted only while
+    that version is current.
+    """
+    path = cache_path_for(csv_path, '.similarity', cache_dir, version)
+    params = _index_params(num_perm, bands, weighted, by_metric)
+    if _saved_params(path) != params:
+        index = build_similarity_index(graph_index, edges, num_perm, bands, weighted, by_metric)
+        if not is_current_version(csv_path, version, cache_dir):
+            return index
+        save_similarity_index(index, path, params)
+        remove_stale_caches(path, '.similarity')
+    return read_similarity_index(path, graph_index)
@@ -0,0 +1,370 @@
+import os
+import shutil
+import numpy as np
+import pandas as pd
+from ingest import cache_path_for, read_feather_mmap, write_feather_atomic, remove_stale_caches
+from graph_index import gather_slices
+
+# --- Precomputed HCP summary store: every summary field for every HCP in one vectorized pass ---
+
+DEFINED_METRICS = ['Publishers', 'Affiliations', 'Promotional Events', 'Clinical Trials', 'Panels']
+METRIC_IMPACT_STATEMENTS = {
+    'Publishers': "Co-authored on publications.",
+    'Affiliations': "Shared professional affiliations.",
+    'Promotional Events': "Collaborated on promotional events.",
+    'Clinical Trials': "Participated in clinical trials.",
+    'Panels': "Contributed to advisory panels.",
+}
+STAT_COLUMNS = [
+    'influence_percentile', 'avg_connection_strength', 'unique_states_connected',
+    'unique_cities_connected', 'collaboration_diversity_score', 'is_kol'
+]
+STORE_ARRAYS = ['metric_counts', 'ranked_entries']
+
+
+def _distinct_per_owner(owners, codes, num_nodes):
+    """
+    Number of distinct non-negative codes per owner.
+    """
+    valid = codes >= 0
+    if not valid.any():
+        return np.zeros(num_nodes, dtype=np.int64)
+    width = int(codes.max()) + 1
+    keys = np.unique(owners[valid] * width + codes[valid])
+    return np.bincount(keys // width, minlength=num_nodes)
+
+
+def _category_codes(series):
+    """
+    Integer codes (-1 for missing) plus the category labels of a text column.
+    """
+    if not isinstance(series.dtype, pd.CategoricalDtype):
+        series = series.astype('category')
+    return series.cat.codes.to_numpy().astype(np.int64), list(series.cat.categories)
+
+
+class SummaryStore:
+    """
+    Per-HCP summary fields for the whole network, keyed by node id of the graph index.
+    Looking up one HCP only touches that HCP's row and its own adjacency slice.
+    """
+
+    def __init__(self, graph_index, edges, stats, metric_categories, metric_counts, ranked_entries):
+        self.graph_index = graph_index
+        self.edges = edges
+        self.stats = stats
+        self.metric_categories = metric_categories
+        self.metric_counts = metric_counts
+        self.ranked_entries = ranked_entries
+
+    def top_connections(self, node_id):
+        """
+        Direct connections of a node ranked by 0.6 * influence + 0.4 * strength.
+        """
+        nodes = self.graph_index.nodes
+        entries = self.ranked_entries[self.graph_index.offsets[node_id]:self.graph_index.offsets[node_id + 1]]
+        neighbor_ids = self.graph_index.neighbors[entries]
+        edge_rows = self.graph_index.edge_rows[entries]
+        strengths = self.edges['Overall Connection Strength'].to_numpy()[edge_rows]
+        if 'Metrics' in self.edges.columns:
+            metric_types = self.edges['Metrics'].take(edge_rows).to_numpy(dtype=object)
+        else:
+            metric_types = ['General Collaboration'] * len(entries)
+        # Only the rows needed are taken (columns may be categorical) and no row objects are built;
+        # this runs once per summary lookup
+        names = nodes['hcp_name'].take(neighbor_ids).to_numpy(dtype=object)
+        npis = nodes['NPI'].to_numpy()[neighbor_ids].tolist()
+        influences = nodes['influence'].to_numpy()[neighbor_ids].tolist()
+        papers, panels, trials = (nodes[col].to_numpy()[neighbor_ids].tolist() for col in ['papers', 'panels', 'trials'])
+
+        top_connections_list = []
+        for i, (strength, metric_type) in enumerate(zip(strengths, metric_types)):
+            impact_statement = METRIC_IMPACT_STATEMENTS.get(metric_type, "Engaged in a key professional collaboration.")
+            if metric_type not in METRIC_IMPACT_STATEMENTS:
+                if papers[i] > 0:
+                    impact_statement = f"Collaborated on {int(papers[i])} papers."
+                elif panels[i] > 0:
+                    impact_statement = f"Contributed to {int(panels[i])} panels."
+                elif trials[i] > 0:
+                    impact_statement = f"Engaged in {int(trials[i])} trials."
+            top_connections_list.append({
+                'name': names[i],
+                'npi': npis[i],
+                # float32 strengths are rounded back to the decimals of the CSV
+                'strength': round(float(strength), 6),
+                'influence': float(influences[i]),
+                'metric_type': metric_type,
+                'impact_statement': impact_statement
+            })
+        return top_connections_list
+
+    def dominant_metrics(self, node_id, top=2):
+        """
+        Most frequent connection metrics of a node; ties go to the metric seen first in edge order.
+        """
+        if 'Metrics' not in self.edges.columns:
+            return []
+        codes = self.edges['Metrics'].cat.codes.to_numpy()[self.graph_index.incident_edge_rows(node_id)]
+        codes = codes[codes >= 0]
+        if len(codes) == 0:
+            return []
+        observed, first_seen, counts = np.unique(codes, return_index=True, return_counts=True)
+        order = np.lexsort((first_seen, -counts))[:top]
+        return [self.metric_categories[code] for code in observed[order]]
+
+    def summary(self, npi):
+        """
+        Returns the summary dict rendered by the HCP Summary page, or None for unknown NPIs.
+        """
+        node_id = self.graph_index.node_id(npi)
+        if node_id is None:
+            return None
+
+        hcp_data = self.graph_index.nodes.iloc[node_id]
+        stats = self.stats.iloc[node_id]
+        influence_percentile = stats['influence_percentile']
+        if self.graph_index.num_nodes > 1:
+            influence_rank_text = f"placing them in the top {100 - influence_percentile:.1f}% of all HCPs"
+        else:
+            influence_rank_text = " (only HCP in the network)"
+
+        # Connection Metrics
+        counts = dict(zip(self.metric_categories, self.metric_counts[node_id].tolist()))
+        dominant_metrics = self.dominant_metrics(node_id)
+        dominant_metrics_text = " and ".join(dominant_metrics) if dominant_metrics else "no specific dominant metric identified"
+
+        connection_metrics_counts = {metric: counts.get(metric, 0) for metric in DEFINED_METRICS}
+        total_metric_instances = sum(counts.values())
+        other_metrics_count = total_metric_instances - sum(connection_metrics_counts.values())
+        metrics_breakdown = []
+        metrics_interpretation = ""
+        if total_metric_instances > 0:
+            for metric, count in connection_metrics_counts.items():
+                if count > 0:
+                    percentage = (count / total_metric_instances) * 100
+                    metrics_breakdown.append(f"- **{metric}**: **{count}** connections (**{percentage:.1f}%** of direct metrics)")
+            if other_metrics_count > 0:
+                other_percentage = (other_metrics_count / total_metric_instances) * 100
+                metrics_breakdown.append(f"- **Other/Undefined**: **{other_metrics_count}** connections (**{other_percentage:.1f}%** of direct metrics)")
+
+            sorted_metric_items = sorted(connection_metrics_counts.items(), key=lambda x: x[1], reverse=True)
+            dominant_category_val = sorted_metric_items[0][0] if sorted_metric_items[0][1] > 0 else 'diverse engagement'
+            if len(sorted_metric_items) > 1 and sorted_metric_items[1][1] > 0:
+                secondary_category_val = sorted_metric_items[1][0]
+                metrics_interpretation = f"This highlights a strong focus on **{dominant_category_val}** connections, with notable engagement in **{secondary_category_val}**."
+            else:
+                metrics_interpretation = f"This HCP's network shows a strong focus on **{dominant_category_val}** connections."
+        else:
+            metrics_breakdown.append("- **No specific connection metrics or direct connections found for this HCP to analyze dynamics.**")
+
+        return {
+            'hcp_data': hcp_data,
+            'total_connections': hcp_data['connections'],
+            'influence_score': hcp_data['influence'],
+            'influence_rank_text': influence_rank_text,
+            'influence_percentile': influence_percentile,
+            'avg_connection_strength': stats['avg_connection_strength'],
+            'unique_states_connected': int(stats['unique_states_connected']),
+            'unique_cities_connected': int(stats['unique_cities_connected']),
+            'dominant_metrics_text': dominant_metrics_text,
+            'top_connections_list': self.top_connections(node_id),
+            'metrics_breakdown': metrics_breakdown,
+            'metrics_interpretation': metrics_interpretation,
+            'papers': int(hcp_data['papers']),
+            'panels': int(hcp_data['panels']),
+            'trials': int(hcp_data['trials']),
+            'collaboration_diversity_score': stats['collaboration_diversity_score'],
+            'kol_status': "Key Opinion Leader" if stats['is_kol'] else "Standard HCP"
+        }
+
+
+def _global_stats(nodes):
+    """
+    Fields ranked against the whole network: influence percentile and the KOL flag.
+    """
+    num_nodes = len(nodes)
+    # Influence Rank
+    influence = nodes['influence'].to_numpy(dtype=float)
+    ranked_influence = np.sort(influence[~np.isnan(influence)])
+    influence_percentile = np.zeros(num_nodes)
+    if num_nodes > 1 and len(ranked_influence):
+        below = np.searchsorted(ranked_influence, influence, side='left')
+        # An HCP without an influence score ranks last, as in the per-HCP summary
+        influence_percentile = np.where(np.isnan(influence) | (influence == ranked_influence[0]), 0,
+                                        below / (num_nodes - 1) * 100)
+
+    # KOL Status
+    activity = nodes['papers'] + nodes['panels'] + nodes['trials']
+    is_kol = (
+        (nodes['influence'] >= nodes['influence'].quantile(0.9)) &
+        (nodes['connections'] >= nodes['connections'].quantile(0.9)) &
+        (activity >= activity.quantile(0.9))
+    ).to_numpy()
+    return influence_percentile, is_kol
+
+
+def _metric_codes(edges):
+    if 'Metrics' in edges.columns:
+        return _category_codes(edges['Metrics'])
+    return np.full(len(edges), -1, dtype=np.int64), []
+
+
+def _owner_fields(graph_index, edges, owner_ids, metric_codes, num_metrics):
+    """
+    Fields that depend on a node's own edges and its neighbors' attributes, for owner_ids only:
+    average strength, distinct neighbor states and cities, metric counts, diversity score, and the
+    ranked entries of each owner's slice, concatenated in owner order.
+    """
+    nodes = graph_index.nodes
+    num_owners = len(owner_ids)
+    entries = gather_slices(np.asarray(graph_index.offsets), owner_ids)
+    degree = np.diff(graph_index.offsets)[owner_ids]
+    owners = np.repeat(np.arange(num_owners, dtype=np.int64), degree)
+    neighbors = np.asarray(graph_index.neighbors)[entries]
+    rows = np.asarray(graph_index.edge_rows)[entries]
+    fields = pd.DataFrame(index=pd.RangeIndex(num_owners))
+
+    # Average Connection Strength, over the CSV's decimals rather than their float32 approximations
+    strength = np.round(edges['Overall Connection Strength'].to_numpy(dtype=float)[rows], 6)
+    has_strength = ~np.isnan(strength)
+    strength_sum = np.bincount(owners, weights=np.where(has_strength, strength, 0), minlength=num_owners)
+    strength_count = np.bincount(owners, weights=has_strength, minlength=num_owners)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        fields['avg_connection_strength'] = np.where(degree > 0, strength_sum / strength_count, 0.0)
+
+    # Network Diversity
+    not_self = neighbors != owner_ids[owners]
+    for column, target in [('state', 'unique_states_connected'), ('city', 'unique_cities_connected')]:
+        codes, _ = _category_codes(nodes[column])
+        fields[target] = _distinct_per_owner(owners[not_self], codes[neighbors[not_self]], num_owners)
+
+    # Connection Metrics and Collaboration Diversity Score (entropy-based)
+    codes = metric_codes[rows]
+    valid = codes >= 0
+    metric_counts = np.bincount(
+        owners[valid] * num_metrics + codes[valid], minlength=num_owners * num_metrics
+    ).reshape(num_owners, num_metrics).astype(np.int32)
+    totals = metric_counts.sum(axis=1, keepdims=True)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        probabilities = np.where(totals > 0, metric_counts / totals, 0)
+        entropy = -np.where(probabilities > 0, probabilities * np.log2(probabilities), 0).sum(axis=1)
+        max_entropy = np.log2(np.maximum((metric_counts > 0).sum(axis=1), 1))
+        fields['collaboration_diversity_score'] = np.where(max_entropy > 0, entropy / max_entropy, 0.0)
+
+    # Top Connections: per node, rank entries by score, keeping edge order among ties
+    # Scores are compared at 1e-6 so that ties in the CSV's decimal values survive float32 strengths
+    influence = nodes['influence'].to_numpy(dtype=float)
+    score = np.round(0.6 * influence[neighbors] + 0.4 * strength, 6)
+    score = np.where(np.isnan(score), -np.inf, score)
+    ranked_entries = entries[np.lexsort((rows, -score, owners))]
+    return fields, metric_counts, ranked_entries
+
+
+def _assemble_stats(influence_percentile, fields, is_kol):
+    stats = pd.DataFrame({'influence_percentile': influence_percentile})
+    for column in STAT_COLUMNS[1:-1]:
+        stats[column] = np.asarray(fields[column])
+    stats['is_kol'] = is_kol
+    return stats
+
+
+def build_summary_store(graph_index, edges):
+    """
+    Computes percentile rank, average strength, state/city diversity, metric entropy, KOL flag and
+    ranked top connections for every HCP at once.
+    """
+    metric_codes, metric_categories = _metric_codes(edges)
+    owner_ids = np.arange(graph_index.num_nodes, dtype=np.int64)
+    fields, metric_counts, ranked_entries = _owner_fields(
+        graph_index, edges, owner_ids, metric_codes, len(metric_categories)
+    )
+    influence_percentile, is_kol = _global_stats(graph_index.nodes)
+    stats = _assemble_stats(influence_percentile, fields, is_kol)
+    return SummaryStore(graph_index, edges, stats, metric_categories, metric_counts, ranked_entries)
+
+
+def update_summary_store(store, graph_index, edges, update):
+    """
+    Summary store after an edge change (see graph_index.update_graph_index). Per-node fields are
+    recomputed only for HCPs whose edges changed and for the neighbors of HCPs whose influence,
+    city or state changed. Everything else is carried over. The network-wide ranks are cheap and
+    are recomputed for everyone.
+    """
+    nodes, old_nodes = graph_index.nodes, store.graph_index.nodes
+    old_ids = update.old_node_ids(graph_index.num_nodes)
+    carried = np.maximum(old_ids, 0)
+
+    # HCPs whose attributes, as seen by their neighbors, changed
+    touched = update.touched
+    changed = old_ids[touched] < 0
+    for column in ['influence', 'city', 'state']:
+        before = old_nodes[column].to_numpy(dtype=object)[carried[touched]]
+        after = nodes[column].to_numpy(dtype=object)[touched]
+        changed |= ~((before == after) | (pd.isna(before) & pd.isna(after)))
+    changed = touched[changed]
+    neighbors = np.asarray(graph_index.neighbors)[gather_slices(np.asarray(graph_index.offsets), changed)]
+    recompute = np.union1d(touched, neighbors)
+
+    metric_codes, metric_categories = _metric_codes(edges)
+    fields, counts, ranked = _owner_fields(graph_index, edges, recompute, metric_codes, len(metric_categories))
+
+    stat_fields = {}
+    for column in fields.columns:
+        stat_fields[column] = store.stats[column].to_numpy()[carried]
+        stat_fields[column][recompute] = fields[column].to_numpy()
+    influence_percentile, is_kol = _global_stats(nodes)
+    stats = _assemble_stats(influence_percentile, stat_fields, is_kol)
+
+    # New metric categories are appended to the old ones, so old counts line up column by column
+    metric_counts = np.zeros((graph_index.num_nodes, len(metric_categories)), dtype=np.int32)
+    metric_counts[:, :len(store.metric_categories)] = np.asarray(store.metric_counts)[carried]
+    metric_counts[recompute] = counts
+
+    # Carried-over slices keep their ranking; only the positions of their entries moved
+    offsets, old_offsets = np.asarray(graph_index.offsets), np.asarray(store.graph_index.offsets)
+    kept = np.setdiff1d(np.arange(graph_index.num_nodes, dtype=np.int64), recompute, assume_unique=True)
+    ranked_entries = np.empty(len(graph_index.edge_rows), dtype=np.int64)
+    ranked_entries[gather_slices(offsets, kept)] = update.entry_map[
+        np.asarray(store.ranked_entries)[gather_slices(old_offsets, old_ids[kept])]
+    ]
+    ranked_entries[gather_slices(offsets, recompute)] = ranked
+    return SummaryStore(graph_index, edges, stats, metric_categories, metric_counts, ranked_entries)
+
+
+def save_summary_store(store, path):
+    """
+    Persists the precomputed fields as a Feather table plus .npy arrays.
+    """
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    os.makedirs(tmp_path, exist_ok=True)
+    write_feather_atomic(store.stats, os.path.join(tmp_path, 'stats.feather'))
+    write_feather_atomic(pd.DataFrame({'metric': store.metric_categories}, dtype=object),
+                         os.path.join(tmp_path, 'metrics.feather'))
+    for name in STORE_ARRAYS:
+        np.save(os.path.join(tmp_path, f"{name}.npy"), getattr(store, name))
+    try:
+        os.replace(tmp_path, path)
+    except OSError:
+        shutil.rmtree(tmp_path, ignore_errors=True)
+
+
+def read_summary_store(path, graph_index, edges):
+    """
+    Loads a persisted summary store; arrays are memory-mapped read-only.
+    """
+    stats = read_feather_mmap(os.path.join(path, 'stats.feather'))
+    metric_categories = read_feather_mmap(os.path.join(path, 'metrics.feather'))['metric'].tolist()
+    arrays = {name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode='r') for name in STORE_ARRAYS}
+    return SummaryStore(graph_index, edges, stats, metric_categories, **arrays)
+
+
+def load_summary_store(csv_path, graph_index, edges, cache_dir=None, version=None):
+    """
+    Returns the summary store for a version of csv_path (by default the current one), building and persisting it
+    the first time.
+    """
+    path = cache_path_for(csv_path, '.summaries', cache_dir, version)
+    if not os.path.isdir(path):
+        save_summary_store(build_summary_store(graph_index, edges), path)
+        remove_stale_caches(path, '.summaries')
+    return read_summary_store(path, graph_index, edges)
@@ -0,0 +1,25 @@
+import os
+import sys
+import pytest
+
+# The application modules live flat at the repository root
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmark import generate_edge_csv  # noqa: E402
+
+# Small enough for the pure-pandas/networkx references, large enough for hubs and ties
+TEST_EDGES = 3000
+TEST_NODES = 300
+
+
+@pytest.fixture
+def edge_csv(tmp_path):
+    """
+    A synthetic "Main DB_1.csv"-shaped export (power-law degrees, some missing values).
+    """
+    return generate_edge_csv(str(tmp_path / "edges.csv"), TEST_EDGES, seed=7, num_nodes=TEST_NODES)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / "cache")
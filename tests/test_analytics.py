@@ -0,0 +1,49 @@
+import math
+import networkx as nx
+import numpy as np
+import pytest
+from dataset import load_dataset
+
+
+def _reference_graph(dataset):
+    # Parallel edges summed, self-loops and missing strengths dropped
+    graph = nx.Graph()
+    graph.add_nodes_from(range(dataset.graph_index.num_nodes))
+    strength = dataset.edges['Overall Connection Strength'].to_numpy(dtype=float)
+    for u, v, s in zip(dataset.graph_index.edge_src.tolist(), dataset.graph_index.edge_dst.tolist(), strength.tolist()):
+        if u == v:
+            continue
+        weight = 0.0 if math.isnan(s) else s
+        if graph.has_edge(u, v):
+            graph[u][v]['weight'] += weight
+        else:
+            graph.add_edge(u, v, weight=weight)
+    return graph
+
+
+@pytest.fixture
+def dataset(edge_csv, cache_dir):
+    return load_dataset(edge_csv, cache_dir)
+
+
+def _as_array(scores, num_nodes):
+    return np.array([scores[node] for node in range(num_nodes)])
+
+
+def test_weighted_degree_matches_networkx(dataset):
+    graph = _reference_graph(dataset)
+    expected = _as_array(dict(graph.degree(weight='weight')), graph.number_of_nodes())
+    np.testing.assert_allclose(dataset.analytics['weighted_degree'].to_numpy(), expected, rtol=1e-9)
+
+
+def test_pagerank_matches_networkx(dataset):
+    pytest.importorskip('scipy', reason="nx.pagerank needs scipy")
+    graph = _reference_graph(dataset)
+    expected = _as_array(nx.pagerank(graph, weight='weight'), graph.number_of_nodes())
+    np.testing.assert_allclose(dataset.analytics['pagerank'].to_numpy(), expected, atol=1e-6)
+
+
+def test_eigenvector_centrality_matches_networkx(dataset):
+    graph = _reference_graph(dataset)
+    expected = _as_array(nx.eigenvector_centrality(graph, weight='weight', max_iter=100), graph.number_of_nodes())
+    np.testing.assert_allclose(dataset.analytics['eigenvector'].to_numpy(), expected, atol=1e-6)
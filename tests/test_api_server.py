@@ -0,0 +1,87 @@
+import json
+import os
+import threading
+import urllib.error
+import urllib.request
+import pyarrow.ipc as ipc
+import pytest
+import api_server
+from dataset import load_dataset
+from query_api import ARROW_MEDIA_TYPE, filtered_nodes
+
+
+@pytest.fixture
+def server(edge_csv, cache_dir):
+    server = api_server.make_server(edge_csv, port=0, cache_dir=cache_dir)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _request(url, body=None):
+    """
+    Returns (status, headers, body bytes); HTTP errors are returned like any other response.
+    """
+    data = None if body is None else json.dumps(body).encode('utf-8')
+    try:
+        with urllib.request.urlopen(urllib.request.Request(url, data=data)) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_health(server, edge_csv, cache_dir):
+    dataset = load_dataset(edge_csv, cache_dir)
+    status, _, body = _request(f"{server}/health")
+    assert status == 200
+    health = json.loads(body)
+    assert health['version'] == dataset.version
+    assert (health['hcps'], health['edges']) == (dataset.graph_index.num_nodes, dataset.graph_index.num_edges)
+
+
+def test_nodes_as_json_and_arrow(server, edge_csv, cache_dir):
+    expected = filtered_nodes(load_dataset(edge_csv, cache_dir), 10, states=['CA', 'NY'])['NPI'].tolist()
+    status, _, body = _request(f"{server}/nodes?top_n=10&states=CA,NY")
+    assert status == 200
+    assert [row['NPI'] for row in json.loads(body)['nodes']] == expected
+
+    status, headers, body = _request(f"{server}/nodes?top_n=10&states=CA,NY&format=arrow")
+    assert status == 200 and headers['Content-Type'] == ARROW_MEDIA_TYPE
+    assert ipc.open_stream(body).read_all().column('NPI').to_pylist() == expected
+
+
+def test_errors(server):
+    status, _, body = _request(f"{server}/summary?npi=1")
+    assert status == 404 and json.loads(body) == {'error': "Unknown HCP: 1"}
+    status, _, body = _request(f"{server}/nodes?top_n=ten")
+    assert status == 400 and 'error' in json.loads(body)
+    status, _, body = _request(f"{server}/no-such-query")
+    assert status == 400 and 'no-such-query' in json.loads(body)['error']
+
+
+def test_batch(server, edge_csv, cache_dir):
+    npi = int(filtered_nodes(load_dataset(edge_csv, cache_dir), 1)['NPI'].iloc[0])
+    requests = [{'query': 'nodes', 'params': {'top_n': 3}}, {'query': 'summary', 'params': {'npi': 1}},
+                {'query': 'neighborhood', 'params': {'npi': npi, 'hops': 1}}, 'not a request']
+    status, _, body = _request(f"{server}/batch", {'requests': requests})
+    assert status == 200
+    results = json.loads(body)['results']
+    assert len(results[0]['result']['nodes']) == 3
+    assert results[1]['status'] == 404
+    assert results[2]['result']['nodes'][0]['NPI'] == npi
+    assert results[3]['status'] == 400
+
+    status, headers, body = _request(f"{server}/batch?format=arrow", {'requests': requests})
+    assert status == 200
+    assert ipc.open_stream(body).read_all().column('request').to_pylist() == [0, 0, 0] + [2] * len(results[2]['result']['nodes'])
+    assert sorted(json.loads(headers['X-Batch-Errors'])) == ['1', '3']
+
+
+def test_missing_dataset_answers_with_json_error(server, edge_csv, monkeypatch):
+    monkeypatch.setattr(api_server, 'VERSION_CHECK_INTERVAL', 0)
+    os.remove(edge_csv)
+    for url, body in [(f"{server}/health", None), (f"{server}/batch", {'requests': []})]:
+        status, _, response = _request(url, body)
+        assert status == 500 and 'error' in json.loads(response)
@@ -0,0 +1,16 @@
+import threading
+from dataset import load_dataset
+
+
+def test_background_detection_persists_labels(edge_csv, cache_dir):
+    dataset = load_dataset(edge_csv, cache_dir)
+    assert not dataset.communities_ready
+    dataset.detect_communities_in_background()
+    for thread in threading.enumerate():
+        if thread.name == 'community-detection':
+            thread.join(timeout=60)
+    assert dataset.communities_ready
+    # Another process attaching to the same version finds them persisted
+    reloaded = load_dataset(edge_csv, cache_dir)
+    assert reloaded.communities_ready
+    assert (reloaded.community_labels == dataset.community_labels).all()
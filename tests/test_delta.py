@@ -0,0 +1,116 @@
+import os
+import numpy as np
+import pandas as pd
+from benchmark import generate_edge_csv
+from dataset import load_dataset
+from delta import ACTION_COLUMN, apply_delta
+from graph_index import INDEX_ARRAYS
+from analytics import load_analytics
+from ingest import cache_path_for, current_version
+
+
+def _pair_keys(df):
+    low = np.minimum(df['NPI_1'].to_numpy(), df['NPI_2'].to_numpy())
+    high = np.maximum(df['NPI_1'].to_numpy(), df['NPI_2'].to_numpy())
+    return pd.Series(list(zip(low, high)), index=df.index)
+
+
+def _write_delta(edge_csv, tmp_path):
+    """
+    Deletes a few HCP pairs, updates a few others and adds edges between new and existing HCPs.
+    Returns (delta path, the export with the delta applied by hand).
+    """
+    source = pd.read_csv(edge_csv)
+    deleted = source.iloc[[0, 5, 9]][['NPI_1', 'NPI_2']]
+    updated = source.iloc[[20, 21, 40]].assign(**{'Overall Connection Strength': [9.5, 0.001, 4.25]})
+    added = pd.read_csv(generate_edge_csv(str(tmp_path / "new.csv"), 40, seed=11, num_nodes=10))
+    # Half of the new edges join a new HCP to an existing one
+    added.loc[::2, ['NPI_2', 'HCP_2']] = source.loc[:19, ['NPI_1', 'HCP_1']].to_numpy()
+    delta = pd.concat([deleted.assign(**{ACTION_COLUMN: 'delete'}), updated.assign(**{ACTION_COLUMN: 'update'}),
+                       added.assign(**{ACTION_COLUMN: 'add'})], ignore_index=True)
+    delta_path = str(tmp_path / "delta.csv")
+    delta.to_csv(delta_path, index=False)
+
+    changed = set(_pair_keys(deleted)) | set(_pair_keys(updated))
+    kept = source[~_pair_keys(source).isin(changed)]
+    merged = pd.concat([kept, updated, added], ignore_index=True)
+    merged_dir = tmp_path / "merged"
+    merged_dir.mkdir()
+    merged_path = str(merged_dir / "edges.csv")
+    merged.to_csv(merged_path, index=False)
+    return delta_path, merged_path
+
+
+def _touched_npis(edge_csv, delta_path):
+    """HCPs on any edge the delta removes or adds."""
+    source = pd.read_csv(edge_csv)
+    delta = pd.read_csv(delta_path)
+    changed = set(_pair_keys(delta))
+    removed = source[_pair_keys(source).isin(changed)]
+    return np.union1d(removed[['NPI_1', 'NPI_2']].to_numpy().ravel(), delta[['NPI_1', 'NPI_2']].to_numpy().ravel())
+
+
+def test_delta_matches_full_rebuild(edge_csv, cache_dir, tmp_path):
+    delta_path, merged_path = _write_delta(edge_csv, tmp_path)
+    apply_delta(edge_csv, delta_path, cache_dir)
+    updated = load_dataset(edge_csv, cache_dir)
+    rebuilt = load_dataset(merged_path, str(tmp_path / "merged-cache"))
+
+    # Category dictionaries only grow under deltas, so values are compared rather than codes
+    pd.testing.assert_frame_equal(updated.edges, rebuilt.edges, check_categorical=False)
+    pd.testing.assert_frame_equal(updated.nodes, rebuilt.nodes, check_categorical=False)
+    for name in INDEX_ARRAYS:
+        np.testing.assert_array_equal(getattr(updated.graph_index, name), getattr(rebuilt.graph_index, name),
+                                      err_msg=name)
+    pd.testing.assert_frame_equal(updated.summary_store.stats, rebuilt.summary_store.stats)
+    for npi in rebuilt.graph_index.npis.tolist():
+        expected = rebuilt.summary_store.summary(npi)
+        actual = updated.summary_store.summary(npi)
+        # hcp_data is the node row compared above
+        assert {**actual, 'hcp_data': None} == {**expected, 'hcp_data': None}, npi
+
+
+def test_delta_without_prior_communities_leaves_them_to_detection(edge_csv, cache_dir, tmp_path):
+    delta_path, _ = _write_delta(edge_csv, tmp_path)
+    apply_delta(edge_csv, delta_path, cache_dir)
+    version = current_version(edge_csv, cache_dir)
+    # No full Louvain run inside the delta: the new version is published without labels
+    assert not os.path.exists(cache_path_for(edge_csv, '.communities.npy', cache_dir, version))
+    updated = load_dataset(edge_csv, cache_dir)
+    assert not updated.communities_ready
+    assert len(updated.community_labels) == updated.graph_index.num_nodes
+    assert updated.communities_ready
+
+
+def test_delta_carries_prior_communities_forward(edge_csv, cache_dir, tmp_path):
+    delta_path, _ = _write_delta(edge_csv, tmp_path)
+    old = load_dataset(edge_csv, cache_dir)
+    previous = np.asarray(old.community_labels)
+    apply_delta(edge_csv, delta_path, cache_dir)
+    updated = load_dataset(edge_csv, cache_dir)
+    assert updated.communities_ready
+    labels = np.asarray(updated.community_labels)
+    assert len(labels) == updated.graph_index.num_nodes
+
+    # HCPs away from the change keep their community, up to renumbering
+    touched = set(_touched_npis(edge_csv, delta_path))
+    old_npis, new_npis = old.graph_index.npis, updated.graph_index.npis
+    untouched = np.array([npi not in touched for npi in old_npis.tolist()])
+    new_ids = updated.graph_index.node_ids(old_npis[untouched])
+    pairs = set(zip(previous[untouched].tolist(), labels[new_ids].tolist()))
+    assert len(pairs) == len({old_label for old_label, _ in pairs})
+
+
+def test_old_version_does_not_replace_published_artifacts(edge_csv, cache_dir, tmp_path):
+    delta_path, _ = _write_delta(edge_csv, tmp_path)
+    old = load_dataset(edge_csv, cache_dir)
+    old.analytics  # carried forward by the delta
+    apply_delta(edge_csv, delta_path, cache_dir)
+    published = cache_path_for(edge_csv, '.analytics.feather', cache_dir, current_version(edge_csv, cache_dir))
+    assert os.path.exists(published)
+
+    # A session still on the old version rebuilds in memory without touching the cache
+    analytics = load_analytics(edge_csv, old.graph_index, old.edges, cache_dir, old.version)
+    assert len(analytics) == old.graph_index.num_nodes
+    assert not os.path.exists(cache_path_for(edge_csv, '.analytics.feather', cache_dir, old.version))
+    assert os.path.exists(published)
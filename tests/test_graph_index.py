@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+from dataset import load_dataset
+from query_api import filtered_nodes, induced_edge_rows
+
+
+@pytest.mark.parametrize('top_n, min_strength, max_strength', [
+    (50, None, None),
+    (100, 0.5, 1.2),
+    (300, 0.0, 0.3),
+    (20, 2.0, None),
+])
+def test_induced_edges_match_pandas_filter(edge_csv, cache_dir, top_n, min_strength, max_strength):
+    dataset = load_dataset(edge_csv, cache_dir)
+    npis = filtered_nodes(dataset, top_n)['NPI'].tolist()
+    edges = dataset.edges
+    # The original filter from detailed.get_filtered_edges_for_display
+    strength = edges['Overall Connection Strength']
+    mask = edges['NPI_1'].isin(npis) & edges['NPI_2'].isin(npis)
+    if min_strength is not None:
+        mask &= strength >= np.float32(min_strength)
+    if max_strength is not None:
+        mask &= strength <= np.float32(max_strength)
+    expected = np.flatnonzero(mask.to_numpy())
+    np.testing.assert_array_equal(induced_edge_rows(dataset, npis, min_strength, max_strength), expected)
@@ -0,0 +1,72 @@
+import os
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.ipc as ipc
+import ingest
+from benchmark import generate_edge_csv
+from ingest import (STRENGTH_COLUMN, cache_path_for, current_version, load_edge_table, read_feather_mmap,
+                    write_feather_atomic)
+
+
+def _write_parts(directory, prefix, seeds):
+    os.makedirs(directory, exist_ok=True)
+    return [generate_edge_csv(os.path.join(directory, f"{prefix}{seed}.csv"), 500, seed=seed, num_nodes=80)
+            for seed in seeds]
+
+
+def test_globs_in_one_directory_keep_separate_caches(tmp_path, cache_dir):
+    source_dir = str(tmp_path / "exports")
+    _write_parts(source_dir, 'part', [1, 2, 10])
+    # Both patterns reduce to the file name 'part_'
+    few, every = os.path.join(source_dir, 'part?.csv'), os.path.join(source_dir, 'part*.csv')
+
+    few_edges = load_edge_table(few, cache_dir)
+    every_edges = load_edge_table(every, cache_dir)
+    few_path = cache_path_for(few, '.feather', cache_dir)
+    every_path = cache_path_for(every, '.feather', cache_dir)
+    assert few_path != every_path
+    # Ingesting one glob must not remove the other's edge store as stale
+    assert os.path.exists(few_path) and os.path.exists(every_path)
+    assert len(few_edges) == 1000 and len(every_edges) == 1500
+    assert cache_path_for(source_dir, '.feather', cache_dir) not in (few_path, every_path)
+
+
+def test_new_version_replaces_stale_cache(tmp_path, cache_dir):
+    csv_path = generate_edge_csv(str(tmp_path / "edges.csv"), 500, seed=1, num_nodes=80)
+    other_path = generate_edge_csv(str(tmp_path / "edges-2.csv"), 500, seed=2, num_nodes=80)
+    load_edge_table(other_path, cache_dir)
+    first = cache_path_for(csv_path, '.feather', cache_dir)
+    load_edge_table(csv_path, cache_dir)
+
+    generate_edge_csv(csv_path, 600, seed=3, num_nodes=80)
+    os.utime(csv_path, ns=(0, os.stat(csv_path).st_mtime_ns + 10 ** 9))
+    assert len(load_edge_table(csv_path, cache_dir)) == 600
+    assert not os.path.exists(first)
+    # 'edges-2' starts with the 'edges-' prefix but is another source
+    assert os.path.exists(cache_path_for(other_path, '.feather', cache_dir, current_version(other_path, cache_dir)))
+
+
+def test_feather_artifacts_map_without_copying(tmp_path):
+    # More rows than Feather's default 64k-row batches
+    frame = pd.DataFrame({'npi': np.arange(200_000, dtype=np.int64), 'score': np.linspace(0, 1, 200_000)})
+    path = str(tmp_path / "frame.feather")
+    write_feather_atomic(frame, path)
+    before = pa.total_allocated_bytes()
+    loaded = read_feather_mmap(path)
+    assert pa.total_allocated_bytes() - before < 64 * 1024
+    pd.testing.assert_frame_equal(loaded, frame)
+
+
+def test_streamed_edge_store_loads_without_copying(edge_csv, cache_dir, monkeypatch):
+    # Several CSV chunks, so the edge store holds several record batches
+    monkeypatch.setattr(ingest, 'CSV_CHUNK_ROWS', 1000)
+    columns = ['NPI_1', 'NPI_2', STRENGTH_COLUMN]
+    full = load_edge_table(edge_csv, cache_dir, columns=None)
+    with pa.memory_map(cache_path_for(edge_csv, '.feather', cache_dir)) as source:
+        assert ipc.open_file(source).num_record_batches == 3
+
+    before = pa.total_allocated_bytes()
+    edges = load_edge_table(edge_csv, cache_dir, columns)
+    assert pa.total_allocated_bytes() - before < 64 * 1024
+    pd.testing.assert_frame_equal(edges, full[columns])
@@ -0,0 +1,78 @@
+import pandas as pd
+import pytest
+from dataset import load_dataset
+from name_search import NameSearchIndex
+
+
+@pytest.fixture
+def index():
+    # A node table in graph-index order: sorted NPIs, one row per HCP
+    nodes = pd.DataFrame({
+        'NPI': [1000000001, 1000000002, 1000000003, 1000000004, 1000000005, 1000000006, 1234500000, 1234599999],
+        'hcp_name': ['Anna Smith', 'Anna  Smithson', 'Maria Anna Lopez', 'John Smith', 'John Smith', 'Jon Smyth',
+                     'Robert Jones', 'Anna Smith'],
+        'connections': [5, 50, 30, 10, 40, 1, 2, 20],
+        'city': ['Boston', 'Austin', 'Miami', 'Dallas', 'Denver', 'Reno', 'Salem', 'Tampa'],
+        'state': ['MA', 'TX', 'FL', 'TX', 'CO', 'NV', 'OR', 'FL'],
+    })
+    return NameSearchIndex(nodes)
+
+
+def _npis(index, query, k=10):
+    return index.npis[index.search(query, k)].tolist()
+
+
+def test_exact_then_prefix_then_word_start(index):
+    # Exact "anna smith" (two HCPs, by connections) before the better-connected prefix match "anna smithson"
+    assert _npis(index, 'Anna Smith') == [1234599999, 1000000001, 1000000002]
+    # Word starts, not whole-name prefixes: "smith" is the second word of all of these
+    assert _npis(index, 'smith') == [1000000002, 1000000005, 1234599999, 1000000004, 1000000001]
+    assert _npis(index, 'an lop') == [1000000003]
+
+
+def test_duplicate_names_by_connections(index):
+    # Both exact matches lead; the trigram fallback fills the rest of k
+    assert _npis(index, 'john smith')[:2] == [1000000005, 1000000004]
+    labels = index.labels(index.search('john smith', k=2))
+    # The labels tell the two apart
+    assert labels == ["John Smith (NPI 1000000005) · Denver, CO", "John Smith (NPI 1000000004) · Dallas, TX"]
+
+
+def test_duplicate_names_with_equal_connections_keep_node_order():
+    nodes = pd.DataFrame({'NPI': [1000000001, 1000000002, 1000000003], 'hcp_name': ['Lee Park'] * 3,
+                          'connections': [7, 7, 7], 'city': ['A', 'B', 'C'], 'state': ['CA', 'CA', 'CA']})
+    assert NameSearchIndex(nodes).search('lee park').tolist() == [0, 1, 2]
+
+
+def test_typo_falls_back_to_trigrams(index):
+    # No exact, prefix or word-start match; the closest names by trigram similarity come back
+    found = _npis(index, 'jhon smith')
+    assert found[:2] == [1000000005, 1000000004]
+    assert 1000000006 in found
+    assert _npis(index, 'robrt jones') == [1234500000]
+    assert _npis(index, 'xyzzy') == []
+
+
+def test_npi_exact_and_prefix(index):
+    assert _npis(index, '1000000004') == [1000000004]
+    assert _npis(index, '12345') == [1234500000, 1234599999]
+    assert _npis(index, '12345', k=1) == [1234500000]
+    assert _npis(index, '999') == []
+
+
+@pytest.mark.parametrize('query', ['', '   ', '\t\n'])
+def test_empty_query(index, query):
+    assert len(index.search(query)) == 0
+
+
+def test_search_over_dataset(edge_csv, cache_dir):
+    dataset = load_dataset(edge_csv, cache_dir)
+    node = dataset.nodes.iloc[17]
+    assert dataset.search_index.search(str(node['NPI']))[0] == 17
+    same_name = int((dataset.nodes['hcp_name'] == node['hcp_name']).sum())
+    found = dataset.search_index.search(node['hcp_name'], k=same_name)
+    assert 17 in found.tolist()
+    assert (dataset.nodes['hcp_name'].iloc[found] == node['hcp_name']).all()
+    # Same-name HCPs come back best connected first
+    connections = dataset.nodes['connections'].iloc[found].tolist()
+    assert connections == sorted(connections, reverse=True)
@@ -0,0 +1,49 @@
+import pytest
+from dataset import load_dataset
+from query_api import filtered_nodes
+
+
+def _reference(nodes, top_n, states, cities, min_connections, min_influence, min_papers, min_panels, min_trials,
+               sort_by):
+    # The original pandas filter from detailed.get_filtered_nodes
+    filtered = nodes
+    if states:
+        filtered = filtered[filtered['state'].isin(states)]
+    if cities:
+        filtered = filtered[filtered['city'].isin(cities)]
+    filtered = filtered[
+        (filtered['connections'] >= min_connections) & (filtered['influence'] >= min_influence) &
+        (filtered['papers'] >= min_papers) & (filtered['panels'] >= min_panels) & (filtered['trials'] >= min_trials)
+    ]
+    return filtered.nlargest(min(top_n, len(filtered)), sort_by)
+
+
+@pytest.mark.parametrize('top_n, states, cities, minimums, sort_by', [
+    (50, None, None, (0, 0, 0, 0, 0), 'connections'),
+    (300, None, None, (0, 0, 0, 0, 0), 'influence'),
+    (20, ['CA', 'NY'], None, (0, 0, 0, 0, 0), 'connections'),
+    (20, None, ['City 3', 'City 41', 'City 125'], (0, 0, 0, 0, 0), 'papers'),
+    # A threshold few HCPs pass takes the candidate path instead of the sorted walk
+    (50, None, None, (40, 0, 0, 0, 0), 'influence'),
+    (10, ['TX'], None, (5, 3.0, 10, 1, 0), 'trials'),
+    (5, ['CA', 'XX'], None, (0, 0, 0, 0, 1000), 'connections'),
+])
+def test_query_matches_pandas_filter(edge_csv, cache_dir, top_n, states, cities, minimums, sort_by):
+    dataset = load_dataset(edge_csv, cache_dir)
+    expected = _reference(dataset.nodes, top_n, states, cities, *minimums, sort_by)
+    actual = filtered_nodes(dataset, top_n, states, cities, *minimums, sort_by)
+    assert actual['NPI'].tolist() == expected['NPI'].tolist()
+
+
+def test_analytics_metric_does_not_mutate_shared_index(edge_csv, cache_dir):
+    pytest.importorskip('scipy', reason="nx.pagerank needs scipy")
+    dataset = load_dataset(edge_csv, cache_dir)
+    before = dataset.query_index
+    after = dataset.query_index_for('weighted_degree')
+    # The index other sessions may hold is left as it was; the metric lives on its replacement
+    assert 'weighted_degree' not in before.values
+    assert 'weighted_degree' in after.values
+    assert dataset.query_index is after
+    assert dataset.query_index_for('weighted_degree') is after
+    expected = dataset.analytics['weighted_degree'].nlargest(10)
+    assert after.at_least('weighted_degree', expected.iloc[-1])[:10].tolist() == expected.index.tolist()
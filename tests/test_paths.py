@@ -0,0 +1,62 @@
+import networkx as nx
+import numpy as np
+import pytest
+from dataset import load_dataset
+from paths import shortest_path, strongest_path
+
+
+def _reference_graph(dataset, weighted):
+    edges = dataset.edges
+    strength = edges['Overall Connection Strength'].to_numpy().astype(float)
+    graph = nx.Graph()
+    graph.add_nodes_from(range(dataset.graph_index.num_nodes))
+    for u, v, s in zip(dataset.graph_index.edge_src.tolist(), dataset.graph_index.edge_dst.tolist(), strength.tolist()):
+        if weighted and not (s > 0 and np.isfinite(s)):
+            continue
+        cost = 1.0 / s if weighted else 1.0
+        if u != v and (not graph.has_edge(u, v) or cost < graph[u][v]['weight']):
+            graph.add_edge(u, v, weight=cost)
+    return graph
+
+
+def _pairs(dataset, count=25):
+    rng = np.random.default_rng(3)
+    return rng.integers(0, dataset.graph_index.num_nodes, (count, 2)).tolist()
+
+
+def _check_walk(dataset, node_ids, edge_rows):
+    # Every reported edge row joins consecutive nodes of the path
+    src, dst = dataset.graph_index.edge_src, dataset.graph_index.edge_dst
+    for a, b, row in zip(node_ids[:-1], node_ids[1:], edge_rows):
+        assert {int(src[row]), int(dst[row])} == {int(a), int(b)}
+
+
+def test_shortest_path_matches_networkx(edge_csv, cache_dir):
+    dataset = load_dataset(edge_csv, cache_dir)
+    graph = _reference_graph(dataset, weighted=False)
+    for source, target in _pairs(dataset):
+        path = shortest_path(dataset.graph_index, source, target)
+        if not nx.has_path(graph, source, target):
+            assert path is None
+            continue
+        node_ids, edge_rows = path
+        assert node_ids[0] == source and node_ids[-1] == target
+        assert len(node_ids) == len(nx.shortest_path(graph, source, target))
+        _check_walk(dataset, node_ids, edge_rows)
+
+
+def test_strongest_path_matches_networkx_dijkstra(edge_csv, cache_dir):
+    dataset = load_dataset(edge_csv, cache_dir)
+    graph = _reference_graph(dataset, weighted=True)
+    strength = dataset.edges['Overall Connection Strength'].to_numpy().astype(float)
+    for source, target in _pairs(dataset):
+        path = strongest_path(dataset.graph_index, source, target)
+        if not nx.has_path(graph, source, target):
+            assert path is None
+            continue
+        node_ids, edge_rows = path
+        assert node_ids[0] == source and node_ids[-1] == target
+        expected = nx.dijkstra_path(graph, source, target)
+        expected_cost = nx.path_weight(graph, expected, 'weight')
+        assert (1.0 / strength[edge_rows]).sum() == pytest.approx(expected_cost)
+        _check_walk(dataset, node_ids, edge_rows)
@@ -0,0 +1,48 @@
+import os
+import pandas as pd
+import reports
+from dataset import load_dataset
+from reports import export_npis, export_reports
+
+
+def test_export_covers_hcps_without_connection_counts(tmp_path, cache_dir):
+    # NPI 3 has no connection count on any of its rows
+    edges = pd.DataFrame({
+        'NPI_1': [1, 2, 3], 'HCP_1': ['A', 'B', 'C'], 'NPI_2': [2, 3, 4], 'HCP_2': ['B', 'C', 'D'],
+        'No. of Connections HCP 1': [1, 2, None], 'No. of Connections HCP 2': [2, None, 1],
+        'Influence score_1': [1.0, 2.0, 3.0], 'Influence score_2': [2.0, 3.0, 4.0],
+        'City1': ['X', 'Y', 'Z'], 'State1': ['CA', 'CA', 'NY'], 'City2': ['Y', 'Z', 'W'], 'State2': ['CA', 'NY', 'NY'],
+        'Overall Connection Strength': [0.5, 1.0, 1.5], 'Papers': [1, 0, 2], 'Panels': [0, 1, 0], 'Trials': [0, 0, 1],
+        'Metrics': ['Publishers', 'Panels', 'Publishers'],
+    })
+    csv_path = str(tmp_path / "edges.csv")
+    edges.to_csv(csv_path, index=False)
+    dataset = load_dataset(csv_path, cache_dir)
+
+    assert export_npis(dataset) == [1, 2, 3, 4]
+    # Ranked HCPs first, then the unranked ones that match
+    assert export_npis(dataset, states=['NY']) == [4, 3]
+    assert export_npis(dataset, top_n=3) == [2, 1, 4]
+    assert export_npis(dataset, min_influence=2.5) == [4, 3]
+    # A minimum on the missing value itself still excludes the HCP
+    assert export_npis(dataset, min_connections=1) == [2, 1, 4]
+
+
+def test_export_reports_with_worker_pool(edge_csv, cache_dir, tmp_path, monkeypatch):
+    # Small batches, so both workers render several of them and results must come back in order
+    monkeypatch.setattr(reports, 'REPORT_BATCH', 7)
+    dataset = load_dataset(edge_csv, cache_dir)
+    npis = export_npis(dataset, top_n=30, states=['CA', 'TX'])
+    unknown = [1, 9999999999]
+    requested = npis[:10] + unknown[:1] + npis[10:] + unknown[1:]
+    out_dir = str(tmp_path / "reports")
+    done = []
+
+    written, missing = export_reports(edge_csv, requested, out_dir, formats=('md', 'csv'), workers=2,
+                                      cache_dir=cache_dir, progress=lambda count, total: done.append((count, total)))
+
+    assert written == len(npis)
+    assert missing == unknown
+    assert sorted(name for name in os.listdir(out_dir) if name.endswith('.md')) == sorted(f"{npi}.md" for npi in npis)
+    assert pd.read_csv(os.path.join(out_dir, 'summaries.csv'))['NPI'].tolist() == npis
+    assert done[-1] == (len(requested), len(requested))
@@ -0,0 +1,25 @@
+import numpy as np
+import similarity
+from dataset import load_dataset
+
+
+def test_large_buckets_keep_nodes_sharing_the_next_band(edge_csv, cache_dir, monkeypatch):
+    monkeypatch.setattr(similarity, 'MAX_BUCKET', 4)
+    index = load_dataset(edge_csv, cache_dir).similarity_index
+    node_keys = np.asarray(index.node_keys)
+    bands = node_keys.shape[1]
+    indexed = np.flatnonzero((np.asarray(index.signatures) != similarity.EMPTY_SLOT).any(axis=1))
+    checked = 0
+    for node_id in indexed.tolist():
+        candidates = set(index.candidates(node_id).tolist())
+        for band in range(bands):
+            bucket = indexed[node_keys[indexed, band] == node_keys[node_id, band]]
+            if len(bucket) <= similarity.MAX_BUCKET + 1:
+                assert set(bucket.tolist()) - {node_id} <= candidates
+                continue
+            # Truncated: the nodes also sharing the next band are kept, whatever their node ids
+            closest = bucket[node_keys[bucket, (band + 1) % bands] == node_keys[node_id, (band + 1) % bands]]
+            if len(closest) <= similarity.MAX_BUCKET // 2 + 1:
+                assert set(closest.tolist()) - {node_id} <= candidates
+                checked += 1
+    assert checked
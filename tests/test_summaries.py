@@ -0,0 +1,48 @@
+import math
+import pytest
+import pandas as pd
+from dataset import load_dataset
+
+
+def test_missing_influence_ranks_last(tmp_path, cache_dir):
+    # NPI 3 has no influence score on any of its rows
+    edges = pd.DataFrame({
+        'NPI_1': [1, 2, 3], 'HCP_1': ['A', 'B', 'C'], 'NPI_2': [2, 3, 4], 'HCP_2': ['B', 'C', 'D'],
+        'No. of Connections HCP 1': [1, 2, 2], 'No. of Connections HCP 2': [2, 2, 1],
+        'Influence score_1': [1.0, 2.0, None], 'Influence score_2': [2.0, None, 4.0],
+        'City1': ['X', 'Y', 'Z'], 'State1': ['CA', 'CA', 'NY'], 'City2': ['Y', 'Z', 'W'], 'State2': ['CA', 'NY', 'NY'],
+        'Overall Connection Strength': [0.5, 1.0, 1.5], 'Papers': [1, 0, 2], 'Panels': [0, 1, 0], 'Trials': [0, 0, 1],
+        'Metrics': ['Publishers', 'Panels', 'Publishers'],
+    })
+    csv_path = str(tmp_path / "edges.csv")
+    edges.to_csv(csv_path, index=False)
+    store = load_dataset(csv_path, cache_dir).summary_store
+
+    summary = store.summary(3)
+    assert summary['influence_percentile'] == 0
+    assert "top 100.0%" in summary['influence_rank_text']
+    # NaN does not count as ranked below, as in the per-HCP computation
+    assert store.summary(4)['influence_percentile'] == pytest.approx(200 / 3)
+    assert store.summary(1)['influence_percentile'] == 0
+
+
+def test_top_connections_keep_csv_values(edge_csv, cache_dir):
+    edges = pd.read_csv(edge_csv)
+    store = load_dataset(edge_csv, cache_dir).summary_store
+    npi = int(edges['NPI_1'].iloc[0])
+    csv_strengths = set(edges.loc[(edges['NPI_1'] == npi) | (edges['NPI_2'] == npi), 'Overall Connection Strength'].dropna())
+    connections = store.summary(npi)['top_connections_list']
+    assert connections
+    for connection in connections:
+        assert type(connection['strength']) is float and type(connection['influence']) is float
+        assert math.isnan(connection['strength']) or connection['strength'] in csv_strengths
+
+
+def test_average_strength_matches_csv_mean(edge_csv, cache_dir):
+    edges = pd.read_csv(edge_csv)
+    store = load_dataset(edge_csv, cache_dir).summary_store
+    npi = int(edges['NPI_2'].iloc[0])
+    # The baseline mean over the HCP's rows as parsed from the CSV
+    own = edges[((edges['NPI_1'] == npi) | (edges['NPI_2'] == npi)) & (edges['NPI_1'] != edges['NPI_2'])]
+    expected = own['Overall Connection Strength'].mean()
+    assert store.summary(npi)['avg_connection_strength'] == pytest.approx(expected, rel=1e-12)